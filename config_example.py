@@ -11,7 +11,40 @@ OLLAMA_HOST = os.getenv('OLLAMA_HOST', 'http://localhost:11434')
 
 # Report Settings
 REPORTS_DIR = 'firecrawl_reports'
-DEFAULT_SAVE_FORMAT = 'html'  # txt, csv, html, pdf, json, html_charts
+DEFAULT_SAVE_FORMAT = 'html'  # txt, csv, html, pdf, json, html_charts - comma-separate for several
+CHARTS_OFFLINE = False  # True inlines Chart.js so chart reports work without a CDN
+# CHART_JS_PATH = 'vendor/chart.umd.min.js'  # optional local Chart.js build for offline reports
+
+# Page characters sent per prompt; clamped to each model's context window
+MAX_CONTENT_LENGTH = 4000
+# POSTPROCESS_WORKERS = 4  # processes for cleaning/fingerprinting pages; default one per core, 0 = in-process
+
+# Resilience - transient errors (429, 5xx, timeouts) are retried with backoff
+MAX_RETRIES = 3
+RETRY_DELAY = 1.0  # seconds before the first retry; doubles each time, with jitter
+PROCESSING_TIMEOUT = 300  # seconds allowed per page, retries included
+NUM_PREDICT = {'default': 2048, 'qa': 1024}  # output token cap per request kind (analysis, qa, extraction)
+GENERATION_TIMEOUT = {'default': 300, 'qa': 120}  # seconds; on timeout the partial answer is kept
+
+# Firecrawl pacing - stay inside your plan's limits
+REQUESTS_PER_MINUTE = 10  # free plan; raise for paid plans
+DOMAIN_DELAY_SECONDS = 1.0  # politeness gap per website
+# FIRECRAWL_CREDIT_BUDGET = 100  # stop a batch after this many scrapes
+
+# Worker mode (--worker)
+WORKER_CONCURRENCY = 2
+# JOB_QUEUE_PATH = 'firecrawl_reports/jobs.db'
+
+# API server (--serve)
+SERVER_WORKERS = 4  # scrapes/generations running at once
+SERVER_KEEP_ALIVE = '30m'  # how long Ollama keeps API models loaded
+# SERVER_WARM_MODELS = ['llama3.2:3b']  # loaded at startup; default is the first fast model
+
+# Retrieval - long pages send only the chunks most relevant to the task
+EMBEDDING_MODEL = None  # e.g. 'nomic-embed-text'; None picks the first installed embedding model
+RETRIEVAL_TOP_K = 8
+RETRIEVAL_CHUNK_CHARS = 800
+# VECTOR_INDEX_DIR = 'firecrawl_reports/vector_index'  # persistent index of all scraped content
 
 # Model Preferences (optional - system will auto-detect)
 PREFERRED_MODELS = {
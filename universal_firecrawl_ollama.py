@@ -13,20 +13,473 @@ from datetime import datetime
 import csv
 import base64
 import sys
+import html
+import re
+import hashlib
+import itertools
+import queue
+import random
+import threading
+from contextlib import contextmanager, nullcontext
+from urllib.parse import urlparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# File extension used for each report format
+REPORT_EXTENSIONS = {
+    'txt': 'txt', 'csv': 'csv', 'html': 'html',
+    'pdf': 'pdf', 'json': 'json', 'html_charts': 'html'
+}
+
+# Patterns used to clean scraped markdown before hashing and prompting
+MARKDOWN_IMAGE = re.compile(r'!\[[^\]]*\]\([^)]*\)')
+MARKDOWN_LINK = re.compile(r'\[([^\]]*)\]\([^)]*\)')
+HTML_TAG = re.compile(r'<[^>]+>')
+WORD_PATTERN = re.compile(r'\w+')
+
+# Pinned Chart.js build: loaded from the CDN by chart reports, or inlined when offline
+CHART_JS_URL = "https://cdn.jsdelivr.net/npm/chart.js@4.4.1/dist/chart.umd.min.js"
+
+def response_value(response, key, default=None):
+    """Read a field from an Ollama response, whether it is a dict or a response object"""
+    try:
+        value = response[key]
+    except (KeyError, TypeError, IndexError):
+        value = getattr(response, key, None)
+    return default if value is None else value
+
+def generation_metrics(response, elapsed, content_chars=0, prompt_chars=0):
+    """Numeric timing, token and size metrics for one chat call"""
+    completion_tokens = response_value(response, 'eval_count', 0)
+    eval_seconds = response_value(response, 'eval_duration', 0) / 1e9
+    answer = response_value(response, 'message', {})
+    answer_text = response_value(answer, 'content', '')
+    
+    # Prefer Ollama's own eval timing; fall back to wall time
+    speed_basis = eval_seconds if eval_seconds > 0 else elapsed
+    tokens_per_second = completion_tokens / speed_basis if speed_basis > 0 else 0.0
+    
+    return {
+        'latency_seconds': round(elapsed, 3),
+        'prompt_eval_seconds': round(response_value(response, 'prompt_eval_duration', 0) / 1e9, 3),
+        'prompt_tokens': response_value(response, 'prompt_eval_count', 0),
+        'completion_tokens': completion_tokens,
+        'tokens_per_second': round(tokens_per_second, 2),
+        'content_chars': content_chars,
+        'prompt_chars': prompt_chars,
+        'response_chars': len(answer_text)
+    }
+
+ANALYST_PROMPT = "You are an expert analyst. Provide clear, structured insights based on website content."
+
+def analysis_messages(content, task, system_prompt=ANALYST_PROMPT, extra=""):
+    """Chat messages with the page first and the task last.
+    
+    Ollama reuses its cached context for a matching prompt prefix, so
+    further tasks on the same page with the same system prompt only
+    evaluate the tokens after the content.
+    """
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": f"Website Content:\n{content}\n\n{extra}Task: {task}"}
+    ]
+
+def prefix_cache_stats(metrics_list):
+    """Prompt evaluation cost of the first call on a page versus the calls that reuse its prefix"""
+    if len(metrics_list) < 2:
+        return None
+    first = metrics_list[0]
+    followups = metrics_list[1:]
+    followup_seconds = sum(m['prompt_eval_seconds'] for m in followups) / len(followups)
+    followup_tokens = sum(m['prompt_tokens'] for m in followups) / len(followups)
+    followup_latency = sum(m['latency_seconds'] for m in followups) / len(followups)
+    return {
+        "first_prompt_eval_seconds": first['prompt_eval_seconds'],
+        "followup_prompt_eval_seconds": round(followup_seconds, 3),
+        "first_prompt_tokens": first['prompt_tokens'],
+        "followup_prompt_tokens": round(followup_tokens, 1),
+        "first_latency_seconds": first['latency_seconds'],
+        "followup_latency_seconds": round(followup_latency, 3),
+        "prompt_eval_speedup": round(first['prompt_eval_seconds'] / followup_seconds, 2) if followup_seconds > 0 else None
+    }
+
+def clean_markdown(content):
+    """Strip markdown/HTML noise (images, link targets, tags, extra whitespace) from scraped content"""
+    if not content:
+        return ""
+    text = MARKDOWN_IMAGE.sub(' ', content)
+    text = MARKDOWN_LINK.sub(r'\1', text)
+    text = HTML_TAG.sub(' ', text)
+    lines = [' '.join(line.split()) for line in text.splitlines()]
+    
+    # Collapse runs of blank lines to a single paragraph break
+    cleaned = []
+    for line in lines:
+        if line or (cleaned and cleaned[-1]):
+            cleaned.append(line)
+    return '\n'.join(cleaned).strip()
+
+def simhash(text, shingle_size=3):
+    """64-bit SimHash over word shingles; similar texts get hashes a few bits apart"""
+    words = WORD_PATTERN.findall(text.lower())
+    if not words:
+        return 0
+    if len(words) < shingle_size:
+        shingles = [' '.join(words)]
+    else:
+        shingles = [' '.join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)]
+    
+    weights = [0] * 64
+    for shingle in shingles:
+        value = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+        for bit in range(64):
+            if value >> bit & 1:
+                weights[bit] += 1
+            else:
+                weights[bit] -= 1
+    
+    fingerprint = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+class NearDuplicateDetector:
+    """Group near-identical pages by SimHash so only one per cluster needs an LLM call.
+    
+    Fingerprints are split into bands; pages sharing any band are candidates
+    and count as duplicates when their Hamming distance is within
+    `max_distance`. With 4 bands of 16 bits, any pair within 3 bits is
+    guaranteed to share a band.
+    """
+    
+    def __init__(self, max_distance=3, bands=4):
+        self.max_distance = max_distance
+        self.bands = bands
+        self.band_bits = 64 // bands
+        self.band_index = [{} for _ in range(bands)]
+        self.fingerprints = {}
+        # representative key -> list of duplicate keys
+        self.clusters = {}
+        self.total = 0
+    
+    def _bands(self, fingerprint):
+        mask = (1 << self.band_bits) - 1
+        return [(fingerprint >> (i * self.band_bits)) & mask for i in range(self.bands)]
+    
+    def find(self, text, fingerprint=None):
+        """Return (representative key, distance) for a near-duplicate, or (None, None)"""
+        if fingerprint is None:
+            fingerprint = simhash(text)
+        best = (None, None)
+        for band, value in zip(self.band_index, self._bands(fingerprint)):
+            for key in band.get(value, ()):
+                distance = bin(fingerprint ^ self.fingerprints[key]).count('1')
+                if distance <= self.max_distance and (best[1] is None or distance < best[1]):
+                    best = (key, distance)
+        return best
+    
+    def add(self, key, text, fingerprint=None):
+        """Register a page; returns (representative key, distance) if it duplicates one.
+        
+        Pass `fingerprint` when simhash(text) was already computed elsewhere.
+        """
+        self.total += 1
+        if fingerprint is None:
+            fingerprint = simhash(text)
+        representative, distance = self.find(text, fingerprint)
+        if representative is not None:
+            self.clusters[representative].append(key)
+            return representative, distance
+        
+        self.fingerprints[key] = fingerprint
+        self.clusters[key] = []
+        for band, value in zip(self.band_index, self._bands(fingerprint)):
+            band.setdefault(value, []).append(key)
+        return None, None
+    
+    @property
+    def duplicates(self):
+        return self.total - len(self.clusters)
+    
+    @property
+    def dedup_ratio(self):
+        """Share of pages whose analysis was reused instead of recomputed"""
+        return self.duplicates / self.total if self.total else 0.0
+
+def chunk_text(text, chunk_chars=800):
+    """Split text into paragraph-aligned chunks of roughly `chunk_chars` characters"""
+    chunks = []
+    current = []
+    size = 0
+    for paragraph in text.split('\n\n'):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        # Oversized paragraphs are cut into fixed windows
+        pieces = [paragraph[i:i + chunk_chars] for i in range(0, len(paragraph), chunk_chars)]
+        for piece in pieces:
+            if current and size + len(piece) > chunk_chars:
+                chunks.append('\n\n'.join(current))
+                current = []
+                size = 0
+            current.append(piece)
+            size += len(piece) + 2
+    if current:
+        chunks.append('\n\n'.join(current))
+    return chunks
+
+class EmbeddingIndex:
+    """In-memory vector index backed by a single float32 NumPy matrix.
+    
+    Vectors are L2-normalized on insert so cosine similarity is one
+    matrix-vector product.
+    """
+    
+    def __init__(self, vectors):
+        import numpy as np
+        
+        self.np = np
+        matrix = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self.matrix = matrix / norms
+    
+    def __len__(self):
+        return self.matrix.shape[0]
+    
+    def search(self, query_vector, k):
+        """Return [(row, score)] for the k most similar vectors, best first"""
+        np = self.np
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+        scores = self.matrix @ query
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(row), float(scores[row])) for row in top]
+
+class VectorStore:
+    """Persistent, append-only vector index over everything scraped.
+    
+    Layout of the index directory:
+      vectors.f32     row-major float32 vectors, memory-mapped for search
+      signatures.u64  64-bit random-hyperplane signature per vector (ANN)
+      metadata.jsonl  one JSON record per vector (url, chunk text, ...)
+      offsets.u64     byte offset of each metadata record
+      index.json      header: dimension, count, embedding model, page hashes
+    
+    The header's count is authoritative, so a crash mid-append only
+    leaves trailing bytes that are ignored and overwritten.
+    """
+    
+    SIGNATURE_BITS = 64
+    
+    # Below this many vectors search scans everything exactly
+    EXACT_SEARCH_LIMIT = 20000
+    
+    # Candidates re-ranked exactly per requested result in ANN mode
+    CANDIDATE_FACTOR = 50
+    
+    def __init__(self, directory):
+        import numpy as np
+        
+        self.np = np
+        self.directory = directory
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.header_path = os.path.join(directory, 'index.json')
+        self.header = {'dimension': None, 'count': 0, 'model': None, 'pages': {}}
+        if os.path.exists(self.header_path):
+            with open(self.header_path, 'r', encoding='utf-8') as f:
+                self.header.update(json.load(f))
+        self.planes = None
+    
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+    
+    def __len__(self):
+        return self.header['count']
+    
+    @property
+    def model(self):
+        return self.header['model']
+    
+    def has_page(self, url, content_hash):
+        """True when this exact page content is already indexed"""
+        return self.header['pages'].get(url) == content_hash
+    
+    def _hyperplanes(self, dimension):
+        if self.planes is None:
+            # Fixed seed so signatures stay comparable across runs
+            rng = self.np.random.default_rng(20240601)
+            self.planes = rng.standard_normal((self.SIGNATURE_BITS, dimension)).astype(self.np.float32)
+        return self.planes
+    
+    def _signatures(self, matrix):
+        np = self.np
+        bits = (matrix @ self._hyperplanes(matrix.shape[1]).T) > 0
+        weights = (np.uint64(1) << np.arange(self.SIGNATURE_BITS, dtype=np.uint64))
+        return (bits.astype(np.uint64) * weights).sum(axis=1, dtype=np.uint64)
+    
+    def _truncate(self, name, length):
+        path = self._path(name)
+        if os.path.exists(path) and os.path.getsize(path) > length:
+            with open(path, 'r+b') as f:
+                f.truncate(length)
+    
+    def add_page(self, url, content_hash, model, chunks, vectors):
+        """Append one page's chunk vectors and metadata"""
+        np = self.np
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if matrix.ndim != 2 or not len(matrix):
+            return 0
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix = matrix / norms
+        
+        with self.lock:
+            if self.header['model'] and self.header['model'] != model:
+                raise ValueError(f"index was built with {self.header['model']}, not {model}")
+            if self.header['dimension'] and self.header['dimension'] != matrix.shape[1]:
+                raise ValueError("embedding dimension does not match the index")
+            
+            count = self.header['count']
+            dimension = matrix.shape[1]
+            # Drop anything a crashed write left past the committed count
+            self._truncate('vectors.f32', count * dimension * 4)
+            self._truncate('signatures.u64', count * 8)
+            self._truncate('offsets.u64', count * 8)
+            
+            metadata_path = self._path('metadata.jsonl')
+            if count:
+                with open(self._path('offsets.u64'), 'rb') as f:
+                    f.seek((count - 1) * 8)
+                    last_offset = int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+                with open(metadata_path, 'rb') as f:
+                    f.seek(last_offset)
+                    f.readline()
+                    metadata_end = f.tell()
+                self._truncate('metadata.jsonl', metadata_end)
+            else:
+                self._truncate('metadata.jsonl', 0)
+            
+            offsets = []
+            scraped_at = datetime.now().isoformat()
+            with open(metadata_path, 'ab') as f:
+                for number, chunk in enumerate(chunks):
+                    offsets.append(f.tell())
+                    record = {'url': url, 'chunk': number, 'hash': content_hash,
+                              'scraped_at': scraped_at, 'text': chunk}
+                    f.write((json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8'))
+            
+            with open(self._path('vectors.f32'), 'ab') as f:
+                f.write(matrix.tobytes())
+            with open(self._path('signatures.u64'), 'ab') as f:
+                f.write(self._signatures(matrix).tobytes())
+            with open(self._path('offsets.u64'), 'ab') as f:
+                f.write(np.asarray(offsets, dtype=np.uint64).tobytes())
+            
+            self.header.update({'dimension': dimension, 'model': model, 'count': count + len(matrix)})
+            self.header['pages'][url] = content_hash
+            temp_path = self.header_path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.header, f)
+            os.replace(temp_path, self.header_path)
+        return len(matrix)
+    
+    def _metadata(self, rows):
+        """Metadata records for `rows` (any iterable, read lazily) from one open offsets map and file"""
+        offsets = self.np.memmap(self._path('offsets.u64'), dtype=self.np.uint64, mode='r', shape=(len(self),))
+        with open(self._path('metadata.jsonl'), 'rb') as f:
+            for row in rows:
+                f.seek(int(offsets[row]))
+                yield json.loads(f.readline().decode('utf-8'))
+    
+    def search(self, query_vector, k=8):
+        """Return [(score, metadata)] for the k nearest current chunks"""
+        np = self.np
+        count = len(self)
+        if not count:
+            return []
+        
+        dimension = self.header['dimension']
+        vectors = np.memmap(self._path('vectors.f32'), dtype=np.float32, mode='r', shape=(count, dimension))
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+        
+        if count <= self.EXACT_SEARCH_LIMIT:
+            candidates = np.arange(count)
+        else:
+            signatures = np.memmap(self._path('signatures.u64'), dtype=np.uint64, mode='r', shape=(count,))
+            query_signature = self._signatures(query[None, :])[0]
+            distances = np.bitwise_count(signatures ^ query_signature) if hasattr(np, 'bitwise_count') else \
+                np.unpackbits((signatures ^ query_signature).view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+            limit = min(count, k * self.CANDIDATE_FACTOR)
+            candidates = np.sort(np.argpartition(distances, limit - 1)[:limit])
+        
+        scores = vectors[candidates] @ query
+        
+        # Walk candidates best-first, skipping chunks from superseded page versions;
+        # metadata is read only until k current chunks are found
+        order = np.argsort(-scores)
+        results = []
+        records = self._metadata(candidates[position] for position in order)
+        try:
+            for position, record in zip(order, records):
+                if self.header['pages'].get(record['url']) != record['hash']:
+                    continue
+                results.append((float(scores[position]), record))
+                if len(results) == k:
+                    break
+        finally:
+            records.close()
+        return results
+
+def parse_parameter_count(value):
+    """'3.2B' -> 3.2, '137M' -> 0.137 (billions of parameters); None if unknown"""
+    if not value:
+        return None
+    match = re.match(r'\s*([\d.]+)\s*([KMBT]?)', str(value).upper())
+    if not match:
+        return None
+    scale = {'K': 1e-6, 'M': 1e-3, 'B': 1.0, 'T': 1e3, '': 1e-9}[match.group(2)]
+    try:
+        return float(match.group(1)) * scale
+    except ValueError:
+        return None
 
 class OllamaModelManager:
     """Dynamically manage available Ollama models"""
     
-    def __init__(self, ollama_client):
+    # Concurrent client.show calls when building the capability table
+    SHOW_WORKERS = 8
+    
+    def __init__(self, ollama_client, resilience=None):
         self.client = ollama_client
+        # ResilientCaller shared with the rest of the system; None calls the client directly
+        self.resilience = resilience
         self.available_models = []
         self.model_info = {}
+        # model name -> (digest, capability entry); unchanged models skip client.show on refresh
+        self.capability_cache = {}
         self.refresh_models()
     
+    def call(self, host, func, *args, **kwargs):
+        if self.resilience is None:
+            return func(*args, **kwargs)
+        return self.resilience.call(host, func, *args, **kwargs)
+    
     def refresh_models(self):
         """Get fresh list of available models"""
         try:
-            response = self.client.list()
+            response = self.call("ollama", self.client.list)
             self.available_models = []
             self.model_info = {}
             
@@ -41,6 +494,7 @@ class OllamaModelManager:
                             'name': model_name,
                             'size': getattr(model, 'size', 0),
                             'modified': getattr(model, 'modified_at', None),
+                            'digest': getattr(model, 'digest', None),
                             'family': None,
                             'parameters': None
                         }
@@ -53,6 +507,7 @@ class OllamaModelManager:
                         
                         self.model_info[model_name] = info
             
+            self.load_capabilities()
             print(f"🤖 Detected {len(self.available_models)} Ollama models")
             return True
             
@@ -60,10 +515,90 @@ class OllamaModelManager:
             print(f"❌ Error getting models: {e}")
             return False
     
+    def load_capabilities(self):
+        """Fill model_info with context length, quantization, capabilities and template.
+        
+        client.show runs concurrently for models that are new or changed since
+        the last refresh; the rest come from the cache.
+        """
+        stale = []
+        for model in self.available_models:
+            info = self.model_info[model]
+            key = info.get('digest') or str(info.get('modified'))
+            cached = self.capability_cache.get(model)
+            if cached and cached[0] == key:
+                info.update(cached[1])
+            else:
+                stale.append((model, key))
+        
+        if not stale or not hasattr(self.client, 'show'):
+            return
+        
+        with ThreadPoolExecutor(max_workers=min(self.SHOW_WORKERS, len(stale))) as pool:
+            entries = list(pool.map(self.fetch_capabilities, [model for model, _ in stale]))
+        
+        for (model, key), entry in zip(stale, entries):
+            if entry is None:
+                continue
+            self.capability_cache[model] = (key, entry)
+            self.model_info[model].update(entry)
+    
+    def fetch_capabilities(self, model_name):
+        """One model's capability entry from client.show, or None if it failed"""
+        try:
+            response = self.call("ollama", self.client.show, model_name)
+        except Exception:
+            return None
+        
+        model_details = response_value(response, 'modelinfo', {}) or {}
+        details = response_value(response, 'details', {}) or {}
+        capabilities = response_value(response, 'capabilities', None)
+        
+        context_length = None
+        for key, value in model_details.items():
+            if key.endswith('.context_length'):
+                context_length = int(value)
+                break
+        
+        entry = {
+            'context_length': context_length,
+            'quantization': response_value(details, 'quantization_level', None),
+            'capabilities': list(capabilities) if capabilities is not None else None,
+            'template': response_value(response, 'template', None)
+        }
+        if response_value(details, 'family', None):
+            entry['family'] = response_value(details, 'family', None)
+        if response_value(details, 'parameter_size', None):
+            entry['parameters'] = response_value(details, 'parameter_size', None)
+        
+        if capabilities is not None:
+            entry['embedding'] = 'embedding' in capabilities
+            entry['vision'] = 'vision' in capabilities
+        else:
+            # Older servers don't report capabilities; embedding models have a pooling type
+            entry['embedding'] = any(key.endswith('.pooling_type') for key in model_details)
+            entry['vision'] = any('.vision.' in key for key in model_details)
+        return entry
+    
+    def has_capability(self, model_name, capability):
+        """True/False from the capability table, or None when the server didn't say"""
+        info = self.model_info.get(model_name, {})
+        if capability in ('embedding', 'vision') and capability in info:
+            return info[capability]
+        if info.get('capabilities') is None:
+            return None
+        return capability in info['capabilities']
+    
+    def models_with_capability(self, capability):
+        return [model for model in self.available_models if self.has_capability(model, capability)]
+    
     def test_model(self, model_name):
         """Test if a specific model works"""
         try:
-            response = self.client.chat(
+            # Keyed per model, so a model that can't load doesn't open the breaker for all of Ollama
+            self.call(
+                f"ollama:{model_name}",
+                self.client.chat,
                 model=model_name,
                 messages=[{"role": "user", "content": "Hi"}],
                 options={"num_predict": 3}
@@ -79,6 +614,10 @@ class OllamaModelManager:
         print("🔧 Testing models for compatibility...")
         for model in self.available_models:
             print(f"  Testing {model}...", end=" ")
+            if self.has_capability(model, 'embedding'):
+                # Embedding-only models can't chat; no need to load them to find out
+                print("🔍 embeddings only")
+                continue
             if self.test_model(model):
                 working_models.append(model)
                 print("✅")
@@ -102,430 +641,4043 @@ class OllamaModelManager:
         for model in working_models:
             model_lower = model.lower()
             info = self.model_info.get(model, {})
+            embedding = self.has_capability(model, 'embedding')
+            vision = self.has_capability(model, 'vision')
+            parameters = parse_parameter_count(info.get('parameters'))
             
-            # Categorize based on name patterns
-            if any(x in model_lower for x in ['embed', 'embedding']):
+            # Capability table first; name patterns only where the server didn't say
+            if embedding or (embedding is None and any(x in model_lower for x in ['embed', 'embedding'])):
                 categories['embedding'].append(model)
-            elif any(x in model_lower for x in ['vision', 'llava', 'visual', 'vl']):
+            elif vision or (vision is None and any(x in model_lower for x in ['vision', 'llava', 'visual', 'vl'])):
                 categories['vision'].append(model)
+            elif self.has_capability(model, 'thinking'):
+                categories['reasoning'].append(model)
             elif any(x in model_lower for x in ['code', 'coder', 'programming']):
                 categories['coding'].append(model)
             elif any(x in model_lower for x in ['qwen', 'deepseek', 'reasoning']):
                 categories['reasoning'].append(model)
             elif any(x in model_lower for x in ['phi4', 'phi-4', 'claude', 'gpt-4']):
                 categories['comprehensive'].append(model)
-            elif any(x in model_lower for x in ['3.2', '1b', '3b', 'small']):
+            elif (parameters is not None and parameters <= 4) or \
+                    (parameters is None and any(x in model_lower for x in ['3.2', '1b', '3b', 'small'])):
                 categories['fast'].append(model)
             else:
                 categories['general'].append(model)
         
         return categories
 
-class FirecrawlOllamaSystem:
-    """Main system class"""
+class ReportDocument:
+    """Format-neutral view of one result.
     
-    def __init__(self):
-        self.app = None
-        self.ollama_client = None
-        self.model_manager = None
-        self.working_models = []
-        self.model_categories = {}
-        
-        # Create reports directory
-        self.reports_dir = "firecrawl_reports"
-        if not os.path.exists(self.reports_dir):
-            os.makedirs(self.reports_dir)
+    Built once per result and shared by every renderer, so field headings,
+    text conversion and the generation timestamp are computed a single time
+    however many formats are written.
+    """
     
-    def setup_firecrawl(self):
-        """Setup Firecrawl with user's API key - auto-save/load from config"""
-        print("🔥 Setting up Firecrawl...")
+    def __init__(self, data, analysis_type=None, generated=None):
+        self.data = data
+        self.analysis_type = analysis_type
+        self.generated = generated or datetime.now()
+        self.url = None
+        self.model = None
+        self.metrics = None
+        # (field key, display heading, text) for each field
+        self.sections = []
         
-        # Check multiple sources for API key
-        api_key = None
-        
-        # 1. Check environment variable first
-        api_key = os.getenv('FIRECRAWL_API_KEY')
-        if api_key:
-            print("✅ Using API key from environment variable")
+        if isinstance(data, dict):
+            self.url = data.get('url')
+            self.model = data.get('model')
+            self.metrics = data.get('metrics')
+            for key, value in data.items():
+                self.sections.append((key, key.replace('_', ' ').title(), self.as_text(value)))
+        else:
+            self.sections.append((None, "Analysis Results", self.as_text(data)))
+    
+    @staticmethod
+    def as_text(value):
+        """Render a field value as readable text"""
+        if isinstance(value, str):
+            return value
+        if isinstance(value, (dict, list, tuple)):
+            return json.dumps(value, indent=2, ensure_ascii=False, default=str)
+        return str(value)
+    
+    @property
+    def generated_text(self):
+        return self.generated.strftime('%Y-%m-%d %H:%M:%S')
+
+def parse_save_formats(value):
+    """Turn 'html,json', ['html', 'json'] or 'html' into a de-duplicated format list"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.replace(';', ',').split(',')
+    formats = []
+    for item in value:
+        item = str(item).strip().lower()
+        if item in REPORT_EXTENSIONS and item not in formats:
+            formats.append(item)
+    return formats
+
+class HtmlReportRenderer:
+    """Render HTML reports from precompiled templates, streaming chunks to a file handle"""
+    
+    # Fields shown in the report header instead of their own section
+    HEADER_FIELDS = ('url', 'model', 'timestamp')
+    
+    DOCUMENT_HEAD = """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{title}</title>
+    <style>
+        body {{ font-family: Arial, sans-serif; line-height: 1.6; margin: 0; padding: 20px; background-color: #f4f4f4; }}
+        .container {{ max-width: 1200px; margin: 0 auto; background: white; padding: 30px; border-radius: 10px; box-shadow: 0 0 10px rgba(0,0,0,0.1); }}
+        .header {{ text-align: center; color: #333; border-bottom: 3px solid #007acc; padding-bottom: 20px; margin-bottom: 30px; }}
+        .page {{ margin-bottom: 40px; padding-bottom: 20px; border-bottom: 2px dashed #ccc; }}
+        .section {{ margin-bottom: 30px; padding: 20px; background: #f9f9f9; border-radius: 5px; border-left: 4px solid #007acc; }}
+        .section h2 {{ color: #007acc; margin-top: 0; }}
+        .metadata {{ background: #e7f3ff; padding: 15px; border-radius: 5px; margin-bottom: 20px; }}
+        .analysis-content {{ background: white; padding: 20px; border-radius: 5px; white-space: pre-wrap; font-family: 'Courier New', monospace; border: 1px solid #ddd; }}
+        .footer {{ text-align: center; margin-top: 30px; padding-top: 20px; border-top: 1px solid #ddd; color: #666; }}
+        .charts {{ display: flex; flex-wrap: wrap; gap: 20px; }}
+        .chart {{ flex: 1 1 350px; background: white; padding: 10px; border-radius: 5px; border: 1px solid #ddd; }}
+    </style>
+"""
+    
+    # Same pinned build as offline reports, so both render identically
+    CHART_SCRIPT = f'    <script src="{CHART_JS_URL}"></script>\n'
+    
+    CHART_INLINE_SCRIPT = '    <script>\n{source}\n    </script>\n'
+    
+    CHARTS_OPEN = """
+        <div class="section">
+            <h2>Performance Charts</h2>
+            <div class="charts">
+"""
+    
+    CHART_CANVAS = """                <div class="chart"><canvas id="{chart_id}"></canvas></div>
+                <script>new Chart(document.getElementById("{chart_id}"), {config});</script>
+"""
+    
+    CHARTS_CLOSE = """            </div>
+        </div>
+"""
+    
+    # (metric key, chart title, y-axis label) for per-model metrics
+    CHART_METRICS = (
+        ('latency_seconds', 'Latency per model', 'seconds'),
+        ('tokens_per_second', 'Generation speed', 'tokens/sec'),
+    )
+    
+    # Content size bars shown per model: (metric key, dataset label)
+    SIZE_METRICS = (
+        ('content_chars', 'Scraped content'),
+        ('prompt_chars', 'Sent to model'),
+        ('response_chars', 'Response'),
+    )
+    
+    CHART_COLORS = ('#007acc', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b')
+    
+    BODY_OPEN = """</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h1>🔥 {title}</h1>
+            <p>Generated on {generated_long}</p>
+        </div>
+"""
+    
+    METADATA_OPEN = """
+        <div class="metadata">
+            <h3>📊 Report Information</h3>
+            <p><strong>Generated:</strong> {generated}</p>
+            <p><strong>System:</strong> Universal Firecrawl + Ollama Integration</p>
+"""
+    
+    METADATA_URL = '            <p><strong>Analyzed URL:</strong> <a href="{href}" target="_blank" rel="noopener">{url}</a></p>\n'
+    
+    METADATA_MODEL = '            <p><strong>AI Model:</strong> {model}</p>\n'
+    
+    METADATA_CLOSE = "        </div>\n"
+    
+    PAGE_OPEN = '\n        <div class="page" id="page-{number}">\n            <h2>Page {number}</h2>\n'
+    
+    PAGE_CLOSE = "        </div>\n"
+    
+    SECTION = """
+        <div class="section">
+            <h2>{heading}</h2>
+            <div class="analysis-content">{body}</div>
+        </div>
+"""
+    
+    DOCUMENT_CLOSE = """
+        <div class="footer">
+            <p>Report generated by <strong>Universal Firecrawl + Ollama Integration System</strong></p>
+            <p>For more information, visit <a href="https://firecrawl.dev">Firecrawl</a> and <a href="https://ollama.com">Ollama</a></p>
+        </div>
+    </div>
+</body>
+</html>
+"""
+    
+    def __init__(self, include_charts=False, title="Universal Firecrawl + Ollama Analysis Report",
+                 chart_library=None):
+        self.include_charts = include_charts
+        self.title = title
+        # Inline Chart.js source for offline reports; None loads it from the CDN
+        self.chart_library = chart_library
+        self._chart_count = 0
+    
+    @staticmethod
+    def escape(value):
+        """Escape any value for safe inclusion in HTML text or attributes"""
+        return html.escape(ReportDocument.as_text(value), quote=True)
+    
+    @staticmethod
+    def safe_href(url):
+        """Only link http(s) URLs; anything else is rendered inert"""
+        url = str(url)
+        if url.lower().startswith(('http://', 'https://')):
+            return html.escape(url, quote=True)
+        return "#"
+    
+    def render(self, document, out):
+        """Write a single-result report to an open text file handle"""
+        self._write_document_open(out, document.generated)
+        self._write_metadata(out, document)
+        if self.include_charts:
+            self._write_charts(out, self.chart_specs(document.metrics))
+        self._write_sections(out, document)
+        out.write(self.DOCUMENT_CLOSE)
+    
+    def render_batch(self, documents, out):
+        """Write a multi-page report, consuming `documents` lazily so memory stays flat"""
+        self._write_document_open(out, datetime.now())
+        count = 0
+        # Only one latency figure per page is kept for the summary chart
+        page_latencies = []
+        for count, document in enumerate(documents, 1):
+            out.write(self.PAGE_OPEN.format(number=count))
+            self._write_metadata(out, document)
+            self._write_sections(out, document)
+            out.write(self.PAGE_CLOSE)
+            if self.include_charts:
+                latencies = [m.get('latency_seconds', 0) for m in (document.metrics or {}).values()]
+                page_latencies.append(sum(latencies))
+        if self.include_charts and page_latencies:
+            self._write_charts(out, [self._bar_chart(
+                'Latency per page', 'seconds',
+                [str(i) for i in range(1, len(page_latencies) + 1)],
+                [('Latency', page_latencies)]
+            )])
+        out.write(self.DOCUMENT_CLOSE)
+        return count
+    
+    def chart_specs(self, metrics):
+        """Build Chart.js configs from a {model: metrics} mapping"""
+        if not metrics:
+            return []
+        labels = list(metrics.keys())
+        specs = []
+        for key, title, unit in self.CHART_METRICS:
+            values = [metrics[label].get(key, 0) for label in labels]
+            specs.append(self._bar_chart(title, unit, labels, [(unit, values)]))
+        size_series = [
+            (name, [metrics[label].get(key, 0) for label in labels])
+            for key, name in self.SIZE_METRICS
+        ]
+        specs.append(self._bar_chart('Content size', 'characters', labels, size_series))
+        return specs
+    
+    def _bar_chart(self, title, unit, labels, series):
+        return {
+            'type': 'bar',
+            'data': {
+                'labels': labels,
+                'datasets': [
+                    {
+                        'label': name,
+                        'data': values,
+                        'backgroundColor': self.CHART_COLORS[i % len(self.CHART_COLORS)]
+                    }
+                    for i, (name, values) in enumerate(series)
+                ]
+            },
+            'options': {
+                'plugins': {'title': {'display': True, 'text': title}},
+                'scales': {'y': {'beginAtZero': True, 'title': {'display': True, 'text': unit}}}
+            }
+        }
+    
+    def _write_charts(self, out, specs):
+        if not specs:
+            return
+        out.write(self.CHARTS_OPEN)
+        for spec in specs:
+            self._chart_count += 1
+            out.write(self.CHART_CANVAS.format(
+                chart_id=f"chart-{self._chart_count}",
+                config=self.script_json(spec)
+            ))
+        out.write(self.CHARTS_CLOSE)
+    
+    @staticmethod
+    def script_json(value):
+        """Serialize JSON that is safe to embed inside a <script> element"""
+        return json.dumps(value, ensure_ascii=False).replace('</', '<\\/')
+    
+    def _write_document_open(self, out, generated):
+        title = html.escape(self.title)
+        out.write(self.DOCUMENT_HEAD.format(title=title))
+        if self.include_charts:
+            if self.chart_library:
+                out.write(self.CHART_INLINE_SCRIPT.format(source=self.chart_library.replace('</script', '<\\/script')))
+            else:
+                out.write(self.CHART_SCRIPT)
+        out.write(self.BODY_OPEN.format(
+            title=title,
+            generated_long=generated.strftime('%Y-%m-%d at %H:%M:%S')
+        ))
+    
+    def _write_metadata(self, out, document):
+        out.write(self.METADATA_OPEN.format(generated=document.generated_text))
+        if document.url is not None:
+            out.write(self.METADATA_URL.format(href=self.safe_href(document.url), url=self.escape(document.url)))
+        if document.model is not None:
+            out.write(self.METADATA_MODEL.format(model=self.escape(document.model)))
+        out.write(self.METADATA_CLOSE)
+    
+    def _write_sections(self, out, document):
+        for key, heading, text in document.sections:
+            if key in self.HEADER_FIELDS or (key == 'metrics' and self.include_charts):
+                continue
+            out.write(self.SECTION.format(heading=self.escape(heading), body=html.escape(text, quote=True)))
+
+def parse_json_payload(text):
+    """Parse JSON from model output, tolerating ```json fences; None if it is not JSON"""
+    if not isinstance(text, str):
+        return None
+    text = text.strip()
+    if text.startswith('```'):
+        text = text.split('\n', 1)[1] if '\n' in text else ''
+        text = text.rsplit('```', 1)[0]
+    try:
+        return json.loads(text)
+    except ValueError:
+        return None
+
+class _LazyStory(list):
+    """Flowable list that reportlab consumes from the front while we refill it from a generator.
+    
+    Platypus pops flowables off the head of the story as it lays out pages,
+    so only a small look-ahead window of flowables exists at any time.
+    """
+    
+    def __init__(self, flowables, lookahead=64):
+        super().__init__()
+        self.source = iter(flowables)
+        self.lookahead = lookahead
+        self.exhausted = False
+    
+    def __len__(self):
+        if not self.exhausted and super().__len__() < self.lookahead:
+            for flowable in self.source:
+                self.append(flowable)
+                if super().__len__() >= self.lookahead * 2:
+                    break
+            else:
+                self.exhausted = True
+        return super().__len__()
+
+class PdfReportRenderer:
+    """Build PDF reports page by page with reportlab, in bounded memory.
+    
+    Styles and fonts are created once per process and reused by every
+    report. Flowables are generated lazily, and JSON-shaped results
+    (such as structured extraction output) are rendered as tables.
+    """
+    
+    # Longest run of text placed in one Paragraph; longer blocks are split
+    MAX_PARAGRAPH_CHARS = 3000
+    
+    # Widest table rendered before falling back to text
+    MAX_TABLE_COLUMNS = 8
+    
+    # Style sheets keyed by font file, shared by every report in this process
+    _style_cache = {}
+    _canvas_class = None
+    
+    def __init__(self, font_path=None):
+        # Optional TrueType font for text outside Latin-1; the built-in Helvetica is fastest
+        self.font_path = font_path
+    
+    def styles(self):
+        """Paragraph styles, built (and any font registered) once and then reused"""
+        cached = self._style_cache.get(self.font_path)
+        if cached is None:
+            cached = self._style_cache[self.font_path] = self._build_styles(self.font_path)
+        return cached
+    
+    @staticmethod
+    def _build_styles(font_path):
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
         
-        # 2. Check config.py file
-        if not api_key:
+        font_name = 'Helvetica'
+        if font_path:
             try:
-                if os.path.exists('config.py'):
-                    import importlib.util
-                    spec = importlib.util.spec_from_file_location("config", "config.py")
-                    config = importlib.util.module_from_spec(spec)
-                    spec.loader.exec_module(config)
-                    
-                    if hasattr(config, 'FIRECRAWL_API_KEY') and config.FIRECRAWL_API_KEY != 'your-api-key-here':
-                        api_key = config.FIRECRAWL_API_KEY
-                        print("✅ Using API key from config.py")
+                from reportlab.pdfbase import pdfmetrics
+                from reportlab.pdfbase.ttfonts import TTFont
+                font_name = os.path.splitext(os.path.basename(font_path))[0]
+                pdfmetrics.registerFont(TTFont(font_name, font_path))
             except Exception as e:
-                print(f"⚠️ Could not load config.py: {e}")
+                print(f"⚠️ Could not load PDF font {font_path}: {e}")
+                font_name = 'Helvetica'
         
-        # 3. Prompt user if no key found
-        if not api_key:
-            print("\n🔑 Firecrawl API Key Setup:")
-            print("You can get a free API key at: https://firecrawl.dev")
-            print("This will be saved so you only need to enter it once.")
-            
-            api_key = input("\nEnter your Firecrawl API key: ").strip()
+        sample = getSampleStyleSheet()
+        return {
+            'title': ParagraphStyle('ReportTitle', parent=sample['Heading1'], fontSize=24,
+                                    spaceAfter=30, alignment=1),
+            'page': ParagraphStyle('ReportPage', parent=sample['Heading1'], fontSize=16, spaceAfter=12),
+            'heading': ParagraphStyle('ReportHeading', parent=sample['Heading2'], spaceAfter=12),
+            'subheading': ParagraphStyle('ReportSubheading', parent=sample['Heading3'], fontName=font_name),
+            'body': ParagraphStyle('ReportBody', parent=sample['Normal'], fontName=font_name, spaceAfter=8),
+            'bullet': ParagraphStyle('ReportBullet', parent=sample['Normal'], fontName=font_name,
+                                     leftIndent=14, bulletIndent=4, spaceAfter=4),
+            'cell': ParagraphStyle('ReportCell', parent=sample['Normal'], fontName=font_name,
+                                   fontSize=8, leading=10),
+        }
+    
+    def render(self, document, filename):
+        """Write a single-result PDF"""
+        self._build(filename, self._document_flowables(document, with_title=True))
+    
+    def render_batch(self, documents, filename):
+        """Write a multi-page PDF, consuming `documents` lazily"""
+        self._build(filename, self._batch_flowables(documents))
+    
+    def _build(self, filename, flowables):
+        from reportlab.lib.pagesizes import A4
+        from reportlab.platypus import SimpleDocTemplate
+        
+        doc = SimpleDocTemplate(filename, pagesize=A4)
+        doc.build(_LazyStory(flowables), canvasmaker=self.canvas_class())
+    
+    @classmethod
+    def canvas_class(cls):
+        """Canvas that compresses each page's content stream as soon as the page is finished.
+        
+        reportlab keeps every page stream as text until the file is saved;
+        compressing on the fly keeps large batch reports small in memory.
+        """
+        if cls._canvas_class is None:
+            import zlib
+            from reportlab.pdfgen.canvas import Canvas
+            from reportlab.pdfbase.pdfdoc import PDFArray, PDFDictionary, PDFName, PDFStream
             
-            if not api_key:
-                print("❌ API key required to continue")
-                return False
+            class CompressingCanvas(Canvas):
+                def showPage(self):
+                    super().showPage()
+                    page = self._doc.Pages.pages[-1]
+                    if page.stream and not page.Contents:
+                        stream = page.stream
+                        if isinstance(stream, str):
+                            stream = stream.encode('latin-1')
+                        page.Contents = PDFStream(
+                            PDFDictionary({'Filter': PDFArray([PDFName('FlateDecode')])}),
+                            zlib.compress(stream)
+                        )
+                        page.stream = None
             
-            # Save the API key to config.py
-            self.save_api_key_to_config(api_key)
+            cls._canvas_class = CompressingCanvas
+        return cls._canvas_class
+    
+    def _title_flowables(self, generated_text):
+        from reportlab.platypus import Paragraph, Spacer
         
-        # Test the API key
-        try:
-            self.app = FirecrawlApp(api_key=api_key)
-            
-            # Test the connection with multiple URLs
-            test_urls = ["https://example.com", "https://httpbin.org/html"]
+        styles = self.styles()
+        yield Paragraph("Universal Firecrawl + Ollama Analysis Report", styles['title'])
+        yield Spacer(1, 12)
+        yield Paragraph(f"Generated: {generated_text}", styles['body'])
+        yield Spacer(1, 20)
+    
+    def _batch_flowables(self, documents):
+        from reportlab.platypus import PageBreak, Paragraph
+        
+        styles = self.styles()
+        yield from self._title_flowables(datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        for number, document in enumerate(documents, 1):
+            if number > 1:
+                yield PageBreak()
+            label = f"Page {number}"
+            if document.url:
+                label += f": {document.url}"
+            yield Paragraph(self.markup(label), styles['page'])
+            yield from self._document_flowables(document, with_title=False)
+    
+    def _document_flowables(self, document, with_title):
+        from reportlab.platypus import Paragraph, Spacer
+        
+        styles = self.styles()
+        if with_title:
+            yield from self._title_flowables(document.generated_text)
+        
+        for key, heading, text in document.sections:
+            yield Paragraph(self.markup(heading), styles['heading'])
             
-            for test_url in test_urls:
-                try:
-                    result = self.app.scrape_url(test_url, formats=['markdown'])
-                    print("✅ Firecrawl connected successfully")
-                    return True
-                except:
-                    continue
+            value = document.data.get(key) if isinstance(document.data, dict) else None
+            table = self._table_for(value if not isinstance(value, str) else parse_json_payload(value))
+            if table is not None:
+                yield table
+            else:
+                yield from self._text_flowables(text)
             
-            print("❌ Firecrawl connection failed - check your API key")
-            # If connection fails, prompt for new key
-            return self.retry_api_key_setup()
+            yield Spacer(1, 20)
+    
+    def _text_flowables(self, text):
+        """Paragraphs for free text: markdown headings and bullets kept, long blocks split"""
+        from reportlab.platypus import Paragraph
+        
+        styles = self.styles()
+        for block in text.split('\n\n'):
+            block = block.strip()
+            if not block:
+                continue
             
-        except Exception as e:
-            print(f"❌ Firecrawl setup failed: {e}")
-            return self.retry_api_key_setup()
+            lines = []
+            for line in block.split('\n'):
+                stripped = line.strip()
+                if stripped.startswith('#'):
+                    yield from self._paragraphs(lines, styles['body'])
+                    lines = []
+                    yield Paragraph(self.markup(stripped.lstrip('#').strip()), styles['subheading'])
+                elif stripped.startswith(('- ', '* ', '• ')):
+                    yield from self._paragraphs(lines, styles['body'])
+                    lines = []
+                    yield Paragraph(self.markup(stripped[2:]), styles['bullet'], bulletText='•')
+                elif stripped:
+                    lines.append(stripped)
+            yield from self._paragraphs(lines, styles['body'])
     
-    def save_api_key_to_config(self, api_key):
-        """Save API key to config.py file"""
-        try:
-            config_content = f'''# Universal Firecrawl + Ollama Configuration
-import os
-
-# Firecrawl Configuration
-FIRECRAWL_API_KEY = "{api_key}"
+    def _paragraphs(self, lines, style):
+        from reportlab.platypus import Paragraph
+        
+        chunk = []
+        size = 0
+        for line in lines:
+            chunk.append(self.markup(line))
+            size += len(line)
+            if size >= self.MAX_PARAGRAPH_CHARS:
+                yield Paragraph('<br/>'.join(chunk), style)
+                chunk = []
+                size = 0
+        if chunk:
+            yield Paragraph('<br/>'.join(chunk), style)
+    
+    def _table_for(self, value):
+        """A reportlab Table for a list of records or a flat mapping, else None"""
+        from reportlab.lib import colors
+        from reportlab.platypus import Paragraph, Table, TableStyle
+        
+        cell_style = self.styles()['cell']
+        
+        def cell(item):
+            return Paragraph(self.markup(ReportDocument.as_text(item)[:1000]), cell_style)
+        
+        # A single-key wrapper such as {"products": [...]} is unwrapped
+        if isinstance(value, dict) and len(value) == 1:
+            inner = next(iter(value.values()))
+            if isinstance(inner, list):
+                value = inner
+        
+        if isinstance(value, list) and value and all(isinstance(row, dict) for row in value):
+            columns = []
+            for row in value:
+                for column in row:
+                    if column not in columns:
+                        columns.append(column)
+            if len(columns) > self.MAX_TABLE_COLUMNS:
+                return None
+            rows = [[cell(column) for column in columns]]
+            rows += [[cell(row.get(column, '')) for column in columns] for row in value]
+        elif isinstance(value, dict) and value:
+            rows = [[cell('Field'), cell('Value')]]
+            rows += [[cell(key), cell(item)] for key, item in value.items()]
+        else:
+            return None
+        
+        table = Table(rows, repeatRows=1, hAlign='LEFT')
+        table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#e7f3ff')),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#cccccc')),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ]))
+        return table
+    
+    @staticmethod
+    def markup(text):
+        """Escape text for reportlab's Paragraph mini-markup"""
+        return html.escape(text, quote=False)
 
-# Ollama Configuration  
-OLLAMA_HOST = os.getenv('OLLAMA_HOST', 'http://localhost:11434')
+class ReportGenerator:
+    """Write analysis results to report files in every supported format.
+    
+    Holds only plain settings so it can be shipped to a worker process.
+    """
+    
+    def __init__(self, reports_dir="firecrawl_reports", charts_offline=False, chart_js_path=None,
+                 pdf_font_path=None):
+        self.reports_dir = reports_dir
+        self.charts_offline = charts_offline
+        self.chart_js_path = chart_js_path
+        self.pdf_font_path = pdf_font_path
+    
+    def write(self, save_format, document, filename):
+        """Save a ReportDocument to `filename` in the requested format"""
+        if save_format == "json":
+            self.save_as_json(document, filename)
+        elif save_format == "txt":
+            self.save_as_txt(document, filename)
+        elif save_format == "csv":
+            self.save_as_csv(document, filename)
+        elif save_format == "html":
+            self.save_as_html(document, filename, False)
+        elif save_format == "html_charts":
+            self.save_as_html(document, filename, True)
+        elif save_format == "pdf":
+            self.save_as_pdf(document, filename)
+        else:
+            raise ValueError(f"Unknown report format: {save_format}")
+        return filename
+    
+    def write_batch(self, save_format, pages, filename):
+        """Save a list of page results to `filename` as one multi-page report"""
+        if save_format == "json":
+            self.save_batch_as_json(pages, filename)
+        elif save_format == "txt":
+            self.save_batch_as_txt(pages, filename)
+        elif save_format == "csv":
+            self.save_batch_as_csv(pages, filename)
+        elif save_format == "html":
+            self.save_batch_as_html(pages, filename, False)
+        elif save_format == "html_charts":
+            self.save_batch_as_html(pages, filename, True)
+        elif save_format == "pdf":
+            self.save_batch_as_pdf(pages, filename)
+        else:
+            raise ValueError(f"Unknown report format: {save_format}")
+        return filename
+    
+    @staticmethod
+    def report_filenames(formats, base_filename):
+        """Map each format to its file, keeping html and html_charts apart"""
+        filenames = {}
+        for save_format in formats:
+            extension = REPORT_EXTENSIONS[save_format]
+            if save_format == 'html_charts' and 'html' in formats:
+                extension = f"charts.{extension}"
+            filenames[save_format] = f"{base_filename}.{extension}"
+        return filenames
+    
+    def save_as_json(self, document, filename):
+        """Save report as JSON file"""
+        report_data = {
+            "timestamp": document.generated.isoformat(),
+            "analysis_data": document.data,
+            "generated_by": "Universal Firecrawl + Ollama System"
+        }
+        
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(report_data, f, indent=2, ensure_ascii=False)
+        
+        print(f"✅ JSON report saved: {filename}")
 
-# Report Settings
-REPORTS_DIR = 'firecrawl_reports'
-DEFAULT_SAVE_FORMAT = 'html'  # txt, csv, html, pdf, json, html_charts
+    def save_batch_as_json(self, pages, filename):
+        """Save a batch report as JSON, writing one page at a time"""
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write('{\n  "timestamp": %s,\n  "generated_by": "Universal Firecrawl + Ollama System",\n  "pages": [\n'
+                    % json.dumps(datetime.now().isoformat()))
+            for number, page in enumerate(pages):
+                if number:
+                    f.write(',\n')
+                f.write('    ' + json.dumps(page, ensure_ascii=False, default=str))
+            f.write('\n  ]\n}\n')
+        
+        print(f"✅ JSON batch report saved: {filename}")
 
-# Model Preferences (optional - system will auto-detect)
-PREFERRED_MODELS = {{
-    'fast': 'llama3.2',
-    'reasoning': 'qwen3', 
-    'coding': 'qwen2.5-coder',
-    'comprehensive': 'phi4'
-}}
-'''
+    def save_as_txt(self, document, filename):
+        """Save report as text file"""
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write("="*80 + "\n")
+            f.write("UNIVERSAL FIRECRAWL + OLLAMA ANALYSIS REPORT\n")
+            f.write("="*80 + "\n")
+            f.write(f"Generated: {document.generated_text}\n\n")
             
-            with open('config.py', 'w', encoding='utf-8') as f:
-                f.write(config_content)
+            for key, heading, text in document.sections:
+                if key is None:
+                    f.write(text)
+                    continue
+                f.write(f"{heading.upper()}:\n")
+                f.write("-" * 40 + "\n")
+                f.write(f"{text}\n\n")
+        
+        print(f"✅ Text report saved: {filename}")
+
+    def save_batch_as_txt(self, pages, filename):
+        """Save a batch report as text, one page after another"""
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write("="*80 + "\n")
+            f.write("UNIVERSAL FIRECRAWL + OLLAMA BATCH REPORT\n")
+            f.write("="*80 + "\n")
+            f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
             
-            print("✅ API key saved to config.py")
+            for number, page in enumerate(pages, 1):
+                f.write("#"*80 + f"\nPAGE {number}\n" + "#"*80 + "\n\n")
+                for key, heading, text in ReportDocument(page).sections:
+                    f.write(f"{heading.upper()}:\n")
+                    f.write("-" * 40 + "\n")
+                    f.write(f"{text}\n\n")
+        
+        print(f"✅ Text batch report saved: {filename}")
+
+    def save_as_csv(self, document, filename):
+        """Save report as CSV file"""
+        with open(filename, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(["Timestamp", "Field", "Value"])
             
-        except Exception as e:
-            print(f"⚠️ Could not save config file: {e}")
-    
-    def retry_api_key_setup(self):
-        """Allow user to retry with a different API key"""
-        print("\n🔄 API key may be invalid or connection failed.")
-        retry = input("Try with a different API key? (y/n): ").lower().startswith('y')
+            timestamp = document.generated_text
+            for key, heading, text in document.sections:
+                writer.writerow([timestamp, heading if key is not None else "Analysis", text[:1000]])
         
-        if retry:
-            print("\n🔑 Enter new Firecrawl API key:")
-            new_key = input("API key: ").strip()
+        print(f"✅ CSV report saved: {filename}")
+
+    def save_batch_as_csv(self, pages, filename):
+        """Save a batch report as CSV with one row per page field"""
+        with open(filename, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(["Page", "URL", "Field", "Value"])
             
-            if new_key:
-                self.save_api_key_to_config(new_key)
-                # Recursively try setup again
-                return self.setup_firecrawl()
+            for number, page in enumerate(pages, 1):
+                document = ReportDocument(page)
+                for key, heading, text in document.sections:
+                    writer.writerow([number, document.url or "", heading, text[:1000]])
+        
+        print(f"✅ CSV batch report saved: {filename}")
+
+    def load_chart_library(self):
+        """Return Chart.js source for offline reports, downloading and caching it once"""
+        library_path = self.chart_js_path or os.path.join(self.reports_dir, '.cache', 'chart.umd.min.js')
+        
+        if not os.path.exists(library_path):
+            try:
+                import requests
+                print("📥 Downloading Chart.js for offline reports...")
+                response = requests.get(CHART_JS_URL, timeout=30)
+                response.raise_for_status()
+                os.makedirs(os.path.dirname(library_path) or '.', exist_ok=True)
+                with open(library_path, 'w', encoding='utf-8') as f:
+                    f.write(response.text)
+            except Exception as e:
+                print(f"⚠️ Could not fetch Chart.js ({e}) - report will load it from the CDN")
+                return None
+        
+        with open(library_path, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def save_as_html(self, document, filename, include_charts=False):
+        """Save report as HTML file with optional charts"""
+        chart_library = None
+        if include_charts and self.charts_offline:
+            chart_library = self.load_chart_library()
+        renderer = HtmlReportRenderer(include_charts=include_charts, chart_library=chart_library)
+        
+        with open(filename, 'w', encoding='utf-8') as f:
+            renderer.render(document, f)
+        
+        chart_note = " with charts" if include_charts else ""
+        print(f"✅ HTML report{chart_note} saved: {filename}")
+        print(f"🌐 Open in browser: file://{os.path.abspath(filename)}")
+
+    def save_batch_as_html(self, pages, filename, include_charts=False):
+        """Save a multi-page batch report as HTML, streaming one page at a time"""
+        documents = (ReportDocument(page) for page in pages)
+        chart_library = None
+        if include_charts and self.charts_offline:
+            chart_library = self.load_chart_library()
+        renderer = HtmlReportRenderer(include_charts=include_charts, chart_library=chart_library)
+        
+        with open(filename, 'w', encoding='utf-8') as f:
+            page_count = renderer.render_batch(documents, f)
         
+        print(f"✅ HTML batch report saved: {filename} ({page_count} pages)")
+        print(f"🌐 Open in browser: file://{os.path.abspath(filename)}")
+
+    def save_as_pdf(self, document, filename):
+        """Save report as PDF file with fallback"""
+        try:
+            PdfReportRenderer(self.pdf_font_path).render(document, filename)
+            print(f"✅ PDF report saved: {filename}")
+            
+        except ImportError:
+            print("❌ PDF generation requires 'reportlab' package.")
+            print("💡 Install with: pip install reportlab")
+            print("🔄 Saving as HTML instead...")
+            
+            html_filename = filename.replace('.pdf', '.html')
+            self.save_as_html(document, html_filename)
+
+    def save_batch_as_pdf(self, pages, filename):
+        """Save a multi-page batch report as PDF, laying out one page at a time"""
+        documents = (ReportDocument(page) for page in pages)
+        try:
+            PdfReportRenderer(self.pdf_font_path).render_batch(documents, filename)
+            print(f"✅ PDF batch report saved: {filename}")
+            
+        except ImportError:
+            print("❌ PDF generation requires 'reportlab' package.")
+            print("💡 Install with: pip install reportlab")
+            print("🔄 Saving as HTML instead...")
+            
+            self.save_batch_as_html(pages, filename.replace('.pdf', '.html'))
+
+def worker_process_pool(workers):
+    """Process pool whose workers are started with spawn.
+    
+    Pools here are first used from worker threads; forking a process that
+    has other threads running can copy a held lock into the child and
+    hang it.
+    """
+    import multiprocessing
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+
+def render_report(generator, save_format, payload, filename, batch=False):
+    """Process-pool entry point: render one report file"""
+    if batch:
+        return generator.write_batch(save_format, payload, filename)
+    return generator.write(save_format, payload, filename)
+
+class BackgroundReportWriter:
+    """Queue report jobs and render them off the main thread.
+    
+    Worker threads pull jobs from a queue; PDF jobs are handed on to a
+    process pool because reportlab layout is CPU-bound.
+    """
+    
+    # Formats rendered in a separate process
+    PROCESS_FORMATS = ('pdf',)
+    
+    def __init__(self, workers=2, process_workers=1, tracer=None):
+        self.tracer = tracer or Tracer()
+        self.jobs = queue.Queue()
+        self.process_workers = process_workers
+        self.process_pool = None
+        self.pool_lock = threading.Lock()
+        self.failures = []
+        self.threads = []
+        for i in range(workers):
+            thread = threading.Thread(target=self._worker, name=f"report-writer-{i + 1}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+    
+    def submit(self, generator, save_format, payload, filename, batch=False):
+        """Queue a report (a ReportDocument, or a list of page results) and return immediately"""
+        self.jobs.put((generator, save_format, payload, filename, batch))
+    
+    def pending(self):
+        """Number of queued or in-progress report jobs"""
+        return self.jobs.unfinished_tasks
+    
+    def wait(self):
+        """Block until every queued report has been written"""
+        self.jobs.join()
+    
+    def shutdown(self):
+        """Finish pending writes and release the worker processes"""
+        self.wait()
+        with self.pool_lock:
+            if self.process_pool:
+                self.process_pool.shutdown()
+                self.process_pool = None
+    
+    def _get_process_pool(self):
+        with self.pool_lock:
+            if self.process_pool is None:
+                self.process_pool = worker_process_pool(self.process_workers)
+            return self.process_pool
+    
+    def _worker(self):
+        while True:
+            job = self.jobs.get()
+            save_format, filename = job[1], job[3]
+            try:
+                with self.tracer.span("report.write", format=save_format, filename=filename):
+                    self.render(job)
+            except Exception as e:
+                self.failures.append((filename, e))
+                print(f"❌ Could not save report {filename}: {e}")
+            finally:
+                self.jobs.task_done()
+    
+    def render(self, job):
+        if job[1] not in self.PROCESS_FORMATS:
+            render_report(*job)
+            return
+        try:
+            future = self._get_process_pool().submit(render_report, *job)
+        except (OSError, RuntimeError):
+            # Process pools are unavailable in some sandboxes; render here instead
+            render_report(*job)
+            return
+        try:
+            future.result()
+        except BrokenProcessPool:
+            # Only a dead pool falls back; errors raised by the render itself propagate
+            render_report(*job)
+
+class SpilledText:
+    """Read-only page text held in a memory-mapped file instead of a Python string.
+
+    Supports the str operations the analysis path uses: len(), slicing,
+    split() and str(). A slice decodes only the bytes it covers, using a
+    byte offset recorded every STRIDE characters. split() yields its
+    pieces while reading one window at a time. The file is closed when
+    the handle is garbage collected or close() is called.
+    """
+
+    STRIDE = 4096
+    READ_CHARS = 64 * 1024
+
+    def __init__(self, file, offsets, length, digest):
+        import mmap
+        import weakref
+        self.file = file
+        self.offsets = offsets
+        self.length = length
+        self.sha256 = digest
+        # Empty files can't be mapped
+        self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if offsets[-1] else None
+        self._finalizer = weakref.finalize(self, SpilledText._release, self.map, file)
+
+    @classmethod
+    def spill(cls, text):
+        """Write `text` to an anonymous temp file and map it; the caller can then drop the string"""
+        import tempfile
+        file = tempfile.TemporaryFile()
+        return cls._index(file, (text[start:start + cls.STRIDE] for start in range(0, len(text), cls.STRIDE)),
+                          write=True)
+
+    @classmethod
+    def open(cls, path):
+        """Map an existing UTF-8 file, such as a cached page"""
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            pieces = iter(lambda: f.read(cls.STRIDE), '')
+            return cls._index(open(path, 'rb'), pieces)
+
+    @classmethod
+    def _index(cls, file, pieces, write=False):
+        offsets = [0]
+        length = 0
+        digest = hashlib.sha256()
+        for piece in pieces:
+            data = piece.encode('utf-8')
+            if write:
+                file.write(data)
+            digest.update(data)
+            offsets.append(offsets[-1] + len(data))
+            length += len(piece)
+        file.flush()
+        return cls(file, offsets, length, digest.hexdigest())
+
+    @staticmethod
+    def _release(map, file):
+        if map is not None:
+            map.close()
+        file.close()
+
+    def close(self):
+        self._finalizer()
+
+    def __len__(self):
+        return self.length
+
+    def window(self, start, stop):
+        """Characters [start, stop) decoded from the file"""
+        start, stop = max(0, start), min(stop, self.length)
+        if start >= stop:
+            return ''
+        first, last = start // self.STRIDE, (stop - 1) // self.STRIDE + 1
+        text = self.map[self.offsets[first]:self.offsets[last]].decode('utf-8')
+        return text[start - first * self.STRIDE:stop - first * self.STRIDE]
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.length)
+            return self.window(start, stop) if step == 1 else self.read()[key]
+        if key < 0:
+            key += self.length
+        if not 0 <= key < self.length:
+            raise IndexError("SpilledText index out of range")
+        return self.window(key, key + 1)
+
+    def split(self, sep):
+        """Like str.split(sep), but lazy: yields each piece as the windows are read"""
+        tail = ''
+        for start in range(0, self.length, self.READ_CHARS):
+            pieces = (tail + self.window(start, start + self.READ_CHARS)).split(sep)
+            tail = pieces.pop()
+            yield from pieces
+        yield tail
+
+    def read(self):
+        return self.window(0, self.length)
+
+    __str__ = read
+
+def prepare_page(markdown):
+    """Process-pool entry point: clean a scraped page and fingerprint it; returns (content, simhash)"""
+    content = clean_markdown(markdown)
+    return content, simhash(content)
+
+def prepare_shared_page(name, size):
+    """Process-pool entry point for large pages passed in shared memory.
+    
+    The cleaned text is never longer than the input, so it is written back
+    into the same block; returns (cleaned byte length, simhash).
+    """
+    from multiprocessing import shared_memory
+    # Pool workers share the parent's resource tracker, so attaching here doesn't
+    # register a second owner; the parent unlinks the block
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        content, fingerprint = prepare_page(bytes(block.buf[:size]).decode('utf-8'))
+        data = content.encode('utf-8')
+        block.buf[:len(data)] = data
+        return len(data), fingerprint
+    finally:
+        block.close()
+
+class PagePreprocessor:
+    """Clean and fingerprint scraped pages in worker processes.
+    
+    Small pages are sent to the pool as plain arguments. Large ones go
+    through shared memory so only a name and a length are pickled. The
+    calling thread waits without holding the GIL, so scrapes and model
+    calls on other threads keep running.
+    """
+    
+    SHARED_MEMORY_MIN_BYTES = 256 * 1024
+    
+    def __init__(self, workers=None):
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.pool = None
+        self.lock = threading.Lock()
+    
+    def _get_pool(self):
+        with self.lock:
+            if self.pool is None:
+                self.pool = worker_process_pool(self.workers)
+            return self.pool
+    
+    def prepare(self, markdown):
+        """(cleaned content, simhash) for a scraped page"""
+        if not markdown or self.workers < 1:
+            return prepare_page(markdown)
+        try:
+            data = markdown.encode('utf-8')
+            if len(data) < self.SHARED_MEMORY_MIN_BYTES:
+                return self._get_pool().submit(prepare_page, markdown).result()
+            return self._prepare_shared(data)
+        except (OSError, RuntimeError) as e:
+            # Process pools and shared memory are unavailable in some sandboxes; work here instead
+            print(f"⚠️ Post-processing in-process ({e.__class__.__name__}: {str(e)[:60]})")
+            self.workers = 0
+            return prepare_page(markdown)
+    
+    def _prepare_shared(self, data):
+        from multiprocessing import shared_memory
+        block = shared_memory.SharedMemory(create=True, size=len(data))
+        try:
+            block.buf[:len(data)] = data
+            size, fingerprint = self._get_pool().submit(prepare_shared_page, block.name, len(data)).result()
+            return bytes(block.buf[:size]).decode('utf-8'), fingerprint
+        finally:
+            block.close()
+            block.unlink()
+    
+    def resize(self, workers):
+        """Use a pool of `workers` processes from the next page on"""
+        with self.lock:
+            self.workers = (os.cpu_count() or 1) if workers is None else workers
+            if self.pool:
+                # Pages already submitted still finish
+                self.pool.shutdown(wait=False)
+                self.pool = None
+    
+    def shutdown(self):
+        with self.lock:
+            if self.pool:
+                self.pool.shutdown()
+                self.pool = None
+
+def validate_output(text, mode="analysis"):
+    """Cheap acceptance check for a model answer; extraction output must be JSON"""
+    if not text or not text.strip():
+        return False
+    if mode == "extraction":
+        return parse_json_payload(text) is not None
+    stripped = text.strip()
+    if len(stripped) < 40:
         return False
+    refusals = ("i'm sorry", "i am sorry", "i cannot", "i can't", "as an ai")
+    return not stripped.lower().startswith(refusals)
+
+class ModelRouter:
+    """Pick the cheapest model that fits each request, escalating on failed validation.
     
-    def setup_ollama(self):
-        """Setup Ollama connection"""
-        print("🤖 Setting up Ollama...")
+    Uses measured tokens/sec, model size, context length and each model's
+    past validation pass rate. Measurements persist between runs in a
+    small JSON file.
+    """
+    
+    # Model name used by menus to ask for automatic routing
+    AUTO = "auto"
+    
+    # Smallest model (billions of parameters) tried first for each complexity
+    MIN_PARAMETERS = {'simple': 0, 'moderate': 3, 'complex': 7}
+    
+    # Words that suggest multi-step reasoning rather than lookup or summary
+    COMPLEX_HINTS = ('compare', 'contrast', 'evaluate', 'why', 'strategy', 'strategic', 'reason',
+                     'implication', 'assess', 'recommend', 'critique', 'trade-off', 'tradeoff')
+    SIMPLE_HINTS = ('summarize', 'summary', 'list', 'what is', 'who', 'when', 'where', 'title', 'name')
+    
+    # Pass rate below which a model is skipped once it has enough history
+    MIN_QUALITY = 0.6
+    MIN_RUNS_FOR_QUALITY = 3
+    
+    # Tokens assumed when nothing is known
+    DEFAULT_CONTEXT = 4096
+    EXPECTED_OUTPUT_TOKENS = 400
+    
+    # Weight of the newest measurement in moving averages
+    SMOOTHING = 0.3
+    
+    def __init__(self, stats_path):
+        self.stats_path = stats_path
+        self.lock = threading.Lock()
+        self.stats = {}
+        if os.path.exists(stats_path):
+            try:
+                with open(stats_path, 'r', encoding='utf-8') as f:
+                    self.stats = json.load(f)
+            except (OSError, ValueError):
+                self.stats = {}
+    
+    def _save(self):
+        try:
+            temp_path = self.stats_path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.stats, f, indent=2)
+            os.replace(temp_path, self.stats_path)
+        except OSError:
+            pass
+    
+    def _model_stats(self, model):
+        stats = self.stats.setdefault(model, {'runs': 0, 'tokens_per_second': None, 'latency_seconds': None,
+                                              'validations': 0, 'passes': 0})
+        stats.setdefault('timeouts', 0)
+        return stats
+    
+    def record_metrics(self, model, metrics):
+        """Fold one call's measured speed into the model's running averages"""
+        with self.lock:
+            stats = self._model_stats(model)
+            stats['runs'] += 1
+            if metrics.get('timed_out'):
+                stats['timeouts'] += 1
+            for key in ('tokens_per_second', 'latency_seconds'):
+                value = metrics.get(key)
+                if value is not None:
+                    previous = stats[key]
+                    stats[key] = value if previous is None else \
+                        round(previous + self.SMOOTHING * (value - previous), 3)
+            self._save()
+    
+    def record_validation(self, model, passed):
+        """Track how often a model's output passes validation"""
+        with self.lock:
+            stats = self._model_stats(model)
+            stats['validations'] += 1
+            stats['passes'] += 1 if passed else 0
+            self._save()
+    
+    def quality(self, model):
+        """Validation pass rate, or None without enough history"""
+        stats = self.stats.get(model)
+        if not stats or stats['validations'] < self.MIN_RUNS_FOR_QUALITY:
+            return None
+        return stats['passes'] / stats['validations']
+    
+    def estimate_complexity(self, task, mode="analysis"):
+        """Classify a task as simple, moderate or complex from its wording"""
+        task_lower = (task or "").lower()
+        if any(hint in task_lower for hint in self.COMPLEX_HINTS) or len(task_lower) > 200:
+            return 'complex'
+        if mode == "extraction":
+            return 'moderate'
+        if any(hint in task_lower for hint in self.SIMPLE_HINTS) and len(task_lower) < 100:
+            return 'simple'
+        return 'moderate'
+    
+    def expected_seconds(self, model, info, prompt_tokens):
+        """Rough latency: measured speed when known, otherwise model size as a proxy"""
+        stats = self.stats.get(model, {})
+        speed = stats.get('tokens_per_second')
+        if not speed:
+            parameters = self.parameters(info) or 7.0
+            speed = max(1.0, 120.0 / max(parameters, 0.5))
+        # Prompt processing typically runs about ten times faster than generation
+        return (self.EXPECTED_OUTPUT_TOKENS + prompt_tokens / 10.0) / speed
+    
+    @staticmethod
+    def parameters(info):
+        parameters = parse_parameter_count(info.get('parameters'))
+        if parameters is None and info.get('size'):
+            # ~0.6 GB per billion parameters at common 4-bit quantization
+            parameters = info['size'] / 0.6e9
+        return parameters
+    
+    def route(self, models, model_info, task, content_chars=0, mode="analysis"):
+        """Order models for a request: first choice, then escalation candidates.
         
-        # Try different common Ollama endpoints
-        endpoints = [
-            "http://localhost:11434",
-            "http://127.0.0.1:11434", 
-            "http://0.0.0.0:11434"
-        ]
+        Returns (ordered models, complexity).
+        """
+        complexity = self.estimate_complexity(task, mode)
+        prompt_tokens = (content_chars + len(task or "")) // 4 + 200
+        
+        fitting = []
+        for model in models:
+            info = model_info.get(model, {})
+            context = info.get('context_length') or self.DEFAULT_CONTEXT
+            if prompt_tokens + self.EXPECTED_OUTPUT_TOKENS <= context:
+                fitting.append(model)
+        # Nothing fits the context: send to everything and let the server truncate
+        candidates = fitting or list(models)
         
-        ollama_host = os.getenv('OLLAMA_HOST', endpoints[0])
+        by_size = sorted(candidates, key=lambda m: self.parameters(model_info.get(m, {})) or 0)
+        minimum = self.MIN_PARAMETERS[complexity]
+        eligible = [
+            model for model in by_size
+            if (self.parameters(model_info.get(model, {})) or 0) >= minimum
+            and (self.quality(model) is None or self.quality(model) >= self.MIN_QUALITY)
+        ] or by_size[-1:]
         
-        for endpoint in [ollama_host] + endpoints:
+        first = min(eligible, key=lambda m: self.expected_seconds(m, model_info.get(m, {}), prompt_tokens))
+        first_size = self.parameters(model_info.get(first, {})) or 0
+        escalation = [m for m in by_size if m != first and (self.parameters(model_info.get(m, {})) or 0) >= first_size]
+        return [first] + escalation, complexity
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a host whose circuit breaker is open"""
+
+class CircuitBreaker:
+    """Stop calling a host after repeated transient failures.
+    
+    After `reset_seconds` one trial call is let through while other callers
+    are still turned away; success closes the breaker again, another
+    failure re-opens it at once.
+    """
+    
+    def __init__(self, failure_threshold=5, reset_seconds=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self.lock = threading.Lock()
+    
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if not self.trial_running and time.time() - self.opened_at >= self.reset_seconds:
+                self.trial_running = True
+                return True
+            return False
+    
+    @property
+    def retry_in(self):
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.reset_seconds - (time.time() - self.opened_at))
+    
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+    
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.trial_running or self.failures >= self.failure_threshold:
+                self.opened_at = time.time()
+            self.trial_running = False
+    
+    def release(self):
+        """End a trial call that proved nothing either way; the next caller gets the trial"""
+        with self.lock:
+            self.trial_running = False
+
+# Status codes worth retrying: timeouts, rate limits and server-side errors
+TRANSIENT_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+TRANSIENT_MESSAGES = ('timed out', 'timeout', 'temporarily', 'rate limit', 'too many requests',
+                      'connection reset', 'connection refused', 'connection aborted',
+                      'server disconnected', 'remote end closed', 'overloaded')
+STATUS_IN_MESSAGE = re.compile(r'\b(408|425|429|5\d\d)\b')
+RETRY_AFTER_IN_MESSAGE = re.compile(r'retry[- ]after[:\s]+(\d+(?:\.\d+)?)', re.IGNORECASE)
+
+def error_status(error):
+    """HTTP status code carried by a Firecrawl/Ollama/HTTP client error, if any"""
+    status = getattr(error, 'status_code', None)
+    if status is None:
+        status = getattr(getattr(error, 'response', None), 'status_code', None)
+    if isinstance(status, int) and status > 0:
+        return status
+    match = STATUS_IN_MESSAGE.search(str(error))
+    return int(match.group(1)) if match else None
+
+def is_transient_error(error):
+    """True for failures that may succeed on retry (429s, 5xx, timeouts, dropped connections)"""
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    status = error_status(error)
+    if status is not None:
+        return status in TRANSIENT_STATUS_CODES
+    message = str(error).lower()
+    return any(text in message for text in TRANSIENT_MESSAGES)
+
+AUTH_IN_MESSAGE = re.compile(r'\b(401|403)\b|unauthori[sz]ed|forbidden|invalid (api )?key|invalid token', re.IGNORECASE)
+
+def is_auth_error(error):
+    """True when the service rejected the credentials (401/403) rather than failing to answer"""
+    status = error_status(error)
+    if status is not None:
+        return status in (401, 403)
+    return bool(AUTH_IN_MESSAGE.search(str(error)))
+
+def retry_after_seconds(error):
+    """Delay requested by the server via a Retry-After header or message, or None"""
+    headers = getattr(getattr(error, 'response', None), 'headers', None)
+    value = None
+    if headers is not None:
+        try:
+            value = headers.get('Retry-After')
+        except Exception:
+            value = None
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
             try:
-                print(f"  Trying {endpoint}...")
-                self.ollama_client = Client(host=endpoint)
+                from email.utils import parsedate_to_datetime
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    match = RETRY_AFTER_IN_MESSAGE.search(str(error))
+    return float(match.group(1)) if match else None
+
+class ResilientCaller:
+    """Run upstream calls with retries, per-host circuit breakers and per-job deadlines.
+    
+    Transient errors are retried with full-jitter exponential backoff, or
+    after the server's Retry-After delay. Other errors are raised at once.
+    """
+    
+    def __init__(self, attempts=4, base_delay=1.0, max_delay=30.0, failure_threshold=5, reset_seconds=30.0):
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.breakers = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.stats = {'calls': 0, 'retries': 0, 'failures': 0, 'short_circuited': 0}
+    
+    def count(self, name):
+        # Calls come from many worker threads at once
+        with self.lock:
+            self.stats[name] += 1
+    
+    def breaker(self, host):
+        with self.lock:
+            if host not in self.breakers:
+                self.breakers[host] = CircuitBreaker(self.failure_threshold, self.reset_seconds)
+            return self.breakers[host]
+    
+    @contextmanager
+    def deadline(self, seconds):
+        """Bound all calls (and their retries) in this block to `seconds` in total"""
+        previous = getattr(self.local, 'deadline', None)
+        deadline = time.time() + seconds if seconds else None
+        if previous is not None and (deadline is None or previous < deadline):
+            deadline = previous
+        self.local.deadline = deadline
+        try:
+            yield
+        finally:
+            self.local.deadline = previous
+    
+    def remaining(self):
+        deadline = getattr(self.local, 'deadline', None)
+        return None if deadline is None else deadline - time.time()
+    
+    def call(self, host, func, *args, **kwargs):
+        breaker = self.breaker(host)
+        for attempt in range(1, self.attempts + 1):
+            remaining = self.remaining()
+            if remaining is not None and remaining <= 0:
+                raise TimeoutError(f"deadline exceeded before calling {host}")
+            if not breaker.allow():
+                self.count('short_circuited')
+                raise CircuitOpenError(f"{host} keeps failing - paused for {breaker.retry_in:.0f}s")
+            
+            self.count('calls')
+            try:
+                result = func(*args, **kwargs)
+            except BaseException as e:
+                if not isinstance(e, Exception) or not is_transient_error(e):
+                    # Not a sign the host is down; a half-open trial is handed to the next caller
+                    breaker.release()
+                    raise
+                breaker.record_failure()
+                self.count('failures')
+                if attempt == self.attempts:
+                    raise
                 
-                # Test connection
-                models_response = self.ollama_client.list()
-                print(f"✅ Connected to Ollama at {endpoint}")
+                delay = retry_after_seconds(e)
+                remaining = self.remaining()
+                if delay is None:
+                    delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+                elif delay > self.max_delay and remaining is None:
+                    # Nothing else bounds this call; fail now rather than hang for the server's delay
+                    raise TimeoutError(f"{host} asked to retry after {delay:.0f}s "
+                                       f"(more than {self.max_delay:.0f}s): {e}") from e
+                if remaining is not None and delay >= remaining:
+                    raise TimeoutError(f"deadline exceeded while retrying {host}: {e}") from e
                 
-                # Setup model manager
-                self.model_manager = OllamaModelManager(self.ollama_client)
-                self.working_models = self.model_manager.get_working_models()
+                self.count('retries')
+                print(f"🔁 {host}: {str(e)[:60]} - retry {attempt}/{self.attempts - 1} in {delay:.1f}s")
+                time.sleep(delay)
+            else:
+                breaker.record_success()
+                return result
+
+class SingleFlight:
+    """Share one in-flight call between concurrent callers asking for the same key.
+    
+    The first caller for a key runs the call; callers arriving while it
+    runs wait and get its result (or its exception). Nothing is cached
+    once the call finishes.
+    """
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.stats = {'calls': 0, 'shared': 0}
+    
+    @staticmethod
+    def key(*parts):
+        """Stable key for JSON-like arguments (dict order doesn't matter)"""
+        encoded = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+        return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+    
+    def do(self, key, func, *args, **kwargs):
+        """Run func once per key at a time; returns (result, shared)"""
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = {'done': threading.Event(), 'result': None, 'error': None}
+                self.calls[key] = call
+                self.stats['calls'] += 1
+            else:
+                self.stats['shared'] += 1
+        
+        if not leader:
+            call['done'].wait()
+            if call['error'] is not None:
+                raise call['error']
+            return call['result'], True
+        
+        try:
+            call['result'] = func(*args, **kwargs)
+            return call['result'], False
+        except Exception as e:
+            call['error'] = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call['done'].set()
+
+class Tracer:
+    """Opt-in timing spans, exported as Chrome trace-event JSON, plus a profiler hook.
+    
+    Spans nest per thread and carry OpenTelemetry-style fields (trace id,
+    span id, parent span id, status, attributes), so a trace opens in
+    chrome://tracing or Perfetto and maps directly onto an OTel exporter.
+    While disabled, span() costs one generator and records nothing.
+    """
+    
+    PROFILERS = ('cprofile', 'pyinstrument')
+    
+    def __init__(self, enabled=False, profiler=None):
+        self.enabled = enabled
+        self.profiler = profiler
+        self.trace_id = os.urandom(16).hex()
+        self.spans = []
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        # cProfile and pyinstrument profile one block at a time
+        self.profiling = threading.Lock()
+        self.origin = time.perf_counter()
+        self.started = datetime.now()
+    
+    @contextmanager
+    def span(self, name, **attributes):
+        """Time the block as a span; yields its attribute dict so results can be added"""
+        if not self.enabled:
+            yield attributes
+            return
+        stack = getattr(self.local, 'stack', None)
+        if stack is None:
+            stack = self.local.stack = []
+        span = {
+            "name": name,
+            "span_id": os.urandom(8).hex(),
+            "parent_span_id": stack[-1]['span_id'] if stack else None,
+            "attributes": attributes,
+            "status": "OK",
+            "thread": threading.get_ident(),
+            "thread_name": threading.current_thread().name
+        }
+        stack.append(span)
+        span['start'] = time.perf_counter()
+        try:
+            yield attributes
+        except BaseException as e:
+            span['status'] = "ERROR"
+            attributes['error'] = f"{e.__class__.__name__}: {e}"[:200]
+            raise
+        finally:
+            span['end'] = time.perf_counter()
+            stack.pop()
+            with self.lock:
+                self.spans.append(span)
+    
+    def chrome_trace(self):
+        """Spans as a Chrome trace-event document (complete 'X' events, microseconds)"""
+        pid = os.getpid()
+        events = [{"name": "process_name", "ph": "M", "pid": pid, "args": {"name": "firecrawl-ollama"}}]
+        threads = {}
+        with self.lock:
+            spans = list(self.spans)
+        for span in spans:
+            threads[span['thread']] = span['thread_name']
+            events.append({
+                "name": span['name'],
+                "cat": span['name'].split('.')[0],
+                "ph": "X",
+                "ts": round((span['start'] - self.origin) * 1e6, 1),
+                "dur": round((span['end'] - span['start']) * 1e6, 1),
+                "pid": pid,
+                "tid": span['thread'],
+                "args": {**span['attributes'], "trace_id": self.trace_id, "span_id": span['span_id'],
+                         "parent_span_id": span['parent_span_id'], "status": span['status']}
+            })
+        for tid, name in threads.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}})
+        return {"traceEvents": events, "displayTimeUnit": "ms",
+                "otherData": {"trace_id": self.trace_id, "started": self.started.isoformat()}}
+    
+    def summary(self):
+        """(name, calls, total seconds) per span name, slowest total first"""
+        totals = {}
+        with self.lock:
+            for span in self.spans:
+                calls, seconds = totals.get(span['name'], (0, 0.0))
+                totals[span['name']] = (calls + 1, seconds + span['end'] - span['start'])
+        return sorted(((name, calls, seconds) for name, (calls, seconds) in totals.items()),
+                      key=lambda row: row[2], reverse=True)
+    
+    def write(self, directory):
+        """Save the trace as trace_<timestamp>.json and print where the time went; returns the path"""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"trace_{self.started.strftime('%Y%m%d_%H%M%S')}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.chrome_trace(), f, default=str)
+        print(f"\n🧵 Trace saved: {path} (open in https://ui.perfetto.dev or chrome://tracing)")
+        for name, calls, seconds in self.summary()[:12]:
+            print(f"   {name:<24} {calls:>5} × {seconds / calls:8.3f}s = {seconds:8.2f}s")
+        return path
+    
+    @contextmanager
+    def profile(self, name, directory):
+        """Profile the block when a profiler is configured, saving the result under `directory`.
+        
+        cProfile writes a .prof file (python -m pstats, snakeviz);
+        pyinstrument writes an HTML flame view. Blocks that start while
+        another is being profiled run unprofiled.
+        """
+        if not self.profiler or not self.profiling.acquire(blocking=False):
+            yield
+            return
+        try:
+            os.makedirs(directory, exist_ok=True)
+            stem = os.path.join(directory, f"profile_{re.sub(r'[^A-Za-z0-9_-]+', '_', name)}_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+            if self.profiler == 'pyinstrument':
+                try:
+                    from pyinstrument import Profiler
+                except ImportError:
+                    print("⚠️ pyinstrument not installed - using cProfile instead (pip install pyinstrument)")
+                    self.profiler = 'cprofile'
+            
+            if self.profiler == 'pyinstrument':
+                profiler = Profiler()
+                profiler.start()
+                try:
+                    yield
+                finally:
+                    profiler.stop()
+                    with open(stem + '.html', 'w', encoding='utf-8') as f:
+                        f.write(profiler.output_html())
+                    print(f"🔬 Profile saved: {stem}.html")
+            else:
+                import cProfile
+                profiler = cProfile.Profile()
+                profiler.enable()
+                try:
+                    yield
+                finally:
+                    profiler.disable()
+                    profiler.dump_stats(stem + '.prof')
+                    print(f"🔬 Profile saved: {stem}.prof (python -m pstats {stem}.prof, or snakeviz)")
+        finally:
+            self.profiling.release()
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate_per_minute` requests on average, bursts up to `burst`"""
+    
+    def __init__(self, rate_per_minute, burst=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(burst or max(1, rate_per_minute))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        """Take one token, sleeping until one is available; returns seconds waited"""
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+class ScrapeThrottle:
+    """Firecrawl request pacing: a global rate limit plus a minimum gap per target domain"""
+    
+    def __init__(self, requests_per_minute=None, domain_delay=0.0):
+        self.next_allowed = {}
+        self.lock = threading.Lock()
+        self.waited_seconds = 0.0
+        self.configure(requests_per_minute, domain_delay)
+    
+    def configure(self, requests_per_minute=None, domain_delay=0.0):
+        """Change the limits; callers already waiting finish under the old ones"""
+        self.bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.domain_delay = domain_delay or 0.0
+    
+    def wait(self, url):
+        """Block until `url` may be scraped"""
+        waited = 0.0
+        if self.domain_delay:
+            domain = urlparse(url).netloc
+            with self.lock:
+                now = time.monotonic()
+                start = max(now, self.next_allowed.get(domain, now))
+                # Reserve the slot now so concurrent callers queue behind it
+                self.next_allowed[domain] = start + self.domain_delay
+            if start > now:
+                time.sleep(start - now)
+                waited += start - now
+        if self.bucket:
+            waited += self.bucket.acquire()
+        with self.lock:
+            self.waited_seconds += waited
+        return waited
+
+def interleave_by_domain(urls):
+    """Round-robin URLs across domains (order kept within each domain).
+    
+    Consecutive requests then go to different sites, so per-domain delays
+    rarely stall a batch and no single site dominates the start of a run.
+    """
+    by_domain = {}
+    for url in urls:
+        by_domain.setdefault(urlparse(url).netloc, []).append(url)
+    queues = list(by_domain.values())
+    ordered = []
+    while queues:
+        for domain_urls in queues:
+            ordered.append(domain_urls.pop(0))
+        queues = [domain_urls for domain_urls in queues if domain_urls]
+    return ordered
+
+class CreditBudget:
+    """Firecrawl credits a run may spend; None means unlimited"""
+    
+    def __init__(self, limit=None):
+        self.limit = limit
+        self.spent = 0
+        self.lock = threading.Lock()
+    
+    @property
+    def remaining(self):
+        return None if self.limit is None else max(0, self.limit - self.spent)
+    
+    def can_spend(self, credits=1):
+        return self.limit is None or self.spent + credits <= self.limit
+    
+    def spend(self, credits=1):
+        with self.lock:
+            self.spent += credits
+    
+    def refund(self, credits=1):
+        with self.lock:
+            self.spent = max(0, self.spent - credits)
+
+def normalize_snapshot(markdown):
+    """Cleaned markdown with volatile whitespace removed, used for change comparison"""
+    lines = [line.strip() for line in clean_markdown(markdown).splitlines()]
+    return "\n".join(line for line in lines if line)
+
+def split_sections(snapshot):
+    """(heading, text) pairs, splitting at markdown headings; text before the first heading has heading ''"""
+    sections = []
+    heading, lines = "", []
+    for line in snapshot.splitlines():
+        if line.startswith('#'):
+            if lines:
+                sections.append((heading, "\n".join(lines)))
+            heading, lines = line.lstrip('#').strip(), [line]
+        else:
+            lines.append(line)
+    if lines:
+        sections.append((heading, "\n".join(lines)))
+    return sections
+
+class PageMonitor:
+    """Content hashes, normalized snapshots and last analyses of monitored URLs.
+    
+    State lives in `<directory>/index.json` plus one snapshot file per URL,
+    so only pages whose content really changed need a new LLM call.
+    """
+    
+    # Changes touching fewer lines than this fraction of the page (and at most
+    # MINOR_CHANGE_LINES lines) count as noise - counters, dates, rotating banners
+    MINOR_CHANGE_FRACTION = 0.02
+    MINOR_CHANGE_LINES = 3
+    
+    # Unified diff lines kept in the change report
+    MAX_DIFF_LINES = 60
+    
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.index_path = os.path.join(directory, 'index.json')
+        self.index = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self.index = json.load(f)
+    
+    def snapshot_path(self, url):
+        return os.path.join(self.directory, hashlib.sha1(url.encode('utf-8')).hexdigest()[:16] + '.md')
+    
+    def previous(self, url):
+        """(index entry, snapshot text) from the last check, or (None, None)"""
+        entry = self.index.get(url)
+        if not entry or not os.path.exists(self.snapshot_path(url)):
+            return None, None
+        with open(self.snapshot_path(url), 'r', encoding='utf-8') as f:
+            return entry, f.read()
+    
+    def compare(self, url, snapshot):
+        """Classify a new snapshot against the stored one.
+        
+        Returns a dict with status (new / unchanged / minor / changed), line
+        counts, changed and removed section headings, the changed sections'
+        text and a trimmed unified diff.
+        """
+        import difflib
+        
+        content_hash = hashlib.sha256(snapshot.encode('utf-8')).hexdigest()
+        entry, old_snapshot = self.previous(url)
+        change = {"status": "new", "content_hash": content_hash, "lines_added": 0, "lines_removed": 0,
+                  "sections_changed": [], "sections_removed": [], "changed_text": "", "diff": ""}
+        if entry is None:
+            return change
+        if entry['content_hash'] == content_hash:
+            change["status"] = "unchanged"
+            return change
+        
+        old_lines = old_snapshot.splitlines()
+        new_lines = snapshot.splitlines()
+        diff = list(difflib.unified_diff(old_lines, new_lines, lineterm='', n=1))
+        added = sum(1 for line in diff if line.startswith('+') and not line.startswith('+++'))
+        removed = sum(1 for line in diff if line.startswith('-') and not line.startswith('---'))
+        
+        old_sections = split_sections(old_snapshot)
+        old_texts = {text for _, text in old_sections}
+        new_sections = split_sections(snapshot)
+        changed = [(heading, text) for heading, text in new_sections if text not in old_texts]
+        new_headings = {heading for heading, _ in new_sections}
+        
+        change.update({
+            "lines_added": added,
+            "lines_removed": removed,
+            "sections_changed": [heading or "(top of page)" for heading, _ in changed],
+            "sections_removed": [heading for heading, _ in old_sections if heading and heading not in new_headings],
+            "changed_text": "\n\n".join(text for _, text in changed),
+            "diff": "\n".join(diff[:self.MAX_DIFF_LINES]) + ("\n[...]" if len(diff) > self.MAX_DIFF_LINES else "")
+        })
+        changed_lines = max(added, removed)
+        minor = changed_lines <= self.MINOR_CHANGE_LINES and \
+            changed_lines <= self.MINOR_CHANGE_FRACTION * max(len(old_lines), len(new_lines))
+        change["status"] = "minor" if minor else "changed"
+        return change
+    
+    def record(self, url, snapshot, content_hash, analysis=None, change_summary=None):
+        """Store the snapshot as the new baseline, with a new full analysis or change summary"""
+        with open(self.snapshot_path(url), 'w', encoding='utf-8') as f:
+            f.write(snapshot)
+        entry = self.index.get(url, {})
+        entry.update({"content_hash": content_hash, "last_checked": datetime.now().isoformat()})
+        if analysis is not None:
+            entry.update({"analysis": analysis, "last_analyzed": entry["last_checked"], "last_change": None})
+        if change_summary is not None:
+            entry.update({"last_change": change_summary, "last_changed": entry["last_checked"]})
+        self.index[url] = entry
+        self.save_index()
+    
+    def mark_checked(self, url):
+        """Note a check without moving the baseline, so small edits still add up to a change"""
+        self.index[url]["last_checked"] = datetime.now().isoformat()
+        self.save_index()
+    
+    def save_index(self):
+        temp_path = self.index_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f, indent=2, ensure_ascii=False)
+        os.replace(temp_path, self.index_path)
+
+class BatchJournal:
+    """Append-only record of per-URL progress through a batch, so a restart resumes it.
+    
+    `<directory>/journal.jsonl` gets one line per finished stage (scraped,
+    analyzed, and finally reported for the whole batch). Scraped pages are
+    cached as cleaned markdown next to it. A torn last line from a crash is
+    ignored, so the worst case is repeating the one stage in progress.
+    """
+    
+    def __init__(self, directory):
+        self.directory = directory
+        self.pages_dir = os.path.join(directory, 'pages')
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, 'journal.jsonl')
+        self.lock = threading.Lock()
+        import weakref
+        # Mappings handed out by cached_page; closed before the cache is deleted
+        self.open_pages = weakref.WeakSet()
+        self.load()
+    
+    @staticmethod
+    def batch_id(urls, task, model):
+        """The same URLs, task and model always map to the same journal"""
+        return hashlib.sha1(json.dumps([urls, task, model], ensure_ascii=False).encode('utf-8')).hexdigest()[:12]
+    
+    def load(self):
+        self.fingerprints = {}
+        self.results = {}
+        self.reports = None
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if entry['stage'] == 'scraped':
+                    self.fingerprints[entry['url']] = entry['fingerprint']
+                elif entry['stage'] == 'analyzed':
+                    self.results[entry['url']] = entry['result']
+                elif entry['stage'] == 'reported':
+                    self.reports = entry['reports']
+    
+    @property
+    def started(self):
+        return bool(self.fingerprints or self.results)
+    
+    @property
+    def complete(self):
+        return self.reports is not None
+    
+    def page_path(self, url):
+        return os.path.join(self.pages_dir, hashlib.sha1(url.encode('utf-8')).hexdigest()[:16] + '.md')
+    
+    def _append(self, entry):
+        line = json.dumps(entry, ensure_ascii=False, default=str) + '\n'
+        with self.lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+    
+    def has_page(self, url):
+        return url in self.fingerprints and os.path.exists(self.page_path(url))
+    
+    def cached_page(self, url):
+        """(cleaned content as a SpilledText mapping of the cache file, simhash), or None"""
+        if not self.has_page(url):
+            return None
+        page = SpilledText.open(self.page_path(url))
+        with self.lock:
+            self.open_pages.add(page)
+        return page, self.fingerprints[url]
+    
+    def record_scrape(self, url, content, fingerprint):
+        # The page file is complete before the journal points at it
+        os.makedirs(self.pages_dir, exist_ok=True)
+        temp_path = self.page_path(url) + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8', newline='') as f:
+            f.write(content)
+        os.replace(temp_path, self.page_path(url))
+        self._append({"url": url, "stage": "scraped", "fingerprint": fingerprint})
+        with self.lock:
+            self.fingerprints[url] = fingerprint
+    
+    def record_result(self, url, result):
+        self._append({"url": url, "stage": "analyzed", "result": result})
+        self.results[url] = result
+    
+    def record_reports(self, filenames):
+        """Mark the batch finished and drop its page cache"""
+        self._append({"stage": "reported", "reports": filenames})
+        self.reports = filenames
+        self.remove(self.pages_dir)
+    
+    def reset(self):
+        """Forget all progress and start the batch over"""
+        self.remove(self.directory)
+        os.makedirs(self.directory, exist_ok=True)
+        self.load()
+    
+    def remove(self, path):
+        """Delete `path` once no page in it is mapped; files that can't be removed are reported"""
+        import shutil
+        with self.lock:
+            pages = list(self.open_pages)
+        for page in pages:
+            # Windows can't delete a file that is still mapped
+            page.close()
+        if not os.path.exists(path):
+            return
+        
+        def report(function, failed_path, exc_info):
+            print(f"⚠️ Could not remove {failed_path}: {exc_info[1]}")
+        
+        shutil.rmtree(path, onerror=report)
+
+class JobQueue:
+    """Persistent SQLite queue of analysis jobs for unattended workers.
+    
+    Jobs are claimed highest priority first with a lease. A worker that
+    dies mid-job simply lets its lease expire and the job is handed out
+    again (at-least-once). Identical pending jobs are stored once.
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job_key TEXT NOT NULL,
+            url TEXT NOT NULL,
+            task TEXT NOT NULL,
+            model TEXT,
+            formats TEXT,
+            priority INTEGER NOT NULL DEFAULT 0,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL DEFAULT 3,
+            available_at REAL NOT NULL,
+            lease_until REAL,
+            worker TEXT,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL,
+            result TEXT,
+            error TEXT
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS jobs_active_key ON jobs (job_key) WHERE status IN ('pending', 'running');
+        CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, priority DESC, id);
+    """
+    
+    # Seconds before a failed job is offered again, multiplied by its attempt number
+    RETRY_DELAY = 30
+    
+    def __init__(self, path):
+        import sqlite3
+        self.sqlite3 = sqlite3
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self.connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(self.SCHEMA)
+    
+    @contextmanager
+    def connect(self):
+        # One short-lived connection per operation keeps the queue safe to share across threads
+        connection = self.sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        connection.row_factory = self.sqlite3.Row
+        try:
+            yield connection
+        finally:
+            connection.close()
+    
+    @staticmethod
+    def job_key(url, task, model, formats):
+        return hashlib.sha256("\n".join([url, task, model or "", ",".join(formats or [])]).encode('utf-8')).hexdigest()
+    
+    def enqueue(self, url, task, model=None, formats=None, priority=0, max_attempts=3):
+        """Add a job; returns (job id, True) or (existing id, False) for a duplicate pending job"""
+        formats = parse_save_formats(formats)
+        key = self.job_key(url, task, model, formats)
+        now = time.time()
+        with self.connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            existing = connection.execute(
+                "SELECT id FROM jobs WHERE job_key = ? AND status IN ('pending', 'running')", (key,)
+            ).fetchone()
+            if existing:
+                # A duplicate can still raise the priority of the queued job
+                connection.execute("UPDATE jobs SET priority = MAX(priority, ?), updated_at = ? WHERE id = ?",
+                                   (priority, now, existing['id']))
+                connection.execute("COMMIT")
+                return existing['id'], False
+            cursor = connection.execute(
+                "INSERT INTO jobs (job_key, url, task, model, formats, priority, max_attempts, available_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, url, task, model, ",".join(formats), priority, max_attempts, now, now, now)
+            )
+            connection.execute("COMMIT")
+            return cursor.lastrowid, True
+    
+    def claim(self, worker, lease_seconds):
+        """Lease the next runnable job to `worker`; returns a dict or None.
+        
+        Running jobs whose lease has expired are treated as runnable - their
+        worker crashed or was killed. If they have no attempts left they are
+        marked failed instead, so a job that kills its worker isn't retried forever.
+        """
+        now = time.time()
+        with self.connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.execute(
+                "UPDATE jobs SET status = 'failed', error = 'lease expired', lease_until = NULL, updated_at = ? "
+                "WHERE status = 'running' AND lease_until < ? AND attempts >= max_attempts", (now, now)
+            )
+            row = connection.execute(
+                "SELECT * FROM jobs WHERE (status = 'pending' AND available_at <= ?) "
+                "OR (status = 'running' AND lease_until < ? AND attempts < max_attempts) "
+                "ORDER BY priority DESC, id LIMIT 1", (now, now)
+            ).fetchone()
+            if row is None:
+                connection.execute("COMMIT")
+                return None
+            connection.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, lease_until = ?, worker = ?, updated_at = ? "
+                "WHERE id = ?", (now + lease_seconds, worker, now, row['id'])
+            )
+            connection.execute("COMMIT")
+        job = dict(row)
+        job['attempts'] += 1
+        job['formats'] = parse_save_formats(job['formats'])
+        return job
+    
+    def complete(self, job_id, result):
+        with self.connect() as connection:
+            connection.execute(
+                "UPDATE jobs SET status = 'done', result = ?, error = NULL, lease_until = NULL, updated_at = ? WHERE id = ?",
+                (json.dumps(result, default=str), time.time(), job_id)
+            )
+    
+    def fail(self, job_id, error, attempts, max_attempts, retry=True):
+        """Record a failure; the job is offered again later until it runs out of attempts"""
+        now = time.time()
+        if retry and attempts < max_attempts:
+            status, available_at = 'pending', now + self.RETRY_DELAY * attempts
+        else:
+            status, available_at = 'failed', now
+        with self.connect() as connection:
+            connection.execute(
+                "UPDATE jobs SET status = ?, error = ?, available_at = ?, lease_until = NULL, updated_at = ? WHERE id = ?",
+                (status, str(error)[:500], available_at, now, job_id)
+            )
+        return status
+    
+    def counts(self):
+        with self.connect() as connection:
+            rows = connection.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row['status']: row['n'] for row in rows}
+
+class Settings:
+    """Typed settings from config.py, an optional config.toml and the environment.
+    
+    Later sources win: built-in defaults, config.py, config.toml, then
+    environment variables (FIRECRAWL_OLLAMA_<NAME>, plus the plain
+    FIRECRAWL_API_KEY and OLLAMA_HOST). Values are parsed once and cached;
+    the files are re-read only when they change on disk, and `on_change`
+    is called with the names of settings whose value changed.
+    """
+    
+    # name -> (type, default); None means "not set"
+    SCHEMA = {
+        'FIRECRAWL_API_KEY': (str, None),
+        'OLLAMA_HOST': (str, 'http://localhost:11434'),
+        'REPORTS_DIR': (str, 'firecrawl_reports'),
+        'DEFAULT_SAVE_FORMAT': (str, 'html'),
+        'CHARTS_OFFLINE': (bool, False),
+        'CHART_JS_PATH': (str, None),
+        'PDF_FONT_PATH': (str, None),
+        'PREFERRED_MODELS': (dict, {}),
+        'MAX_CONTENT_LENGTH': (int, 4000),
+        'MAX_RETRIES': (int, 3),
+        'RETRY_DELAY': (float, 1.0),
+        'PROCESSING_TIMEOUT': (float, 300.0),
+        'REQUESTS_PER_MINUTE': (float, 10.0),
+        'DOMAIN_DELAY_SECONDS': (float, 1.0),
+        'FIRECRAWL_CREDIT_BUDGET': (int, None),
+        'WORKER_CONCURRENCY': (int, 2),
+        'JOB_QUEUE_PATH': (str, None),
+        'POSTPROCESS_WORKERS': (int, None),
+        'EMBEDDING_MODEL': (str, None),
+        'RETRIEVAL_TOP_K': (int, 8),
+        'RETRIEVAL_CHUNK_CHARS': (int, 800),
+        'VECTOR_INDEX_DIR': (str, None),
+        'SERVER_WORKERS': (int, 4),
+        'SERVER_KEEP_ALIVE': (str, '30m'),
+        'SERVER_WARM_MODELS': (list, None),
+        # Per-mode output token cap and wall-clock limit (seconds) for one generation
+        'NUM_PREDICT': (dict, {'default': 2048, 'qa': 1024}),
+        'GENERATION_TIMEOUT': (dict, {'default': 300, 'qa': 120}),
+    }
+    
+    ENV_PREFIX = 'FIRECRAWL_OLLAMA_'
+    PLAIN_ENV = ('FIRECRAWL_API_KEY', 'OLLAMA_HOST')
+    
+    # Seconds between checks of the config files for edits
+    CHECK_INTERVAL = 2.0
+    
+    def __init__(self, py_path='config.py', toml_path='config.toml', on_change=None):
+        self.py_path = py_path
+        self.toml_path = toml_path
+        self.on_change = on_change
+        self.lock = threading.RLock()
+        self.values = {name: default for name, (_, default) in self.SCHEMA.items()}
+        self.sources = {name: 'default' for name in self.SCHEMA}
+        self.extra = {}
+        self.signature = self.file_signature()
+        self.last_check = time.monotonic()
+        self.reload()
+    
+    def file_signature(self):
+        signature = []
+        for path in (self.py_path, self.toml_path):
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+    
+    def load_python(self):
+        if not os.path.exists(self.py_path):
+            return {}
+        import importlib.util
+        spec = importlib.util.spec_from_file_location("config", self.py_path)
+        config = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(config)
+        return {name: getattr(config, name) for name in dir(config) if name.isupper()}
+    
+    def load_toml(self):
+        if not os.path.exists(self.toml_path):
+            return {}
+        try:
+            import tomllib
+        except ImportError:
+            try:
+                import tomli as tomllib
+            except ImportError:
+                print(f"⚠️ {self.toml_path} ignored - reading TOML needs Python 3.11+ or: pip install tomli")
+                return {}
+        with open(self.toml_path, 'rb') as f:
+            return {name.upper(): value for name, value in tomllib.load(f).items()}
+    
+    def load_environment(self):
+        values = {}
+        for name in self.SCHEMA:
+            value = os.environ.get(self.ENV_PREFIX + name)
+            if value is None and name in self.PLAIN_ENV:
+                value = os.environ.get(name)
+            if value is not None:
+                values[name] = value
+        return values
+    
+    @classmethod
+    def coerce(cls, name, value):
+        """Convert a raw value (possibly an environment string) to the setting's type"""
+        kind = cls.SCHEMA[name][0]
+        if isinstance(value, str) and kind is not str:
+            value = value.strip()
+            if value.lower() in ('', 'none', 'null'):
+                return None
+        if value is None or (kind is not bool and isinstance(value, kind)):
+            return value
+        try:
+            if kind is bool:
+                if isinstance(value, (bool, int)):
+                    return bool(value)
+                if value.lower() in ('1', 'true', 'yes', 'on'):
+                    return True
+                if value.lower() in ('0', 'false', 'no', 'off'):
+                    return False
+            elif kind is int and not isinstance(value, bool):
+                number = float(value)
+                if number == int(number):
+                    return int(number)
+            elif kind is float and not isinstance(value, bool):
+                return float(value)
+            elif kind is str and isinstance(value, (int, float)):
+                return str(value)
+            elif kind is list:
+                if isinstance(value, tuple):
+                    return list(value)
+                if isinstance(value, str):
+                    if value.startswith('['):
+                        return list(json.loads(value))
+                    return [item.strip() for item in value.split(',') if item.strip()]
+            elif kind is dict and isinstance(value, str):
+                parsed = json.loads(value)
+                if isinstance(parsed, dict):
+                    return parsed
+        except (TypeError, ValueError, AttributeError):
+            pass
+        raise ValueError(f"{name} should be {kind.__name__}, got {value!r}")
+    
+    def reload(self):
+        """Re-read every source; returns the names of settings whose value changed.
+        
+        A file that fails to load (e.g. saved mid-edit) keeps its previous
+        values until it loads again.
+        """
+        values = {name: default for name, (_, default) in self.SCHEMA.items()}
+        sources = {name: 'default' for name in self.SCHEMA}
+        extra = {}
+        for source, loader in ((self.py_path, self.load_python), (self.toml_path, self.load_toml),
+                               ('environment', self.load_environment)):
+            try:
+                raw = loader()
+            except Exception as e:
+                print(f"⚠️ Could not load {source}: {e} - keeping previous settings")
+                raw = {name: value for name, value in self.values.items() if self.sources[name] == source}
+                raw.update(self.extra if source == self.py_path else {})
+            for name, value in raw.items():
+                if name not in self.SCHEMA:
+                    extra[name] = value
+                    continue
+                try:
+                    values[name] = self.coerce(name, value)
+                    sources[name] = source
+                except ValueError as e:
+                    print(f"⚠️ {source}: {e} - using {values[name]!r}")
+        
+        with self.lock:
+            changed = [name for name in self.SCHEMA if values[name] != self.values[name]]
+            changed += [name for name in set(extra) | set(self.extra) if extra.get(name) != self.extra.get(name)]
+            self.values, self.sources, self.extra = values, sources, extra
+        return changed
+    
+    def refresh(self, force=False):
+        """Reload if a config file changed on disk; returns the changed setting names"""
+        now = time.monotonic()
+        if not force and now - self.last_check < self.CHECK_INTERVAL:
+            return []
+        with self.lock:
+            self.last_check = now
+            signature = self.file_signature()
+            if not force and signature == self.signature:
+                return []
+            self.signature = signature
+            changed = self.reload()
+        if changed:
+            print(f"🔄 Configuration reloaded: {', '.join(changed)}")
+            if self.on_change:
+                self.on_change(changed)
+        return changed
+    
+    def get(self, name, default=None):
+        """A setting's current value; names outside SCHEMA come from config.py/config.toml as-is"""
+        self.refresh()
+        if name in self.SCHEMA:
+            return self.values[name]
+        return self.extra.get(name, default)
+
+class FirecrawlOllamaSystem:
+    """Main system class"""
+    
+    def __init__(self):
+        self.app = None
+        self.ollama_client = None
+        self.model_manager = None
+        self.working_models = []
+        self.model_categories = {}
+        self.vector_store = None
+        self.model_router = None
+        self.resilience = None
+        self.scrape_throttle = None
+        self.single_flight = SingleFlight()
+        # Off unless --trace / --profile turn it on
+        self.tracer = Tracer()
+        self.settings = Settings(on_change=self.apply_settings)
+        
+        # Create reports directory
+        self.reports_dir = self.settings.get('REPORTS_DIR')
+        if not os.path.exists(self.reports_dir):
+            os.makedirs(self.reports_dir)
+        
+        # Automated runs (no terminal attached) never stop to prompt
+        self.interactive = sys.stdin.isatty()
+        
+        # Reports are rendered in the background so analysis returns immediately
+        self.report_writer = BackgroundReportWriter(tracer=self.tracer)
+        self.preprocessor = None
+    
+    def setup_firecrawl(self):
+        """Setup Firecrawl with user's API key - auto-save/load from config"""
+        print("🔥 Setting up Firecrawl...")
+        
+        # Environment variable, config.toml or config.py - see Settings
+        api_key = self.get_config_value('FIRECRAWL_API_KEY')
+        if api_key == 'your-api-key-here':
+            api_key = None
+        if api_key:
+            print(f"✅ Using API key from {self.settings.sources['FIRECRAWL_API_KEY']}")
+        
+        # Prompt user if no key found
+        if not api_key:
+            print("\n🔑 Firecrawl API Key Setup:")
+            print("You can get a free API key at: https://firecrawl.dev")
+            print("This will be saved so you only need to enter it once.")
+            
+            api_key = input("\nEnter your Firecrawl API key: ").strip()
+            
+            if not api_key:
+                print("❌ API key required to continue")
+                return False
+            
+            # Save the API key to config.py
+            self.save_api_key_to_config(api_key)
+        
+        # Test the API key
+        try:
+            self.app = FirecrawlApp(api_key=api_key)
+            
+            # Test the connection with multiple URLs; transient errors are retried like any scrape
+            test_urls = ["https://example.com", "https://httpbin.org/html"]
+            
+            last_error = None
+            for test_url in test_urls:
+                try:
+                    self.scrape_markdown(test_url)
+                    print("✅ Firecrawl connected successfully")
+                    return True
+                except Exception as e:
+                    if is_auth_error(e):
+                        print(f"❌ Firecrawl rejected the API key: {str(e)[:80]}")
+                        return self.retry_api_key_setup()
+                    last_error = e
+            
+            # Only a rejected key is worth re-entering; outages and rate limits pass
+            print(f"⚠️ Could not reach Firecrawl right now ({str(last_error)[:80]})")
+            print("   Keeping your API key - scrapes will retry when you run an analysis")
+            return True
+            
+        except Exception as e:
+            print(f"❌ Firecrawl setup failed: {e}")
+            return self.retry_api_key_setup()
+    
+    def save_api_key_to_config(self, api_key):
+        """Save API key to config.py file, keeping any other settings already there"""
+        if os.path.exists('config.py'):
+            self.update_config_setting('FIRECRAWL_API_KEY', api_key)
+            return
+        try:
+            config_content = f'''# Universal Firecrawl + Ollama Configuration
+import os
+
+# Firecrawl Configuration
+FIRECRAWL_API_KEY = "{api_key}"
+
+# Ollama Configuration  
+OLLAMA_HOST = os.getenv('OLLAMA_HOST', 'http://localhost:11434')
+
+# Report Settings
+REPORTS_DIR = 'firecrawl_reports'
+DEFAULT_SAVE_FORMAT = 'html'  # txt, csv, html, pdf, json, html_charts - comma-separate for several
+CHARTS_OFFLINE = False  # True inlines Chart.js so chart reports work without a CDN
+
+# Retrieval - long pages send only the chunks most relevant to the task
+EMBEDDING_MODEL = None  # e.g. 'nomic-embed-text'; None picks the first installed embedding model
+RETRIEVAL_TOP_K = 8
+
+# Model Preferences (optional - system will auto-detect)
+PREFERRED_MODELS = {{
+    'fast': 'llama3.2',
+    'reasoning': 'qwen3', 
+    'coding': 'qwen2.5-coder',
+    'comprehensive': 'phi4'
+}}
+'''
+            
+            with open('config.py', 'w', encoding='utf-8') as f:
+                f.write(config_content)
+            
+            print("✅ API key saved to config.py")
+            self.settings.refresh(force=True)
+            
+        except Exception as e:
+            print(f"⚠️ Could not save config file: {e}")
+    
+    def retry_api_key_setup(self):
+        """Allow user to retry with a different API key"""
+        print("\n🔄 API key may be invalid or connection failed.")
+        retry = input("Try with a different API key? (y/n): ").lower().startswith('y')
+        
+        if retry:
+            print("\n🔑 Enter new Firecrawl API key:")
+            new_key = input("API key: ").strip()
+            
+            if new_key:
+                self.save_api_key_to_config(new_key)
+                # Recursively try setup again
+                return self.setup_firecrawl()
+        
+        return False
+    
+    def setup_ollama(self):
+        """Setup Ollama connection"""
+        print("🤖 Setting up Ollama...")
+        
+        # Try different common Ollama endpoints
+        endpoints = [
+            "http://localhost:11434",
+            "http://127.0.0.1:11434", 
+            "http://0.0.0.0:11434"
+        ]
+        
+        ollama_host = self.get_config_value('OLLAMA_HOST')
+        
+        for endpoint in [ollama_host] + [endpoint for endpoint in endpoints if endpoint != ollama_host]:
+            try:
+                print(f"  Trying {endpoint}...")
+                self.ollama_client = Client(host=endpoint)
+                
+                # Test connection
+                self.get_resilience().call(f"ollama:{endpoint}", self.ollama_client.list)
+                print(f"✅ Connected to Ollama at {endpoint}")
+                
+                # Setup model manager
+                self.model_manager = OllamaModelManager(self.ollama_client, self.get_resilience())
+                self.working_models = self.model_manager.get_working_models()
                 
                 if not self.working_models:
                     print("❌ No working models found")
                     print("💡 Try: ollama pull llama3.2")
                     return False
                 
-                self.model_categories = self.model_manager.categorize_models(self.working_models)
-                return True
+                self.model_categories = self.model_manager.categorize_models(self.working_models)
+                self.apply_model_preferences()
+                return True
+                
+            except Exception as e:
+                print(f"  ❌ Failed: {str(e)[:50]}...")
+                continue
+        
+        print("❌ Could not connect to Ollama")
+        print("💡 Make sure Ollama is running: ollama serve")
+        return False
+    
+    def display_available_models(self):
+        """Show user their available models with categories"""
+        print(f"\n🤖 Your Available Models ({len(self.working_models)} total):")
+        print("=" * 60)
+        
+        category_icons = {
+            'fast': '🚀',
+            'reasoning': '🧠', 
+            'coding': '💻',
+            'comprehensive': '🏆',
+            'embedding': '🔍',
+            'vision': '👁️',
+            'general': '⚡'
+        }
+        
+        category_descriptions = {
+            'fast': 'Fast & Efficient',
+            'reasoning': 'Deep Reasoning',
+            'coding': 'Code & Structured Data',
+            'comprehensive': 'Comprehensive Analysis',
+            'embedding': 'Text Embeddings',
+            'vision': 'Vision & Multimodal',
+            'general': 'General Purpose'
+        }
+        
+        for category, models in self.model_categories.items():
+            if models:
+                icon = category_icons.get(category, '🤖')
+                desc = category_descriptions.get(category, category.title())
+                print(f"\n{icon} {desc}:")
+                
+                for model in models:
+                    info = self.model_manager.model_info.get(model, {})
+                    size_mb = info.get('size', 0) / (1024 * 1024) if info.get('size') else 0
+                    size_str = f" ({size_mb:.1f}MB)" if size_mb > 0 else ""
+                    params = info.get('parameters', '')
+                    param_str = f" - {params}" if params else ""
+                    quant_str = f" {info['quantization']}" if info.get('quantization') else ""
+                    context_str = f" | {info['context_length'] // 1024}K context" if info.get('context_length') else ""
+                    
+                    print(f"  • {model}{size_str}{param_str}{quant_str}{context_str}")
+    
+    def select_model_dynamically(self, preferred_category=None, allow_auto=False):
+        """Let user select from their available models, or automatic routing"""
+        
+        if preferred_category and preferred_category in self.model_categories:
+            relevant_models = self.model_categories[preferred_category]
+            if not relevant_models:
+                relevant_models = self.working_models
+        else:
+            relevant_models = self.working_models
+        
+        if len(relevant_models) == 1:
+            print(f"🤖 Using your only available model: {relevant_models[0]}")
+            return relevant_models[0]
+        
+        print(f"\n🤖 Select Model:")
+        if allow_auto:
+            print("0. 🧭 Auto - cheapest model that fits each page, escalating when needed")
+        for i, model in enumerate(relevant_models, 1):
+            info = self.model_manager.model_info.get(model, {})
+            size_mb = info.get('size', 0) / (1024 * 1024) if info.get('size') else 0
+            size_str = f" ({size_mb:.1f}MB)" if size_mb > 0 else ""
+            
+            # Add category hint
+            model_category = None
+            for cat, models in self.model_categories.items():
+                if model in models:
+                    model_category = cat
+                    break
+            
+            category_hint = f" - {model_category}" if model_category else ""
+            print(f"{i}. {model}{size_str}{category_hint}")
+        
+        first_choice = 0 if allow_auto else 1
+        while True:
+            try:
+                choice = int(input(f"\nSelect model ({first_choice}-{len(relevant_models)}): "))
+                if allow_auto and choice == 0:
+                    print("✅ Selected: automatic routing")
+                    return ModelRouter.AUTO
+                if 1 <= choice <= len(relevant_models):
+                    selected = relevant_models[choice - 1]
+                    print(f"✅ Selected: {selected}")
+                    return selected
+                else:
+                    print(f"Please enter a number between {first_choice} and {len(relevant_models)}")
+            except (ValueError, KeyboardInterrupt):
+                print("Invalid input or cancelled")
+                return None
+    
+    def get_recommended_models(self):
+        """Get recommended models for different tasks"""
+        recommendations = {}
+        
+        # Fast analysis
+        if self.model_categories['fast']:
+            recommendations['fast'] = self.model_categories['fast'][0]
+        elif self.working_models:
+            recommendations['fast'] = self.working_models[0]
+        
+        # Reasoning
+        if self.model_categories['reasoning']:
+            recommendations['reasoning'] = self.model_categories['reasoning'][0]
+        elif self.model_categories['comprehensive']:
+            recommendations['reasoning'] = self.model_categories['comprehensive'][0]
+        else:
+            recommendations['reasoning'] = self.working_models[0] if self.working_models else None
+        
+        # Coding
+        if self.model_categories['coding']:
+            recommendations['coding'] = self.model_categories['coding'][0]
+        else:
+            recommendations['coding'] = recommendations.get('reasoning', self.working_models[0] if self.working_models else None)
+        
+        # Comprehensive
+        if self.model_categories['comprehensive']:
+            recommendations['comprehensive'] = self.model_categories['comprehensive'][0]
+        else:
+            recommendations['comprehensive'] = recommendations.get('reasoning', self.working_models[0] if self.working_models else None)
+        
+        return recommendations
+
+    def generation_limits(self, mode):
+        """(num_predict, timeout seconds) for a mode from NUM_PREDICT / GENERATION_TIMEOUT.
+        
+        Both are dicts keyed by mode with a 'default' entry. A configured
+        entry for the mode wins, then the configured default, then the
+        built-in values. None means no limit.
+        """
+        limits = []
+        for name in ('NUM_PREDICT', 'GENERATION_TIMEOUT'):
+            configured, built_in = self.get_config_value(name) or {}, Settings.SCHEMA[name][1]
+            for table, key in ((configured, mode), (configured, 'default'), (built_in, mode), (built_in, 'default')):
+                if key in table:
+                    limits.append(table[key])
+                    break
+        return tuple(limits)
+
+    def generate(self, model, messages, options=None, keep_alive=None, on_text=None, mode="analysis"):
+        """Stream one chat request within the mode's token and time budget.
+        
+        When the deadline passes, the caller gets the partial answer at
+        once; the stream is closed at its next chunk, which stops Ollama
+        generating. Returns (response, first token seconds, timed out).
+        """
+        num_predict, timeout = self.generation_limits(mode)
+        options = dict(options or {})
+        if num_predict:
+            # An explicit num_predict from the caller wins
+            options.setdefault('num_predict', num_predict)
+        remaining = self.get_resilience().remaining()
+        if remaining is not None:
+            timeout = remaining if timeout is None else min(timeout, remaining)
+        extra = {"keep_alive": keep_alive} if keep_alive is not None else {}
+        
+        def open_stream():
+            # The request is only sent when the first chunk is read
+            chunks = iter(self.ollama_client.chat(model=model, messages=messages, options=options, stream=True, **extra))
+            return chunks, next(chunks, None)
+        
+        start_time = time.time()
+        deadline = start_time + timeout if timeout else None
+        first_token_seconds = None
+        pieces = []
+        final = {}
+        timed_out = False
+        
+        with self.tracer.span("inference", model=model, mode=mode) as span:
+            for chunk in self.bounded_stream(open_stream, deadline):
+                if chunk is None:
+                    timed_out = True
+                    break
+                text = response_value(response_value(chunk, 'message', {}), 'content', '')
+                if text:
+                    if first_token_seconds is None:
+                        first_token_seconds = time.time() - start_time
+                    pieces.append(text)
+                    if on_text:
+                        on_text(text)
+                if response_value(chunk, 'done', False):
+                    final = chunk
+            
+            response = {"message": {"role": "assistant", "content": "".join(pieces)},
+                        "done_reason": "timeout" if timed_out else response_value(final, 'done_reason', 'stop')}
+            for key in ('eval_count', 'eval_duration', 'prompt_eval_count', 'prompt_eval_duration'):
+                response[key] = response_value(final, key, 0)
+            span.update(prompt_tokens=response['prompt_eval_count'], tokens=response['eval_count'],
+                        first_token_seconds=first_token_seconds, timed_out=timed_out)
+        if timed_out:
+            print(f"⏱️ {model} hit the {round(timeout, 1):g}s limit - keeping the partial answer "
+                  f"({len(response['message']['content'])} chars)")
+        return response, first_token_seconds, timed_out
+
+    def bounded_stream(self, open_stream, deadline):
+        """Chunks from a chat stream; yields None and stops if `deadline` passes first.
+        
+        Only opening the stream is retried, since a retry mid-answer would
+        repeat text already passed on. Without a deadline the stream is
+        read on the calling thread.
+        """
+        if deadline is None:
+            chunks, first_chunk = self.call_ollama(open_stream)
+            yield from itertools.chain([first_chunk] if first_chunk is not None else [], chunks)
+            return
+        
+        # The reader runs on another thread, which doesn't see this thread's job deadline
+        remaining = deadline - time.time()
+        pipe = queue.Queue()
+        cancelled = threading.Event()
+        done = object()
+        
+        def read():
+            chunks = None
+            try:
+                with self.get_resilience().deadline(remaining):
+                    chunks, first_chunk = self.call_ollama(open_stream)
+                for chunk in itertools.chain([first_chunk] if first_chunk is not None else [], chunks):
+                    if cancelled.is_set():
+                        break
+                    pipe.put(chunk)
+                pipe.put(done)
+            except BaseException as e:
+                pipe.put(e)
+            finally:
+                # Closing the generator closes the HTTP response, which cancels the generation
+                if chunks is not None and hasattr(chunks, 'close'):
+                    chunks.close()
+        
+        threading.Thread(target=read, name="generation", daemon=True).start()
+        try:
+            while True:
+                try:
+                    item = pipe.get(timeout=max(0.0, deadline - time.time()))
+                except queue.Empty:
+                    yield None
+                    return
+                if item is done:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            cancelled.set()
+
+    def chat_with_metrics(self, model, messages, options=None, content_chars=0, keep_alive=None, mode="analysis"):
+        """Run a chat call and return (response, numeric metrics)"""
+        prompt_chars = sum(len(message.get('content', '')) for message in messages)
+        
+        start_time = time.time()
+        # Identical concurrent requests (e.g. two workers on the same page) share one generation
+        key = SingleFlight.key('chat', model, messages, options, keep_alive, mode)
+        (response, _, timed_out), shared = self.single_flight.do(key, self.generate, model, messages, options,
+                                                                 keep_alive, mode=mode)
+        elapsed = time.time() - start_time
+        
+        metrics = generation_metrics(response, elapsed, content_chars, prompt_chars)
+        metrics['timed_out'] = timed_out
+        if not shared:
+            self.get_model_router().record_metrics(model, metrics)
+        return response, metrics
+
+    def stream_chat_with_metrics(self, model, messages, options=None, content_chars=0, on_text=None, mode="analysis"):
+        """Stream a chat call, passing each text piece to `on_text` as it arrives.
+        
+        Returns (response, metrics) like chat_with_metrics; metrics also
+        include first_token_seconds.
+        """
+        prompt_chars = sum(len(message.get('content', '')) for message in messages)
+        
+        start_time = time.time()
+        response, first_token_seconds, timed_out = self.generate(model, messages, options, on_text=on_text, mode=mode)
+        elapsed = time.time() - start_time
+        
+        metrics = generation_metrics(response, elapsed, content_chars, prompt_chars)
+        metrics['first_token_seconds'] = round(first_token_seconds if first_token_seconds is not None else elapsed, 3)
+        metrics['timed_out'] = timed_out
+        self.get_model_router().record_metrics(model, metrics)
+        return response, metrics
+
+    def get_resilience(self):
+        """Shared retry/circuit-breaker layer for Firecrawl and Ollama calls"""
+        if self.resilience is None:
+            self.resilience = ResilientCaller(
+                attempts=self.get_config_value('MAX_RETRIES') + 1,
+                base_delay=self.get_config_value('RETRY_DELAY')
+            )
+        return self.resilience
+
+    def job_deadline(self):
+        """Context bounding one page's scrape and analysis to PROCESSING_TIMEOUT seconds"""
+        return self.get_resilience().deadline(self.get_config_value('PROCESSING_TIMEOUT'))
+
+    def get_scrape_throttle(self):
+        """Rate limiter shared by every Firecrawl request"""
+        if self.scrape_throttle is None:
+            self.scrape_throttle = ScrapeThrottle(
+                self.get_config_value('REQUESTS_PER_MINUTE'),
+                self.get_config_value('DOMAIN_DELAY_SECONDS')
+            )
+        return self.scrape_throttle
+
+    def scrape_markdown(self, url):
+        """Scrape a page as markdown, rate limited and retrying transient Firecrawl errors"""
+        throttle = self.get_scrape_throttle()
+        
+        def throttled_scrape():
+            # Retries wait their turn too, so backing off never bursts past the limit
+            throttle.wait(url)
+            return self.app.scrape_url(url, formats=['markdown'])
+        
+        host = urlparse(url).netloc or url
+        with self.tracer.span("scrape", url=url) as span:
+            # Concurrent scrapes of the same URL cost one request and one credit
+            scraped_data, shared = self.single_flight.do(SingleFlight.key('scrape', url), self.get_resilience().call,
+                                                         f"firecrawl:{host}", throttled_scrape)
+            markdown = scraped_data.markdown or ""
+            span.update(chars=len(markdown), shared=shared)
+        return markdown
+
+    def get_preprocessor(self):
+        """Process pool for cleaning and fingerprinting pages (POSTPROCESS_WORKERS, 0 = in-process)"""
+        if self.preprocessor is None:
+            self.preprocessor = PagePreprocessor(self.get_config_value('POSTPROCESS_WORKERS'))
+        return self.preprocessor
+
+    def get_credit_budget(self, pages):
+        """Credit budget for a batch: FIRECRAWL_CREDIT_BUDGET, capped at the account's remaining credits"""
+        limit = self.get_config_value('FIRECRAWL_CREDIT_BUDGET')
+        get_usage = getattr(self.app, 'get_credit_usage', None)
+        if get_usage:
+            try:
+                remaining = response_value(get_usage(), 'remaining_credits')
+                if remaining is not None:
+                    limit = remaining if limit is None else min(limit, remaining)
+            except Exception:
+                pass
+        if limit is not None and limit < pages:
+            print(f"💳 Credit budget: {limit} scrapes for {pages} URLs - the batch will stop when it runs out")
+        return CreditBudget(limit)
+
+    def call_ollama(self, func, *args, **kwargs):
+        """Call the Ollama client, retrying transient errors"""
+        return self.get_resilience().call("ollama", func, *args, **kwargs)
+
+    def get_model_router(self):
+        """Router whose speed and quality history lives in the reports directory"""
+        if self.model_router is None:
+            self.model_router = ModelRouter(os.path.join(self.reports_dir, '.model_stats.json'))
+        return self.model_router
+
+    def routable_models(self):
+        """Working models that can answer chat requests"""
+        embedding = set(self.model_categories.get('embedding', []))
+        return [model for model in self.working_models if model not in embedding] or self.working_models
+
+    def route_models(self, task, content_chars=0, mode="analysis"):
+        """Models to try for a request, cheapest first; returns (models, complexity)"""
+        return self.get_model_router().route(self.routable_models(), self.model_manager.model_info, task, content_chars, mode)
+
+    def content_budget(self, model=None, default=None):
+        """Characters of page content to send, clamped to the model's context window.
+        
+        For automatic routing the smallest window among the routable models
+        is used, so the cheapest models stay eligible.
+        """
+        if default is None:
+            default = self.get_config_value('MAX_CONTENT_LENGTH')
+        if not self.model_manager:
+            return default
+        
+        models = self.routable_models() if model in (None, ModelRouter.AUTO) else [model]
+        contexts = [self.model_manager.model_info.get(m, {}).get('context_length') for m in models]
+        contexts = [context for context in contexts if context]
+        if not contexts:
+            return default
+        # Leave room for instructions and the answer; ~3 characters per token is conservative
+        reserve = ModelRouter.EXPECTED_OUTPUT_TOKENS + 600
+        return max(1000, min(default, (min(contexts) - reserve) * 3))
+
+    def routed_chat(self, task, messages, mode="analysis", options=None, content_chars=0, model=None):
+        """Chat with the routed (or given) model, escalating while validation fails.
+        
+        Returns (response, model used, metrics per model tried, routing info).
+        """
+        prompt_chars = sum(len(message.get('content', '')) for message in messages)
+        if model and model != ModelRouter.AUTO:
+            candidates, complexity = [model], None
+        else:
+            candidates, complexity = self.route_models(task, prompt_chars, mode)
+        
+        router = self.get_model_router()
+        all_metrics = {}
+        attempts = []
+        for model in candidates:
+            response, metrics = self.chat_with_metrics(model, messages, options, content_chars, mode=mode)
+            all_metrics[model] = metrics
+            passed = validate_output(response['message']['content'], mode)
+            router.record_validation(model, passed)
+            attempts.append({"model": model, "valid": passed, "latency_seconds": metrics['latency_seconds']})
+            # A larger model would only take longer, so a timed-out answer is kept as it is
+            if passed or metrics['timed_out']:
+                break
+            if model != candidates[-1]:
+                print(f"🔼 {model} output failed validation - escalating")
+        
+        routing = None
+        if complexity:
+            routing = {"complexity": complexity, "attempts": attempts, "escalations": len(attempts) - 1}
+        return response, model, all_metrics, routing
+
+    def get_config_value(self, name, default=None):
+        """Current value of a setting (cached; picks up edits to the config files)"""
+        return self.settings.get(name, default)
+
+    def apply_settings(self, changed):
+        """Push reloaded settings into the objects built from them, so a running process picks them up.
+        
+        Settings read at the point of use (timeouts, budgets, retrieval,
+        report formats) need nothing here.
+        """
+        changed = set(changed)
+        if 'REPORTS_DIR' in changed:
+            self.reports_dir = self.get_config_value('REPORTS_DIR')
+            os.makedirs(self.reports_dir, exist_ok=True)
+        if self.resilience and changed & {'MAX_RETRIES', 'RETRY_DELAY'}:
+            self.resilience.attempts = max(1, self.get_config_value('MAX_RETRIES') + 1)
+            self.resilience.base_delay = self.get_config_value('RETRY_DELAY')
+        if self.scrape_throttle and changed & {'REQUESTS_PER_MINUTE', 'DOMAIN_DELAY_SECONDS'}:
+            self.scrape_throttle.configure(self.get_config_value('REQUESTS_PER_MINUTE'),
+                                           self.get_config_value('DOMAIN_DELAY_SECONDS'))
+        if self.preprocessor and 'POSTPROCESS_WORKERS' in changed:
+            self.preprocessor.resize(self.get_config_value('POSTPROCESS_WORKERS'))
+        if self.model_manager and 'PREFERRED_MODELS' in changed:
+            self.model_categories = self.model_manager.categorize_models(self.working_models)
+            self.apply_model_preferences()
+        if self.app is not None and 'FIRECRAWL_API_KEY' in changed and self.get_config_value('FIRECRAWL_API_KEY'):
+            self.app = FirecrawlApp(api_key=self.get_config_value('FIRECRAWL_API_KEY'))
+        if self.ollama_client is not None and 'OLLAMA_HOST' in changed:
+            print("⚠️ OLLAMA_HOST changed - restart to connect to the new host")
+
+    def apply_model_preferences(self):
+        """Move each PREFERRED_MODELS entry to the front of its category.
+        
+        A preference matches an installed model by exact name, or by name
+        without the tag ('llama3.2' matches 'llama3.2:3b').
+        """
+        for category, preferred in (self.get_config_value('PREFERRED_MODELS') or {}).items():
+            matches = [model for model in self.working_models
+                       if model == preferred or model.split(':')[0] == preferred]
+            if not matches or category not in self.model_categories:
+                continue
+            models = self.model_categories[category]
+            if matches[0] in models:
+                models.remove(matches[0])
+            models.insert(0, matches[0])
+
+    def get_user_input(self, prompt, input_type="text"):
+        """Get user input with validation"""
+        while True:
+            try:
+                if input_type == "int":
+                    return int(input(prompt))
+                elif input_type == "url":
+                    url = input(prompt).strip()
+                    if not url.startswith(('http://', 'https://')):
+                        url = 'https://' + url
+                    return url
+                elif input_type == "list":
+                    items = input(prompt).strip().split(',')
+                    return [item.strip() for item in items if item.strip()]
+                else:
+                    return input(prompt).strip()
+            except ValueError as e:
+                print(f"Invalid input. Please try again. ({e})")
+            except KeyboardInterrupt:
+                print("\nOperation cancelled by user.")
+                return None
+
+    def single_website_analysis(self):
+        """Analyze a single website - now fully dynamic"""
+        print("\n" + "="*60)
+        print("🔍 SINGLE WEBSITE ANALYSIS")
+        print("="*60)
+        
+        # Get URL from user
+        url = self.get_user_input("🌐 Enter website URL: ", "url")
+        if not url:
+            return
+        
+        # Get analysis task
+        print("\n📝 What would you like to analyze? Examples:")
+        print("  • What is this company's main focus?")
+        print("  • Summarize the key features of their product")
+        print("  • What are their pricing options?")
+        print("  • Who are their target customers?")
+        print("💡 Several tasks for the same page? Separate them with |")
+        
+        task = self.get_user_input("\n📋 Analysis task: ")
+        if not task:
+            return
+        tasks = [item.strip() for item in task.split('|') if item.strip()]
+        
+        # Select model dynamically
+        model = self.select_model_dynamically('general', allow_auto=True)
+        if not model:
+            return
+        
+        # Perform analysis
+        try:
+            print(f"\n🔄 Scraping {url}...")
+            content = self.scrape_markdown(url)
+            
+            if not content or len(content.strip()) < 50:
+                print("⚠️ Warning: Very little content found")
+                retry = input("Try a different URL? (y/n): ").lower().startswith('y')
+                if retry:
+                    return self.single_website_analysis()
+                return
+            
+            print(f"✅ Scraped {len(content)} characters")
+            content = self.spill_content(content)
+            
+            if len(tasks) > 1:
+                results = self.analyze_questions(url, tasks, model, content)
+                self.save_report(results, "multi_question_analysis", url)
+                return
+            
+            print("🧭 Routing to the cheapest suitable model..." if model == ModelRouter.AUTO else f"🤖 Processing with {model}...")
+            
+            results = self.analyze_content(url, task, model, content)
+            model = results['model']
+            metrics = results['metrics'][model]
+            
+            # Display results
+            print("\n" + "="*60)
+            print("📊 ANALYSIS RESULTS")  
+            print("="*60)
+            print(f"🌐 Website: {url}")
+            print(f"📋 Task: {task}")
+            print(f"🤖 Model: {model}")
+            print(f"⏱️ Processing Time: {metrics['latency_seconds']:.1f} seconds ({metrics['tokens_per_second']:.1f} tokens/sec)")
+            print("-"*60)
+            print(results['analysis'])
+            print("="*60)
+            
+            # Save report (using the save functions from previous version)
+            self.save_report(results, "website_analysis", url)
+            
+        except Exception as e:
+            self.handle_error(e, "single_website_analysis")
+
+    def get_embedding_model(self):
+        """The configured or first detected embedding model, or None"""
+        configured = self.get_config_value('EMBEDDING_MODEL')
+        if configured:
+            return configured
+        if self.model_categories.get('embedding'):
+            return self.model_categories['embedding'][0]
+        # Embedding models can't chat, so they are not among the working models
+        if self.model_manager:
+            embedding_models = self.model_manager.models_with_capability('embedding')
+            if embedding_models:
+                return embedding_models[0]
+            for model in self.model_manager.available_models:
+                if self.model_manager.has_capability(model, 'embedding') is None and 'embed' in model.lower():
+                    return model
+        return None
+
+    def embed_texts(self, model, texts, batch_size=32):
+        """Embed texts in batches with a local embedding model"""
+        vectors = []
+        with self.tracer.span("embed", model=model, texts=len(texts)):
+            for start in range(0, len(texts), batch_size):
+                batch = texts[start:start + batch_size]
+                if hasattr(self.ollama_client, 'embed'):
+                    response = self.call_ollama(self.ollama_client.embed, model=model, input=batch)
+                    vectors.extend(response_value(response, 'embeddings', []))
+                else:
+                    # Older ollama clients only have the one-text-per-call endpoint
+                    for text in batch:
+                        response = self.call_ollama(self.ollama_client.embeddings, model=model, prompt=text)
+                        vectors.append(response_value(response, 'embedding', []))
+        return vectors
+
+    def get_vector_store(self):
+        """The persistent index of scraped content, or None when NumPy is missing"""
+        if self.vector_store is None:
+            directory = self.get_config_value('VECTOR_INDEX_DIR') or os.path.join(self.reports_dir, 'vector_index')
+            try:
+                self.vector_store = VectorStore(directory)
+            except ImportError:
+                return None
+        return self.vector_store
+
+    def index_page(self, url, content):
+        """Add a scraped page to the persistent index.
+        
+        Returns (chunks, vectors) so the caller can reuse the embeddings for
+        retrieval, or None when the page was not embedded.
+        """
+        embedding_model = self.get_embedding_model()
+        store = self.get_vector_store()
+        if not embedding_model or store is None or not content:
+            return None
+        
+        if isinstance(content, SpilledText):
+            content_hash = content.sha256[:16]
+        else:
+            content_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()[:16]
+        if store.has_page(url, content_hash):
+            return None
+        
+        try:
+            chunks = chunk_text(content, self.get_config_value('RETRIEVAL_CHUNK_CHARS'))
+            vectors = self.embed_texts(embedding_model, chunks)
+            store.add_page(url, content_hash, embedding_model, chunks, vectors)
+            return chunks, vectors
+        except Exception as e:
+            print(f"⚠️ Could not index {url}: {str(e)[:60]}")
+            return None
+
+    def prepare_content(self, content, query, limit=4000, embedded=None):
+        """Fit content into the prompt budget.
+        
+        Short content passes through unchanged. Longer content keeps only the
+        chunks most relevant to `query` (by embedding similarity, in page
+        order) when an embedding model and NumPy are available, otherwise the
+        leading prefix. `embedded` reuses (chunks, vectors) from index_page.
+        Returns (prompt content, retrieval info or None).
+        """
+        if len(content) <= limit:
+            return str(content), None
+        
+        embedding_model = self.get_embedding_model()
+        if embedding_model:
+            try:
+                start_time = time.time()
+                if embedded:
+                    chunks, chunk_vectors = embedded
+                    query_vector = self.embed_texts(embedding_model, [query])[0]
+                else:
+                    chunks = chunk_text(content, self.get_config_value('RETRIEVAL_CHUNK_CHARS'))
+                    vectors = self.embed_texts(embedding_model, chunks + [query])
+                    chunk_vectors, query_vector = vectors[:-1], vectors[-1]
+                index = EmbeddingIndex(chunk_vectors)
+                
+                selected = []
+                used = 0
+                for row, score in index.search(query_vector, self.get_config_value('RETRIEVAL_TOP_K')):
+                    if used + len(chunks[row]) > limit:
+                        continue
+                    selected.append(row)
+                    used += len(chunks[row])
                 
+                if selected:
+                    selected.sort()
+                    prompt_content = "\n\n[...]\n\n".join(chunks[row] for row in selected)
+                    return prompt_content, {
+                        "embedding_model": embedding_model,
+                        "chunks_total": len(chunks),
+                        "chunks_used": len(selected),
+                        "retrieval_seconds": round(time.time() - start_time, 3)
+                    }
+            except ImportError:
+                print("💡 Install numpy to send only the most relevant parts of long pages")
             except Exception as e:
-                print(f"  ❌ Failed: {str(e)[:50]}...")
-                continue
+                print(f"⚠️ Retrieval failed ({str(e)[:60]}), using the start of the page")
+        
+        return content[:limit] + "\n\n[Content truncated for analysis...]", None
+
+    def analyze_content(self, url, task, model, content, on_text=None):
+        """Run the analysis prompt over scraped content and build the result record.
+        
+        With `on_text` the answer is streamed to it piece by piece; streamed
+        answers are never escalated, since their text has already been sent.
+        """
+        original_length = len(content)
+        with self.tracer.span("prompt.build", url=url, chars=original_length) as span:
+            embedded = self.index_page(url, content)
+            content, retrieval = self.prepare_content(content, task, limit=self.content_budget(model), embedded=embedded)
+            span.update(prompt_chars=len(content), retrieval=bool(retrieval))
+        
+        if on_text:
+            if model in (None, ModelRouter.AUTO):
+                model = self.route_models(task, len(content))[0][0]
+            response, metrics = self.stream_chat_with_metrics(
+                model, analysis_messages(content, task), {"temperature": 0.3}, original_length, on_text
+            )
+            all_metrics, routing = {model: metrics}, None
+        else:
+            response, model, all_metrics, routing = self.routed_chat(
+                task,
+                model=model,
+                messages=analysis_messages(content, task),
+                options={"temperature": 0.3},
+                content_chars=original_length
+            )
+        
+        results = {
+            "url": url,
+            "task": task,
+            "model": model,
+            "content_length": original_length,
+            "processing_time": round(sum(m['latency_seconds'] for m in all_metrics.values()), 3),
+            "analysis": response['message']['content'],
+            "timestamp": datetime.now().isoformat(),
+            "metrics": all_metrics,
+            "system_info": {
+                "total_models_available": len(self.working_models),
+                "model_categories": list(self.model_categories.keys())
+            }
+        }
+        if retrieval:
+            results["retrieval"] = retrieval
+        if routing:
+            results["routing"] = routing
+        if all_metrics[model].get('timed_out'):
+            results["timed_out"] = True
+        return results
+
+    def analyze_questions(self, url, questions, model, content):
+        """Answer several tasks about one page, reusing the server's cached prompt prefix.
+        
+        Every question is sent with byte-identical system prompt and content
+        (retrieval uses all questions together), so after the first call the
+        server only evaluates the question itself.
+        """
+        original_length = len(content)
+        embedded = self.index_page(url, content)
+        content, retrieval = self.prepare_content(
+            content, " ".join(questions), limit=self.content_budget(model), embedded=embedded
+        )
+        if model in (None, ModelRouter.AUTO):
+            # One model for all questions - the cached prefix belongs to the loaded model
+            model = self.route_models(" ".join(questions), len(content))[0][0]
+        
+        answers = []
+        metrics = {}
+        metrics_list = []
+        for number, question in enumerate(questions, 1):
+            print(f"\n🤖 [{number}/{len(questions)}] {question} ({model})")
+            response, question_metrics = self.chat_with_metrics(
+                model=model,
+                messages=analysis_messages(content, question),
+                options={"temperature": 0.3},
+                content_chars=original_length,
+                mode="qa"
+            )
+            answer = response['message']['content']
+            answers.append({"task": question, "analysis": answer})
+            metrics[f"Q{number}"] = question_metrics
+            metrics_list.append(question_metrics)
+            print("-"*60)
+            print(answer)
+            print(f"⏱️ {question_metrics['latency_seconds']:.1f}s "
+                  f"(prompt evaluation {question_metrics['prompt_eval_seconds']:.2f}s, {question_metrics['prompt_tokens']} tokens)")
+        
+        prefix_cache = prefix_cache_stats(metrics_list)
+        if prefix_cache and prefix_cache['prompt_eval_speedup']:
+            print("="*60)
+            print(f"⚡ Cached page context: follow-up prompt evaluation {prefix_cache['prompt_eval_speedup']:.1f}x faster "
+                  f"({prefix_cache['first_prompt_eval_seconds']:.2f}s → {prefix_cache['followup_prompt_eval_seconds']:.2f}s)")
+        
+        results = {
+            "url": url,
+            "model": model,
+            "content_length": original_length,
+            "questions": answers,
+            "processing_time": round(sum(m['latency_seconds'] for m in metrics_list), 3),
+            "timestamp": datetime.now().isoformat(),
+            "metrics": metrics,
+            "prefix_cache": prefix_cache
+        }
+        if retrieval:
+            results["retrieval"] = retrieval
+        return results
+
+    # Question/answer pairs kept in a session's conversation (older ones are dropped)
+    SESSION_HISTORY_TURNS = 6
+    
+    # How long Ollama keeps the session model loaded between questions
+    SESSION_KEEP_ALIVE = "30m"
+    
+    def page_session(self):
+        """Scrape a page once, then answer follow-up questions in one conversation"""
+        print("\n" + "="*60)
+        print("💬 PAGE Q&A SESSION")
+        print("="*60)
+        
+        url = self.get_user_input("🌐 Enter website URL: ", "url")
+        if not url:
+            return
+        
+        model = self.select_model_dynamically('general')
+        if not model:
+            return
+        
+        try:
+            print(f"\n🔄 Scraping {url}...")
+            page = clean_markdown(self.scrape_markdown(url))
+            if len(page) < 50:
+                print("⚠️ Very little content found")
+                return
+            embedded = self.index_page(url, page)
+            print(f"✅ Scraped {len(page)} characters - ask away (empty line to finish)")
+        except Exception as e:
+            self.handle_error(e, "page_session")
+            return
+        
+        limit = self.content_budget(model)
+        # Questions aren't known yet, so long pages keep their opening section
+        content = page if len(page) <= limit else page[:limit] + "\n\n[Content truncated for analysis...]"
+        if embedded and len(page) > limit:
+            print("💡 Long page: each question also gets the most relevant passages")
+        
+        history = []
+        transcript = []
+        metrics = {}
+        metrics_list = []
+        
+        while True:
+            question = self.get_user_input("\n❓ Question: ")
+            if not question or question.lower() in ('exit', 'quit', 'done'):
+                break
+            
+            # Fixed page prefix, then the conversation so far, then the new question
+            extra = ""
+            if embedded and len(page) > limit:
+                passages, _ = self.prepare_content(page, question, limit // 2, embedded)
+                extra = f"Relevant Passages:\n{passages}\n\n"
+            messages = analysis_messages(content, "Answer the user's questions about this page.")
+            messages += history[-2 * self.SESSION_HISTORY_TURNS:]
+            messages.append({"role": "user", "content": f"{extra}{question}"})
+            
+            try:
+                response, question_metrics = self.chat_with_metrics(
+                    model=model,
+                    messages=messages,
+                    options={"temperature": 0.3},
+                    content_chars=len(page),
+                    keep_alive=self.SESSION_KEEP_ALIVE,
+                    mode="qa"
+                )
+            except Exception as e:
+                self.handle_error(e, "page_session")
+                break
+            
+            answer = response['message']['content']
+            history += [{"role": "user", "content": question}, {"role": "assistant", "content": answer}]
+            transcript.append({"question": question, "answer": answer})
+            metrics[f"Q{len(transcript)}"] = question_metrics
+            metrics_list.append(question_metrics)
+            
+            print("-"*60)
+            print(answer)
+            print(f"⏱️ {question_metrics['latency_seconds']:.1f}s")
+        
+        if not transcript:
+            return
+        
+        prefix_cache = prefix_cache_stats(metrics_list)
+        if prefix_cache:
+            print(f"\n⚡ First answer {prefix_cache['first_latency_seconds']:.1f}s, "
+                  f"follow-ups {prefix_cache['followup_latency_seconds']:.1f}s on average")
+        
+        results = {
+            "url": url,
+            "model": model,
+            "content_length": len(page),
+            "conversation": transcript,
+            "processing_time": round(sum(m['latency_seconds'] for m in metrics_list), 3),
+            "timestamp": datetime.now().isoformat(),
+            "metrics": metrics,
+            "prefix_cache": prefix_cache
+        }
+        self.save_report(results, "page_session", url)
+
+    def monitor_pages(self):
+        """Re-check monitored URLs and analyze only what changed since the last run"""
+        print("\n" + "="*60)
+        print("👁️ MONITOR PAGES FOR CHANGES")
+        print("="*60)
+        
+        monitor = PageMonitor(os.path.join(self.reports_dir, 'monitor'))
+        if monitor.index:
+            print(f"📌 {len(monitor.index)} pages monitored. Press Enter to re-check all of them.")
+        print("🌐 Enter URLs separated by commas, or the path to a text file with one URL per line.")
+        source = self.get_user_input("URLs or file: ")
+        if source:
+            urls = self.parse_url_list(source)
+        elif monitor.index:
+            urls = list(monitor.index)
+        else:
+            return
+        if not urls:
+            print("❌ No valid URLs found.")
+            return
+        
+        task = self.get_user_input("\n📋 What to watch for (e.g. pricing, product launches): ")
+        if not task:
+            return
+        
+        model = self.select_model_dynamically('general', allow_auto=True)
+        if not model:
+            return
+        
+        try:
+            pages, summary = self.run_change_monitor(urls, task, model, monitor)
+        except KeyboardInterrupt:
+            print("\n⚠️ Monitoring cancelled")
+            return
+        
+        print("\n" + "="*60)
+        print("👁️ CHANGE REPORT")
+        print("="*60)
+        print(f"🆕 New: {summary['new']} | ✏️ Changed: {summary['changed']} | 🔹 Minor: {summary['minor']} | "
+              f"✅ Unchanged: {summary['unchanged']} | ❌ Failed: {summary['failed']}")
+        print(f"🤖 LLM calls: {summary['llm_calls']} ({summary['llm_calls_saved']} skipped)")
+        for page in pages:
+            if page.get('status') == 'changed':
+                print(f"\n✏️ {page['url']} (+{page['lines_added']}/-{page['lines_removed']} lines)")
+                print(page['change_summary'])
+        print("="*60)
+        
+        self.save_batch_report([{"monitor_summary": summary}] + pages, "change_report")
+
+    def run_change_monitor(self, urls, task, model, monitor):
+        """Scrape each URL, diff it against its snapshot and analyze only meaningful changes"""
+        pages = []
+        counts = {"new": 0, "changed": 0, "minor": 0, "unchanged": 0, "failed": 0}
+        llm_calls = 0
+        
+        for number, url in enumerate(interleave_by_domain(urls), 1):
+            print(f"\n[{number}/{len(urls)}] 🔄 Checking {url}...")
+            try:
+                with self.job_deadline():
+                    snapshot = normalize_snapshot(self.scrape_markdown(url))
+                    if len(snapshot) < 50:
+                        raise ValueError("very little content found")
+                    change = monitor.compare(url, snapshot)
+                    status = change['status']
+                    page = {"url": url, "status": status, "timestamp": datetime.now().isoformat()}
+                    
+                    if status == "new":
+                        result = self.analyze_content(url, task, model, snapshot)
+                        llm_calls += 1
+                        page.update({"model": result['model'], "analysis": result['analysis'], "metrics": result['metrics']})
+                        monitor.record(url, snapshot, change['content_hash'], result['analysis'])
+                        print("🆕 First snapshot stored and analyzed")
+                    elif status == "changed":
+                        page.update(self.analyze_changes(url, task, model, change, monitor.index[url]))
+                        llm_calls += 1
+                        monitor.record(url, snapshot, change['content_hash'], change_summary=page['change_summary'])
+                        print(f"✏️ Changed: {', '.join(change['sections_changed'][:5]) or 'content'}")
+                    elif status == "minor":
+                        # Noise-level edits: no LLM call, and compare against the same baseline next time
+                        monitor.mark_checked(url)
+                        print("🔹 Minor change only - skipped")
+                    else:
+                        monitor.mark_checked(url)
+                        print("✅ No meaningful change")
+                    
+                    if status in ("changed", "minor"):
+                        page.update({key: change[key] for key in
+                                     ("lines_added", "lines_removed", "sections_changed", "sections_removed", "diff")})
+                    counts[status] += 1
+                    pages.append(page)
+            except Exception as e:
+                counts["failed"] += 1
+                pages.append({"url": url, "status": "error", "error": str(e), "timestamp": datetime.now().isoformat()})
+                print(f"❌ {url}: {e}")
+        
+        positions = {url: index for index, url in enumerate(urls)}
+        pages.sort(key=lambda page: positions.get(page['url'], len(urls)))
+        summary = dict(counts, task=task, model=model, urls_total=len(urls), llm_calls=llm_calls,
+                       llm_calls_saved=counts["unchanged"] + counts["minor"])
+        return pages, summary
+
+    def analyze_changes(self, url, task, model, change, entry):
+        """Ask the model what the changed sections mean for the task"""
+        changed_text = change['changed_text']
+        limit = self.content_budget(model)
+        if len(changed_text) > limit:
+            changed_text = changed_text[:limit] + "\n\n[Changes truncated...]"
+        removed = ", ".join(change['sections_removed']) or "none"
+        previous = entry.get('analysis') or 'none'
+        if entry.get('last_change'):
+            previous += f"\n\nLatest Change ({entry.get('last_changed', '')[:10]}):\n{entry['last_change']}"
+        
+        response, model, all_metrics, _ = self.routed_chat(
+            task,
+            model=model,
+            messages=analysis_messages(
+                changed_text,
+                f"Summarize in a few bullets what changed that matters for: {task}. "
+                "Mention only differences from the previous analysis.",
+                "You are an expert analyst tracking changes on a website. Be brief and specific.",
+                extra=f"Removed Sections: {removed}\n\nPrevious Analysis:\n{previous}\n\n"
+            ),
+            options={"temperature": 0.2},
+            content_chars=len(change['changed_text'])
+        )
+        return {"model": model, "change_summary": response['message']['content'], "metrics": all_metrics}
+
+    def get_job_queue(self):
+        """The persistent job queue (JOB_QUEUE_PATH, default <reports_dir>/jobs.db)"""
+        return JobQueue(self.get_config_value('JOB_QUEUE_PATH') or os.path.join(self.reports_dir, 'jobs.db'))
+
+    def analyze_url(self, url, task, model=None, on_text=None):
+        """Scrape and analyze one URL without prompting; raises ValueError for near-empty pages"""
+        with self.job_deadline():
+            content = self.scrape_markdown(url)
+            if len(content.strip()) < 50:
+                raise ValueError("very little content found")
+            content = self.spill_content(content)
+            return self.analyze_content(url, task, model or ModelRouter.AUTO, content, on_text)
+
+    def run_job(self, job):
+        """Scrape and analyze one queued job, saving its report; returns a result summary"""
+        url = job['url']
+        with self.operation("job", job_id=job['id'], url=url):
+            results = self.analyze_url(url, job['task'], job['model'])
+            results['job_id'] = job['id']
+            # Written before the job is marked done, so a crash means a re-run rather than a lost report
+            filenames = self.save_report(results, f"job{job['id']}", url,
+                                         formats=job['formats'] or self.get_default_save_formats(), background=False)
+        return {
+            "model": results['model'],
+            "processing_time": results['processing_time'],
+            "timed_out": results.get('timed_out', False),
+            "reports": list(filenames.values())
+        }
+
+    def run_worker(self, concurrency=None, poll_seconds=2.0, drain=False):
+        """Process queued jobs until interrupted (or, with `drain`, until the queue is empty)"""
+        job_queue = self.get_job_queue()
+        stop = threading.Event()
+        drained = threading.Event()
+        import platform
+        worker_name = f"{platform.node() or 'worker'}:{os.getpid()}"
+        
+        def slot_count():
+            # Without --concurrency, edits to WORKER_CONCURRENCY resize a running worker
+            return max(1, concurrency or self.get_config_value('WORKER_CONCURRENCY'))
+        
+        def work(slot):
+            name = f"{worker_name}:{slot}"
+            while not stop.is_set() and slot <= slot_count():
+                # A lease outlives the per-job deadline, so only a dead worker's jobs are re-offered
+                job = job_queue.claim(name, self.get_config_value('PROCESSING_TIMEOUT') * 2)
+                if job is None:
+                    if drain:
+                        drained.set()
+                        return
+                    stop.wait(poll_seconds)
+                    continue
+                print(f"\n▶️ [{name}] Job {job['id']} (attempt {job['attempts']}/{job['max_attempts']}): {job['url']}")
+                try:
+                    result = self.run_job(job)
+                    job_queue.complete(job['id'], result)
+                    print(f"✅ [{name}] Job {job['id']} done with {result['model']} ({result['processing_time']:.1f}s)")
+                except Exception as e:
+                    # Bad input won't get better on retry; upstream trouble might
+                    retry = not isinstance(e, ValueError)
+                    status = job_queue.fail(job['id'], e, job['attempts'], job['max_attempts'], retry)
+                    print(f"❌ [{name}] Job {job['id']} {'will retry' if status == 'pending' else 'failed'}: {str(e)[:80]}")
+        
+        threads = {}
+        
+        def scale():
+            # Slots above the current count exit after their job; missing ones are started
+            for slot in range(1, slot_count() + 1):
+                if slot not in threads or not threads[slot].is_alive():
+                    threads[slot] = threading.Thread(target=work, args=(slot,), daemon=True)
+                    threads[slot].start()
+        
+        print(f"👷 Worker started with {slot_count()} slot(s) | Queue: {job_queue.path} | {job_queue.counts()}")
+        slots = slot_count()
+        scale()
+        try:
+            while any(thread.is_alive() for thread in threads.values()):
+                if not drained.is_set() and slot_count() != slots:
+                    print(f"👷 Worker slots: {slots} → {slot_count()}")
+                    slots = slot_count()
+                    scale()
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            print("\n⏹️ Stopping - finishing running jobs...")
+            stop.set()
+            for thread in threads.values():
+                thread.join()
+        print(f"👷 Worker stopped | {job_queue.counts()}")
+        if self.single_flight.stats['shared']:
+            print(f"🔗 Duplicate scrapes/generations shared: {self.single_flight.stats['shared']}")
+
+    def serve_api(self, host='127.0.0.1', port=8765):
+        """Run the HTTP API until interrupted"""
+        # Requests must never block on a terminal prompt
+        self.interactive = False
+        warm_models = self.get_config_value('SERVER_WARM_MODELS')
+        if warm_models is None:
+            warm_models = (self.model_categories.get('fast') or self.routable_models())[:1]
+        server = AnalysisServer(
+            self,
+            host,
+            port,
+            workers=self.get_config_value('SERVER_WORKERS'),
+            keep_alive=self.get_config_value('SERVER_KEEP_ALIVE'),
+            warm_models=warm_models
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("\n⏹️ API server stopped")
+
+    def batch_website_analysis(self):
+        """Analyze many websites with one task, skipping near-duplicate pages"""
+        print("\n" + "="*60)
+        print("📚 BATCH WEBSITE ANALYSIS")
+        print("="*60)
         
-        print("❌ Could not connect to Ollama")
-        print("💡 Make sure Ollama is running: ollama serve")
-        return False
-    
-    def display_available_models(self):
-        """Show user their available models with categories"""
-        print(f"\n🤖 Your Available Models ({len(self.working_models)} total):")
-        print("=" * 60)
+        print("🌐 Enter URLs separated by commas, or the path to a text file with one URL per line.")
+        source = self.get_user_input("URLs or file: ")
+        if not source:
+            return
         
-        category_icons = {
-            'fast': '🚀',
-            'reasoning': '🧠', 
-            'coding': '💻',
-            'comprehensive': '🏆',
-            'embedding': '🔍',
-            'vision': '👁️',
-            'general': '⚡'
-        }
+        urls = self.parse_url_list(source)
+        if not urls:
+            print("❌ No valid URLs found.")
+            return
+        print(f"✅ {len(urls)} URLs queued")
         
-        category_descriptions = {
-            'fast': 'Fast & Efficient',
-            'reasoning': 'Deep Reasoning',
-            'coding': 'Code & Structured Data',
-            'comprehensive': 'Comprehensive Analysis',
-            'embedding': 'Text Embeddings',
-            'vision': 'Vision & Multimodal',
-            'general': 'General Purpose'
-        }
+        task = self.get_user_input("\n📋 Analysis task for every page: ")
+        if not task:
+            return
         
-        for category, models in self.model_categories.items():
-            if models:
-                icon = category_icons.get(category, '🤖')
-                desc = category_descriptions.get(category, category.title())
-                print(f"\n{icon} {desc}:")
-                
-                for model in models:
-                    info = self.model_manager.model_info.get(model, {})
-                    size_mb = info.get('size', 0) / (1024 * 1024) if info.get('size') else 0
-                    size_str = f" ({size_mb:.1f}MB)" if size_mb > 0 else ""
-                    params = info.get('parameters', '')
-                    param_str = f" - {params}" if params else ""
-                    
-                    print(f"  • {model}{size_str}{param_str}")
-    
-    def select_model_dynamically(self, preferred_category=None):
-        """Let user select from their available models"""
+        model = self.select_model_dynamically('general', allow_auto=True)
+        if not model:
+            return
         
-        if preferred_category and preferred_category in self.model_categories:
-            relevant_models = self.model_categories[preferred_category]
-            if not relevant_models:
-                relevant_models = self.working_models
+        journal = self.get_batch_journal(urls, task, model)
+        if journal.complete:
+            print(f"ℹ️ This batch already finished: {', '.join(journal.reports.values()) or 'no reports saved'}")
+            if not input("Run it again from scratch? (y/n): ").lower().startswith('y'):
+                return
+            journal.reset()
+        elif journal.started:
+            print(f"♻️ Unfinished run found: {len(journal.results)}/{len(urls)} analyzed, "
+                  f"{len(journal.fingerprints)} scraped")
+            if input("Resume it? (y/n): ").lower().startswith('n'):
+                journal.reset()
+        
+        try:
+            pages, summary = self.run_batch_analysis(urls, task, model, journal)
+        except KeyboardInterrupt:
+            print("\n⚠️ Batch cancelled - progress is saved; run the same batch again to resume")
+            return
+        
+        print("\n" + "="*60)
+        print("📚 BATCH RESULTS")
+        print("="*60)
+        print(f"🌐 Pages: {summary['urls_total']} | 🤖 Analyzed: {summary['pages_analyzed']} | "
+              f"♻️ Reused: {summary['pages_reused']} | ❌ Failed: {summary['pages_failed']}")
+        print(f"📉 Dedup ratio: {summary['dedup_ratio']:.1%} ({summary['llm_calls_saved']} LLM calls saved)")
+        if model == ModelRouter.AUTO:
+            used = ", ".join(f"{name} ×{count}" for name, count in summary['models_used'].items())
+            print(f"🧭 Routed to: {used or 'none'} | 🔼 Escalations: {summary['escalations']}")
+        if summary['retries']:
+            print(f"🔁 Transient errors retried: {summary['retries']}")
+        print(f"💳 Credits spent: {summary['credits_spent']} | ⏳ Rate-limit waits: {summary['rate_limit_wait_seconds']:.0f}s")
+        if summary['pages_resumed']:
+            print(f"♻️ Resumed: {summary['pages_resumed']} pages from the previous run")
+        if summary['generation_timeouts']:
+            rate = summary['generation_timeouts'] / max(1, summary['pages_analyzed'])
+            print(f"⏱️ Generation timeouts: {summary['generation_timeouts']} ({rate:.0%}) - partial answers kept")
+        print("="*60)
+        
+        filenames = self.save_batch_report([{"batch_summary": summary}] + pages, "batch_analysis")
+        if not summary['pages_failed'] and not summary['pages_skipped']:
+            # Only a batch with nothing left to retry is closed; otherwise a rerun picks up the rest
+            self.report_writer.wait()
+            journal.record_reports(filenames)
+
+    def parse_url_list(self, source):
+        """URLs from a comma-separated string or a file with one URL per line"""
+        if os.path.isfile(source):
+            with open(source, 'r', encoding='utf-8') as f:
+                items = [line.strip() for line in f if line.strip() and not line.startswith('#')]
         else:
-            relevant_models = self.working_models
+            items = [item.strip() for item in source.split(',') if item.strip()]
         
-        if len(relevant_models) == 1:
-            print(f"🤖 Using your only available model: {relevant_models[0]}")
-            return relevant_models[0]
+        urls = []
+        for item in items:
+            if not item.startswith(('http://', 'https://')):
+                item = 'https://' + item
+            if item not in urls:
+                urls.append(item)
+        return urls
+
+    # Pages scraped and preprocessed ahead of the one being analyzed
+    BATCH_PREFETCH = 2
+    # Pages at least this long wait for the model as a file mapping rather than a string
+    SPILL_MIN_CHARS = 32 * 1024
+    
+    def spill_content(self, content):
+        """A SpilledText for long content, so only prompt-sized windows are ever materialized"""
+        if isinstance(content, SpilledText) or len(content) < self.SPILL_MIN_CHARS:
+            return content
+        return SpilledText.spill(content)
+    
+    def get_batch_journal(self, urls, task, model):
+        """Progress journal for this exact batch, under <reports_dir>/batches/"""
+        return BatchJournal(os.path.join(self.reports_dir, 'batches', BatchJournal.batch_id(urls, task, model)))
+
+    def run_batch_analysis(self, urls, task, model, journal=None):
+        """Scrape and analyze each URL; near-duplicates reuse their cluster's analysis.
         
-        print(f"\n🤖 Select Model:")
-        for i, model in enumerate(relevant_models, 1):
-            info = self.model_manager.model_info.get(model, {})
-            size_mb = info.get('size', 0) / (1024 * 1024) if info.get('size') else 0
-            size_str = f" ({size_mb:.1f}MB)" if size_mb > 0 else ""
-            
-            # Add category hint
-            model_category = None
-            for cat, models in self.model_categories.items():
-                if model in models:
-                    model_category = cat
-                    break
-            
-            category_hint = f" - {model_category}" if model_category else ""
-            print(f"{i}. {model}{size_str}{category_hint}")
+        Upcoming pages are scraped, cleaned and fingerprinted on background
+        threads and worker processes while the current page is analyzed.
+        Long pages wait as SpilledText file mappings rather than strings.
+        With a journal, finished stages are recorded as they complete and
+        stages recorded by an earlier run are skipped.
+        """
+        detector = NearDuplicateDetector()
+        analyses = {}
+        pages = []
+        failed = 0
+        skipped = 0
+        retries_before = self.get_resilience().stats['retries']
+        throttle = self.get_scrape_throttle()
+        waited_before = throttle.waited_seconds
+        budget = self.get_credit_budget(len(urls))
+        preprocessor = self.get_preprocessor()
         
-        while True:
-            try:
-                choice = int(input(f"\nSelect model (1-{len(relevant_models)}): "))
-                if 1 <= choice <= len(relevant_models):
-                    selected = relevant_models[choice - 1]
-                    print(f"✅ Selected: {selected}")
-                    return selected
+        resumed = 0
+        
+        def fetch(url):
+            cached = journal.cached_page(url) if journal else None
+            if cached is not None:
+                return cached
+            with self.job_deadline():
+                try:
+                    markdown = self.scrape_markdown(url)
+                except Exception:
+                    budget.refund()
+                    raise
+            with self.tracer.span("preprocess", url=url, chars=len(markdown)):
+                content, fingerprint = preprocessor.prepare(markdown)
+            if journal:
+                # The journal's page file doubles as the spill file
+                journal.record_scrape(url, content, fingerprint)
+                return journal.cached_page(url)
+            return self.spill_content(content), fingerprint
+        
+        # Alternate between sites so politeness delays overlap with other work
+        ordered = interleave_by_domain(urls)
+        fetches = {}
+        prefetcher = ThreadPoolExecutor(max_workers=self.BATCH_PREFETCH, thread_name_prefix="prefetch")
+        
+        def schedule(upto):
+            # Credits are reserved when a scrape is queued and refunded if it fails
+            for index in range(len(fetches), min(upto, len(ordered))):
+                url = ordered[index]
+                if journal and url in journal.results:
+                    fetches[index] = 'done'
+                elif journal and journal.has_page(url):
+                    fetches[index] = prefetcher.submit(fetch, url)
+                elif budget.can_spend():
+                    budget.spend()
+                    fetches[index] = prefetcher.submit(fetch, url)
                 else:
-                    print(f"Please enter a number between 1 and {len(relevant_models)}")
-            except (ValueError, KeyboardInterrupt):
-                print("Invalid input or cancelled")
-                return None
-    
-    def get_recommended_models(self):
-        """Get recommended models for different tasks"""
-        recommendations = {}
+                    fetches[index] = None
         
-        # Fast analysis
-        if self.model_categories['fast']:
-            recommendations['fast'] = self.model_categories['fast'][0]
-        elif self.working_models:
-            recommendations['fast'] = self.working_models[0]
+        try:
+            for number, url in enumerate(ordered, 1):
+                schedule(number + self.BATCH_PREFETCH)
+                if fetches[number - 1] == 'done':
+                    # Replayed through the detector so later duplicates cluster as before
+                    result = journal.results[url]
+                    detector.add(url, None, journal.fingerprints[url])
+                    if 'duplicate_of' not in result:
+                        analyses[url] = result
+                    pages.append(result)
+                    resumed += 1
+                    continue
+                if fetches[number - 1] is None:
+                    skipped += 1
+                    pages.append({"url": url, "task": task, "error": "skipped - credit budget reached",
+                                  "timestamp": datetime.now().isoformat()})
+                    continue
+                print(f"\n[{number}/{len(urls)}] 🔄 Scraping {url}...")
+                try:
+                    with self.tracer.span("batch.page", url=url, number=number):
+                        content, fingerprint = fetches[number - 1].result()
+                        # Drop the finished future so its page can be freed
+                        fetches[number - 1] = 'done'
+                        with self.job_deadline():
+                            if len(content) < 50:
+                                raise ValueError("very little content found")
+                    
+                            representative, distance = detector.find(content, fingerprint)
+                            if representative is not None:
+                                result = self.reuse_analysis(analyses[representative], url, content, distance)
+                                print(f"♻️ Near-duplicate of {representative} - reusing its analysis")
+                            else:
+                                if model != ModelRouter.AUTO:
+                                    print(f"🤖 Processing with {model}...")
+                                result = self.analyze_content(url, task, model, content)
+                                analyses[url] = result
+                                print(f"✅ Done with {result['model']} ({result['processing_time']:.1f}s)")
+                            # Registered only once it has a result, so a failed page never becomes a representative
+                            detector.add(url, content, fingerprint)
+                            if journal:
+                                journal.record_result(url, result)
+                            pages.append(result)
+                except Exception as e:
+                    failed += 1
+                    pages.append({"url": url, "task": task, "error": str(e), "timestamp": datetime.now().isoformat()})
+                    print(f"❌ {url}: {e}")
+        finally:
+            prefetcher.shutdown(cancel_futures=True)
         
-        # Reasoning
-        if self.model_categories['reasoning']:
-            recommendations['reasoning'] = self.model_categories['reasoning'][0]
-        elif self.model_categories['comprehensive']:
-            recommendations['reasoning'] = self.model_categories['comprehensive'][0]
-        else:
-            recommendations['reasoning'] = self.working_models[0] if self.working_models else None
+        if skipped:
+            print(f"\n💳 Credit budget of {budget.limit} reached - {skipped} URLs not scraped")
         
-        # Coding
-        if self.model_categories['coding']:
-            recommendations['coding'] = self.model_categories['coding'][0]
-        else:
-            recommendations['coding'] = recommendations.get('reasoning', self.working_models[0] if self.working_models else None)
+        # Report pages in the order they were given
+        positions = {url: index for index, url in enumerate(urls)}
+        pages.sort(key=lambda page: positions.get(page['url'], len(urls)))
         
-        # Comprehensive
-        if self.model_categories['comprehensive']:
-            recommendations['comprehensive'] = self.model_categories['comprehensive'][0]
-        else:
-            recommendations['comprehensive'] = recommendations.get('reasoning', self.working_models[0] if self.working_models else None)
+        models_used = {}
+        for result in analyses.values():
+            models_used[result['model']] = models_used.get(result['model'], 0) + 1
         
-        return recommendations
+        summary = {
+            "task": task,
+            "model": model,
+            "urls_total": len(urls),
+            "pages_analyzed": len(analyses),
+            "pages_reused": detector.duplicates,
+            "pages_failed": failed,
+            "dedup_ratio": round(detector.dedup_ratio, 4),
+            "llm_calls_saved": detector.duplicates,
+            "models_used": models_used,
+            "escalations": sum(result.get('routing', {}).get('escalations', 0) for result in analyses.values()),
+            "retries": self.get_resilience().stats['retries'] - retries_before,
+            "pages_skipped": skipped,
+            "credits_spent": budget.spent,
+            "rate_limit_wait_seconds": round(throttle.waited_seconds - waited_before, 1),
+            "pages_resumed": resumed,
+            "generation_timeouts": sum(1 for result in analyses.values() if result.get('timed_out')),
+            "clusters": {rep: dups for rep, dups in detector.clusters.items() if dups}
+        }
+        return pages, summary
 
-    def get_user_input(self, prompt, input_type="text"):
-        """Get user input with validation"""
-        while True:
-            try:
-                if input_type == "int":
-                    return int(input(prompt))
-                elif input_type == "url":
-                    url = input(prompt).strip()
-                    if not url.startswith(('http://', 'https://')):
-                        url = 'https://' + url
-                    return url
-                elif input_type == "list":
-                    items = input(prompt).strip().split(',')
-                    return [item.strip() for item in items if item.strip()]
-                else:
-                    return input(prompt).strip()
-            except ValueError as e:
-                print(f"Invalid input. Please try again. ({e})")
-            except KeyboardInterrupt:
-                print("\nOperation cancelled by user.")
-                return None
+    def reuse_analysis(self, source, url, content, distance):
+        """Result for a near-duplicate page, adapted from its cluster representative"""
+        return {
+            "url": url,
+            "task": source['task'],
+            "model": source['model'],
+            "content_length": len(content),
+            "analysis": source['analysis'].replace(source['url'], url),
+            "duplicate_of": source['url'],
+            "simhash_distance": distance,
+            "timestamp": datetime.now().isoformat(),
+            "metrics": {}
+        }
 
-    def single_website_analysis(self):
-        """Analyze a single website - now fully dynamic"""
+    def ask_across_scraped_content(self):
+        """Answer a question from the persistent index of everything scraped so far"""
         print("\n" + "="*60)
-        print("🔍 SINGLE WEBSITE ANALYSIS")
+        print("🔎 ASK ACROSS EVERYTHING SCRAPED")
         print("="*60)
         
-        # Get URL from user
-        url = self.get_user_input("🌐 Enter website URL: ", "url")
-        if not url:
+        store = self.get_vector_store()
+        if store is None:
+            print("❌ The content index needs numpy: pip install numpy")
+            return
+        if not len(store):
+            print("📭 Nothing indexed yet - run an analysis with an embedding model installed first.")
+            print("💡 Try: ollama pull nomic-embed-text")
             return
         
-        # Get analysis task
-        print("\n📝 What would you like to analyze? Examples:")
-        print("  • What is this company's main focus?")
-        print("  • Summarize the key features of their product")
-        print("  • What are their pricing options?")
-        print("  • Who are their target customers?")
-        
-        task = self.get_user_input("\n📋 Analysis task: ")
-        if not task:
+        print(f"📚 {len(store.header['pages'])} pages / {len(store)} chunks indexed with {store.model}")
+        question = self.get_user_input("\n❓ Your question: ")
+        if not question:
             return
         
-        # Select model dynamically
-        model = self.select_model_dynamically('general')
+        model = self.select_model_dynamically('reasoning')
         if not model:
             return
         
-        # Perform analysis
         try:
-            print(f"\n🔄 Scraping {url}...")
-            scraped_data = self.app.scrape_url(url, formats=['markdown'])
-            content = scraped_data.markdown
-            
-            if not content or len(content.strip()) < 50:
-                print("⚠️ Warning: Very little content found")
-                retry = input("Try a different URL? (y/n): ").lower().startswith('y')
-                if retry:
-                    return self.single_website_analysis()
+            query_vector = self.embed_texts(store.model, [question])[0]
+            hits = store.search(query_vector, self.get_config_value('RETRIEVAL_TOP_K'))
+            if not hits:
+                print("📭 No relevant content found.")
                 return
             
-            # Limit content length
-            original_length = len(content)
-            if len(content) > 4000:
-                content = content[:4000] + "\n\n[Content truncated for analysis...]"
-            
-            print(f"✅ Scraped {len(content)} characters")
-            print(f"🤖 Processing with {model}...")
+            sources = []
+            context = []
+            for number, (score, record) in enumerate(hits, 1):
+                if record['url'] not in sources:
+                    sources.append(record['url'])
+                context.append(f"[{number}] Source: {record['url']}\n{record['text']}")
             
-            start_time = time.time()
-            response = self.ollama_client.chat(
+            print(f"🤖 Answering with {model} from {len(hits)} passages across {len(sources)} pages...")
+            response, metrics = self.chat_with_metrics(
                 model=model,
                 messages=[
-                    {
-                        "role": "system", 
-                        "content": "You are an expert analyst. Provide clear, structured insights based on website content."
-                    },
-                    {
-                        "role": "user", 
-                        "content": f"Task: {task}\n\nWebsite Content:\n{content}"
-                    }
+                    {"role": "system", "content": "You are an expert analyst. Answer using only the numbered passages and cite them like [1]."},
+                    {"role": "user", "content": f"Question: {question}\n\nPassages:\n\n" + "\n\n".join(context)}
                 ],
-                options={"temperature": 0.3}
+                options={"temperature": 0.2},
+                mode="qa"
             )
-            end_time = time.time()
             
-            # Prepare results
             results = {
-                "url": url,
-                "task": task,
+                "question": question,
                 "model": model,
-                "content_length": original_length,
-                "processing_time": f"{end_time - start_time:.1f} seconds",
-                "analysis": response['message']['content'],
+                "answer": response['message']['content'],
+                "sources": sources,
+                "passages_used": len(hits),
                 "timestamp": datetime.now().isoformat(),
-                "system_info": {
-                    "total_models_available": len(self.working_models),
-                    "model_categories": list(self.model_categories.keys())
-                }
+                "metrics": {model: metrics}
             }
             
-            # Display results
             print("\n" + "="*60)
-            print("📊 ANALYSIS RESULTS")  
+            print("🔎 ANSWER")
             print("="*60)
-            print(f"🌐 Website: {url}")
-            print(f"📋 Task: {task}")
-            print(f"🤖 Model: {model}")
-            print(f"⏱️ Processing Time: {results['processing_time']}")
+            print(results['answer'])
             print("-"*60)
-            print(response['message']['content'])
+            for number, url in enumerate(sources, 1):
+                print(f"  {number}. {url}")
             print("="*60)
             
-            # Save report (using the save functions from previous version)
-            self.save_report(results, "website_analysis", url)
+            self.save_report(results, "cross_page_qa")
             
         except Exception as e:
-            self.handle_error(e, "single_website_analysis")
+            self.handle_error(e, "ask_across_scraped_content")
+
+    def pick_draft_and_refine_models(self):
+        """(fast draft model, comprehensive refine model), or None with fewer than two models"""
+        models = self.routable_models()
+        if len(models) < 2:
+            return None
+        model_info = self.model_manager.model_info
+        by_size = sorted(models, key=lambda m: ModelRouter.parameters(model_info.get(m, {})) or 0)
+        
+        draft_model = (self.model_categories.get('fast') or by_size)[0]
+        refine_choices = self.model_categories.get('comprehensive') or self.model_categories.get('reasoning') or []
+        refine_choices = [m for m in refine_choices if m != draft_model] or \
+            [m for m in reversed(by_size) if m != draft_model]
+        return draft_model, refine_choices[0]
+
+    def draft_and_refine_analysis(self):
+        """Stream a fast model's draft at once, then have a larger model correct it"""
+        print("\n" + "="*60)
+        print("✍️ DRAFT & REFINE ANALYSIS")
+        print("="*60)
+        
+        models = self.pick_draft_and_refine_models()
+        if not models:
+            print(f"❌ Need at least 2 models for draft & refine. You have {len(self.working_models)}.")
+            return
+        draft_model, refine_model = models
+        
+        url = self.get_user_input("🌐 Enter website URL: ", "url")
+        if not url:
+            return
+        task = self.get_user_input("\n📋 Analysis task: ")
+        if not task:
+            return
+        
+        print(f"🤖 Draft: {draft_model} | Refine: {refine_model}")
+        
+        try:
+            print(f"\n🔄 Scraping {url}...")
+            markdown = self.scrape_markdown(url)
+            original_length = len(markdown)
+            embedded = self.index_page(url, markdown)
+            limit = min(self.content_budget(draft_model), self.content_budget(refine_model))
+            content, retrieval = self.prepare_content(markdown, task, limit, embedded)
+            print(f"✅ Scraped {original_length} characters")
+            
+            print("\n" + "="*60)
+            print(f"📝 DRAFT ({draft_model})")
+            print("="*60)
+            draft_response, draft_metrics = self.stream_chat_with_metrics(
+                model=draft_model,
+                messages=analysis_messages(content, task),
+                options={"temperature": 0.3},
+                content_chars=original_length,
+                on_text=lambda text: print(text, end="", flush=True)
+            )
+            draft = draft_response['message']['content']
+            
+            print("\n" + "="*60)
+            print(f"🔍 CORRECTIONS ({refine_model})")
+            print("="*60)
+            refine_response, refine_metrics = self.stream_chat_with_metrics(
+                model=refine_model,
+                messages=analysis_messages(
+                    content, task,
+                    system_prompt="You are a senior analyst reviewing a draft against the source content. "
+                                  "List only factual errors, important omissions and fixes, as short bullets. "
+                                  "Do not rewrite the draft. If it is accurate and complete, reply 'No corrections.'",
+                    extra=f"Draft Answer:\n{draft}\n\n"
+                ),
+                # The correction should stay much shorter than a full answer
+                options={"temperature": 0.2, "num_predict": 400},
+                content_chars=original_length,
+                on_text=lambda text: print(text, end="", flush=True)
+            )
+            print("\n" + "="*60)
+            print(f"⚡ Draft visible after {draft_metrics['first_token_seconds']:.1f}s | "
+                  f"Total: {draft_metrics['latency_seconds'] + refine_metrics['latency_seconds']:.1f}s")
+            
+            results = {
+                "url": url,
+                "task": task,
+                "model": refine_model,
+                "draft_model": draft_model,
+                "refine_model": refine_model,
+                "content_length": original_length,
+                "draft": draft,
+                "corrections": refine_response['message']['content'],
+                "time_to_first_token": draft_metrics['first_token_seconds'],
+                "processing_time": round(draft_metrics['latency_seconds'] + refine_metrics['latency_seconds'], 3),
+                "timestamp": datetime.now().isoformat(),
+                "metrics": {draft_model: draft_metrics, refine_model: refine_metrics}
+            }
+            if retrieval:
+                results["retrieval"] = retrieval
+            
+            self.save_report(results, "draft_refine", url)
+            
+        except Exception as e:
+            self.handle_error(e, "draft_and_refine_analysis")
 
     def model_comparison(self):
         """Compare different models - now fully dynamic"""
@@ -576,48 +4728,12 @@ PREFERRED_MODELS = {{
             print("❌ Need at least 2 valid models for comparison.")
             return
         
-        print(f"✅ Comparing {len(selected_models)} models: {', '.join(selected_models)}")
-        
-        # Perform comparison
-        try:
-            print(f"\n🔄 Scraping {url}...")
-            scraped_data = self.app.scrape_url(url, formats=['markdown'])
-            content = scraped_data.markdown[:3500]  # Limit for comparison
-            print(f"✅ Scraped {len(content)} characters")
-            
-            # Analyze with each model
-            results = {
-                "url": url,
-                "task": task,
-                "models_compared": selected_models,
-                "timestamp": datetime.now().isoformat(),
-                "system_info": {
-                    "total_models_available": len(self.working_models),
-                    "comparison_count": len(selected_models)
-                }
-            }
-            
-            processing_times = {}
-            
-            for model in selected_models:
-                print(f"\n🤖 Processing with {model}...")
-                
-                start_time = time.time()
-                response = self.ollama_client.chat(
-                    model=model,
-                    messages=[
-                        {"role": "system", "content": "You are an expert analyst. Be concise but thorough."},
-                        {"role": "user", "content": f"Task: {task}\n\nContent:\n{content}"}
-                    ],
-                    options={"temperature": 0.2}
-                )
-                end_time = time.time()
-                
-                results[f"{model}_analysis"] = response['message']['content']
-                processing_times[model] = f"{end_time - start_time:.1f}s"
-                print(f"✅ {model} completed ({processing_times[model]})")
-            
-            results["processing_times"] = processing_times
+        print(f"✅ Comparing {len(selected_models)} models: {', '.join(selected_models)}")
+        
+        # Perform comparison
+        try:
+            results = self.compare_models(url, task, selected_models)
+            processing_times = results["processing_times"]
             
             # Display results
             print("\n" + "="*80)
@@ -629,7 +4745,7 @@ PREFERRED_MODELS = {{
             
             for model in selected_models:
                 analysis = results[f"{model}_analysis"]
-                print(f"\n🤖 {model.upper()} ({processing_times[model]}):")
+                print(f"\n🤖 {model.upper()} ({processing_times[model]:.1f}s):")
                 print("-" * 50)
                 print(analysis)
                 print("-" * 50)
@@ -640,8 +4756,55 @@ PREFERRED_MODELS = {{
         except Exception as e:
             self.handle_error(e, "model_comparison")
 
+    def compare_models(self, url, task, selected_models):
+        """Scrape once and run the same task on every selected model; returns the comparison result"""
+        print(f"\n🔄 Scraping {url}...")
+        markdown = self.scrape_markdown(url)
+        original_length = len(markdown)
+        embedded = self.index_page(url, markdown)
+        # Same content for every model, sized for the smallest context window
+        limit = min(self.content_budget(model, 3500) for model in selected_models)
+        content, retrieval = self.prepare_content(markdown, task, limit, embedded)
+        print(f"✅ Scraped {len(content)} characters")
+        
+        # Analyze with each model
+        results = {
+            "url": url,
+            "task": task,
+            "models_compared": selected_models,
+            "timestamp": datetime.now().isoformat(),
+            "system_info": {
+                "total_models_available": len(self.working_models),
+                "comparison_count": len(selected_models)
+            }
+        }
+        
+        processing_times = {}
+        metrics = {}
+        
+        for model in selected_models:
+            print(f"\n🤖 Processing with {model}...")
+            
+            response, metrics[model] = self.chat_with_metrics(
+                model=model,
+                messages=analysis_messages(content, task, "You are an expert analyst. Be concise but thorough."),
+                options={"temperature": 0.2},
+                content_chars=original_length
+            )
+            
+            results[f"{model}_analysis"] = response['message']['content']
+            processing_times[model] = metrics[model]['latency_seconds']
+            print(f"✅ {model} completed ({processing_times[model]:.1f}s, "
+                  f"{metrics[model]['tokens_per_second']:.1f} tokens/sec)")
+        
+        results["processing_times"] = processing_times
+        results["metrics"] = metrics
+        if retrieval:
+            results["retrieval"] = retrieval
+        return results
+
     def structured_extraction(self):
-        """Extract structured data - dynamically selects best coding model"""
+        """Extract structured data - routes to the cheapest model that returns valid JSON"""
         print("\n" + "="*60)
         print("🏗️ STRUCTURED DATA EXTRACTION")
         print("="*60)
@@ -662,85 +4825,17 @@ PREFERRED_MODELS = {{
         if not data_type:
             return
         
-        # Select best model for structured data
-        recommendations = self.get_recommended_models()
-        coding_model = recommendations.get('coding', self.working_models[0])
-        
-        print(f"🤖 Using {coding_model} for structured extraction")
-        
-        # Rest of the structured extraction logic...
-        # (Similar to previous version but with dynamic model selection)
-        
         try:
-            # Create schema
-            print(f"\n🏗️ Creating extraction schema for: {data_type}")
-            
-            schema_prompt = f"""
-            Create a JSON schema to extract {data_type} from website content.
-            Make it practical and useful. Return only the schema description, not actual JSON.
-            """
-            
-            schema_response = self.ollama_client.chat(
-                model=coding_model,
-                messages=[
-                    {"role": "system", "content": "You are a data extraction expert. Create clear, practical JSON schemas."},
-                    {"role": "user", "content": schema_prompt}
-                ],
-                options={"temperature": 0.1}
-            )
-            
-            schema_description = schema_response['message']['content']
-            print(f"✅ Schema created with {coding_model}")
-            
-            # Scrape and extract
-            print(f"\n🔄 Scraping {url}...")
-            scraped_data = self.app.scrape_url(url, formats=['markdown'])  
-            content = scraped_data.markdown[:4000]
-            print(f"✅ Scraped {len(content)} characters")
-            
-            print("🤖 Extracting structured data...")
-            
-            extraction_prompt = f"""
-            Extract {data_type} from the website content below.
-            Use this schema as a guide: {schema_description}
-            
-            Return valid JSON only, no extra text.
-            
-            Website Content:
-            {content}
-            """
-            
-            response = self.ollama_client.chat(
-                model=coding_model,
-                messages=[
-                    {"role": "system", "content": "You are a data extraction expert. Always return valid JSON."},
-                    {"role": "user", "content": extraction_prompt}
-                ],
-                options={"temperature": 0.1}
-            )
-            
-            # Prepare results
-            results = {
-                "url": url,
-                "data_type": data_type,
-                "schema": schema_description,
-                "extracted_data": response['message']['content'],
-                "timestamp": datetime.now().isoformat(),
-                "model": coding_model,
-                "system_info": {
-                    "recommended_model_used": True,
-                    "model_category": "coding"
-                }
-            }
+            results = self.extract_structured(url, data_type)
             
             print("\n" + "="*60)
             print("🏗️ EXTRACTED DATA")
             print("="*60)
             print(f"🌐 Website: {url}")
             print(f"🎯 Data Type: {data_type}")
-            print(f"🤖 Model: {coding_model}")
+            print(f"🤖 Model: {results['model']}")
             print("-"*60)
-            print(response['message']['content'])
+            print(results['extracted_data'])
             print("="*60)
             
             # Save report
@@ -749,12 +4844,85 @@ PREFERRED_MODELS = {{
         except Exception as e:
             self.handle_error(e, "structured_extraction")
 
+    def extract_structured(self, url, data_type):
+        """Design a schema, scrape the page and extract `data_type` as JSON; returns the result"""
+        # Cheapest model that can handle extraction; larger ones only if its JSON is invalid
+        candidates, _ = self.route_models(data_type, mode="extraction")
+        coding_model = candidates[0]
+        
+        print(f"🤖 Using {coding_model} for structured extraction")
+        
+        # Create schema
+        print(f"\n🏗️ Creating extraction schema for: {data_type}")
+        
+        schema_prompt = f"""
+        Create a JSON schema to extract {data_type} from website content.
+        Make it practical and useful. Return only the schema description, not actual JSON.
+        """
+        
+        schema_response, _ = self.chat_with_metrics(
+            model=coding_model,
+            messages=[
+                {"role": "system", "content": "You are a data extraction expert. Create clear, practical JSON schemas."},
+                {"role": "user", "content": schema_prompt}
+            ],
+            options={"temperature": 0.1},
+            mode="extraction"
+        )
+        
+        schema_description = schema_response['message']['content']
+        print(f"✅ Schema created with {coding_model}")
+        
+        # Scrape and extract
+        print(f"\n🔄 Scraping {url}...")
+        markdown = self.scrape_markdown(url)
+        original_length = len(markdown)
+        embedded = self.index_page(url, markdown)
+        content, retrieval = self.prepare_content(markdown, data_type, self.content_budget(), embedded)
+        print(f"✅ Scraped {len(content)} characters")
+        
+        print("🤖 Extracting structured data...")
+        
+        extraction_task = f"""Extract {data_type} from the website content above.
+        Use this schema as a guide: {schema_description}
+        
+        Return valid JSON only, no extra text."""
+        
+        response, coding_model, all_metrics, routing = self.routed_chat(
+            data_type,
+            messages=analysis_messages(content, extraction_task, "You are a data extraction expert. Always return valid JSON."),
+            mode="extraction",
+            options={"temperature": 0.1},
+            content_chars=original_length
+        )
+        
+        # Prepare results
+        results = {
+            "url": url,
+            "data_type": data_type,
+            "schema": schema_description,
+            "extracted_data": response['message']['content'],
+            "timestamp": datetime.now().isoformat(),
+            "model": coding_model,
+            "metrics": all_metrics,
+            "routing": routing,
+            "system_info": {
+                "recommended_model_used": True,
+                "model_category": "coding"
+            }
+        }
+        if retrieval:
+            results["retrieval"] = retrieval
+        return results
+
     def handle_error(self, error, context):
         """Enhanced error handling"""
         error_msg = str(error)
         print(f"❌ Error in {context}: {error_msg}")
         
-        if "timeout" in error_msg.lower():
+        if isinstance(error, CircuitOpenError):
+            print("💡 Too many failures in a row - the service is paused briefly, try again shortly")
+        elif "timeout" in error_msg.lower() or "deadline" in error_msg.lower():
             print("💡 Timeout - try a simpler/faster website")
         elif "api key" in error_msg.lower():
             print("💡 Check your Firecrawl API key")
@@ -773,33 +4941,17 @@ PREFERRED_MODELS = {{
         print("="*60)
         
         print("\n📋 Current Configuration:")
-        
-        # Show current API key status
-        api_key = None
-        if os.path.exists('config.py'):
-            try:
-                import importlib.util
-                spec = importlib.util.spec_from_file_location("config", "config.py")
-                config = importlib.util.module_from_spec(spec)
-                spec.loader.exec_module(config)
-                
-                if hasattr(config, 'FIRECRAWL_API_KEY'):
-                    api_key = config.FIRECRAWL_API_KEY
-                    if api_key != 'your-api-key-here':
-                        print(f"🔑 Firecrawl API Key: {api_key[:8]}...{api_key[-4:]} (saved)")
-                    else:
-                        print("🔑 Firecrawl API Key: Not configured")
-                
-                if hasattr(config, 'REPORTS_DIR'):
-                    print(f"📁 Reports Directory: {config.REPORTS_DIR}")
-                
-                if hasattr(config, 'DEFAULT_SAVE_FORMAT'):
-                    print(f"💾 Default Save Format: {config.DEFAULT_SAVE_FORMAT}")
-                    
-            except Exception as e:
-                print(f"⚠️ Error reading config: {e}")
+        self.settings.refresh(force=True)
+        api_key = self.get_config_value('FIRECRAWL_API_KEY')
+        if api_key and api_key != 'your-api-key-here':
+            print(f"🔑 Firecrawl API Key: {self.mask_secret(api_key)} ({self.settings.sources['FIRECRAWL_API_KEY']})")
         else:
-            print("📄 No config.py file found")
+            print("🔑 Firecrawl API Key: Not configured")
+        print(f"📁 Reports Directory: {self.reports_dir}")
+        print(f"💾 Default Save Format: {self.get_config_value('DEFAULT_SAVE_FORMAT')}")
+        print(f"🤖 Ollama Host: {self.get_config_value('OLLAMA_HOST')}")
+        files = [path for path in (self.settings.py_path, self.settings.toml_path) if os.path.exists(path)]
+        print(f"📄 Config files: {', '.join(files) if files else 'none (using defaults)'}")
         
         print("\n📋 Configuration Options:")
         print("1. 🔑 Update Firecrawl API Key")
@@ -834,7 +4986,7 @@ PREFERRED_MODELS = {{
         new_key = input("\nEnter new API key: ").strip()
         if new_key:
             self.save_api_key_to_config(new_key)
-            print("✅ API key updated! Restart the application to use the new key.")
+            print("✅ API key updated!")
         else:
             print("❌ No key entered, keeping current configuration.")
     
@@ -845,11 +4997,8 @@ PREFERRED_MODELS = {{
         
         new_dir = input("\nEnter new reports directory name: ").strip()
         if new_dir:
-            self.reports_dir = new_dir
-            if not os.path.exists(new_dir):
-                os.makedirs(new_dir)
-            self.update_config_setting('REPORTS_DIR', f"'{new_dir}'")
-            print(f"✅ Reports directory updated to: {new_dir}")
+            self.update_config_setting('REPORTS_DIR', new_dir)
+            print(f"✅ Reports directory: {self.reports_dir}")
         else:
             print("❌ No directory entered, keeping current configuration.")
     
@@ -869,10 +5018,19 @@ PREFERRED_MODELS = {{
             4: 'pdf', 5: 'json', 6: 'html_charts'
         }
         
-        choice = self.get_user_input("\nSelect format (1-6): ", "int")
-        if choice in format_map:
-            new_format = format_map[choice]
-            self.update_config_setting('DEFAULT_SAVE_FORMAT', f"'{new_format}'")
+        choices = self.get_user_input("\nSelect format(s) (1-6, comma-separated for several): ", "list") or []
+        new_formats = []
+        for choice in choices:
+            try:
+                if int(choice) in format_map:
+                    new_formats.append(format_map[int(choice)])
+            except ValueError:
+                continue
+        new_formats = parse_save_formats(new_formats)
+        
+        if new_formats:
+            new_format = ','.join(new_formats)
+            self.update_config_setting('DEFAULT_SAVE_FORMAT', new_format)
             print(f"✅ Default save format updated to: {new_format}")
         else:
             print("❌ Invalid choice, keeping current configuration.")
@@ -886,64 +5044,72 @@ PREFERRED_MODELS = {{
             try:
                 if os.path.exists('config.py'):
                     os.remove('config.py')
+                self.settings.refresh(force=True)
                 print("✅ Configuration reset. You'll be prompted for settings on next startup.")
             except Exception as e:
                 print(f"❌ Error resetting config: {e}")
         else:
             print("❌ Reset cancelled.")
     
+    @staticmethod
+    def mask_secret(value):
+        return f"{value[:8]}...{value[-4:]}" if len(value) > 12 else "***"
+    
     def view_full_config(self):
-        """View the full configuration file"""
+        """View every setting's effective value and where it came from"""
         print("\n📄 Full Configuration")
         print("-" * 60)
         
-        if os.path.exists('config.py'):
-            try:
-                with open('config.py', 'r', encoding='utf-8') as f:
-                    content = f.read()
-                print(content)
-            except Exception as e:
-                print(f"❌ Error reading config file: {e}")
-        else:
-            print("No config.py file found.")
+        self.settings.refresh(force=True)
+        for name in Settings.SCHEMA:
+            value = self.settings.values[name]
+            if name == 'FIRECRAWL_API_KEY' and value:
+                value = self.mask_secret(value)
+            print(f"{name:<24} {value!r:<32} ({self.settings.sources[name]})")
+        for name, value in sorted(self.settings.extra.items()):
+            print(f"{name:<24} {value!r:<32} (unused)")
         
         print("-" * 60)
         input("Press Enter to continue...")
     
     def update_config_setting(self, setting_name, setting_value):
-        """Update a specific setting in the config file"""
+        """Write a setting to config.py and apply it straight away"""
         try:
+            lines = []
             if os.path.exists('config.py'):
-                # Read current config
                 with open('config.py', 'r', encoding='utf-8') as f:
                     lines = f.readlines()
-                
-                # Update the specific setting
-                updated = False
-                for i, line in enumerate(lines):
-                    if line.strip().startswith(f'{setting_name} ='):
-                        lines[i] = f'{setting_name} = {setting_value}\n'
-                        updated = True
-                        break
-                
-                # If setting not found, add it
-                if not updated:
-                    lines.append(f'\n{setting_name} = {setting_value}\n')
-                
-                # Write back to file
-                with open('config.py', 'w', encoding='utf-8') as f:
-                    f.writelines(lines)
-                
-                print(f"✅ Updated {setting_name} in config.py")
-            else:
-                print("❌ No config file found to update.")
+            
+            # Update the specific setting
+            updated = False
+            for i, line in enumerate(lines):
+                if line.strip().startswith(f'{setting_name} ='):
+                    lines[i] = f'{setting_name} = {setting_value!r}\n'
+                    updated = True
+                    break
+            
+            # If setting not found, add it
+            if not updated:
+                lines.append(f'\n{setting_name} = {setting_value!r}\n')
+            
+            # Write back to file
+            with open('config.py', 'w', encoding='utf-8') as f:
+                f.writelines(lines)
+            
+            print(f"✅ Updated {setting_name} in config.py")
+            self.settings.refresh(force=True)
+            source = self.settings.sources.get(setting_name)
+            if source not in (None, 'config.py'):
+                print(f"⚠️ {setting_name} is also set in {source}, which takes precedence")
                 
         except Exception as e:
             print(f"❌ Error updating config: {e}")
 
     # Report saving functionality
     def save_report_options(self):
-        """Ask user about report saving preferences"""
+        """Ask user which report formats to save"""
+        default_formats = self.get_default_save_formats()
+        
         print("\n💾 Save Report Options:")
         print("1. 📄 Text file (.txt)")
         print("2. 📊 CSV file (.csv)")
@@ -952,26 +5118,42 @@ PREFERRED_MODELS = {{
         print("5. 📁 JSON file (.json)")
         print("6. 🎨 HTML with Charts (.html)")
         print("7. ❌ Don't save")
+        print(f"Pick several at once with commas (e.g. 3,5,2). Press Enter for default: {', '.join(default_formats) or 'none'}")
         
-        choice = self.get_user_input("\nSelect save format (1-7): ", "int")
+        choices = self.get_user_input("\nSelect save format(s) (1-7): ", "list")
         
-        if choice == 7 or not choice:
-            return None
+        if choices is None:
+            return []
+        if not choices:
+            return default_formats
         
         format_map = {
-            1: "txt", 2: "csv", 3: "html",
-            4: "pdf", 5: "json", 6: "html_charts"
+            '1': "txt", '2': "csv", '3': "html",
+            '4': "pdf", '5': "json", '6': "html_charts"
         }
         
-        return format_map.get(choice, None)
+        if '7' in choices:
+            return []
+        return parse_save_formats([format_map[choice] for choice in choices if choice in format_map])
+
+    def get_default_save_formats(self):
+        """Formats from DEFAULT_SAVE_FORMAT (e.g. 'html' or 'html,json,csv')"""
+        return parse_save_formats(self.get_config_value('DEFAULT_SAVE_FORMAT'))
 
-    def save_report(self, data, analysis_type, url=None):
-        """Save report in user's chosen format"""
-        save_format = self.save_report_options()
+    def save_report(self, data, analysis_type, url=None, formats=None, background=True):
+        """Save one result in every requested format from a single shared document.
         
-        if not save_format:
+        With no explicit formats the user is asked, except in automated
+        (non-interactive) runs where DEFAULT_SAVE_FORMAT is used as-is.
+        `background=False` writes the files before returning.
+        """
+        if formats is None:
+            formats = self.save_report_options() if self.interactive else self.get_default_save_formats()
+        formats = parse_save_formats(formats)
+        
+        if not formats:
             print("📋 Report not saved (user choice)")
-            return
+            return {}
         
         # Generate filename
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -981,200 +5163,64 @@ PREFERRED_MODELS = {{
         else:
             filename = f"{self.reports_dir}/{analysis_type}_{timestamp}"
         
-        # Save in requested format
-        if save_format == "json":
-            self.save_as_json(data, f"{filename}.json")
-        elif save_format == "txt":
-            self.save_as_txt(data, f"{filename}.txt")
-        elif save_format == "csv":
-            self.save_as_csv(data, f"{filename}.csv")
-        elif save_format == "html":
-            self.save_as_html(data, f"{filename}.html", False)
-        elif save_format == "html_charts":
-            self.save_as_html(data, f"{filename}.html", True)
-        elif save_format == "pdf":
-            self.save_as_pdf(data, f"{filename}.pdf")
+        # Normalize once, then render every format in parallel in the background
+        document = ReportDocument(data, analysis_type)
+        generator = self.get_report_generator()
+        filenames = generator.report_filenames(formats, filename)
+        for save_format, report_filename in filenames.items():
+            if background:
+                self.report_writer.submit(generator, save_format, document, report_filename)
+            else:
+                render_report(generator, save_format, document, report_filename)
         
-        print(f"📁 Report saved in: {self.reports_dir}/")
+        print(f"📁 {len(filenames)} report(s) {'queued for' if background else 'saved to'}: {self.reports_dir}/ ({', '.join(formats)})")
+        return filenames
 
-    def save_as_json(self, data, filename):
-        """Save report as JSON file"""
-        report_data = {
-            "timestamp": datetime.now().isoformat(),
-            "analysis_data": data,
-            "generated_by": "Universal Firecrawl + Ollama System"
-        }
+    def save_batch_report(self, pages, analysis_type, formats=None):
+        """Save a multi-page batch result; each format streams page by page"""
+        if formats is None:
+            formats = self.save_report_options() if self.interactive else self.get_default_save_formats()
+        formats = parse_save_formats(formats)
         
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(report_data, f, indent=2, ensure_ascii=False)
+        if not formats:
+            print("📋 Report not saved (user choice)")
+            return {}
         
-        print(f"✅ JSON report saved: {filename}")
-
-    def save_as_txt(self, data, filename):
-        """Save report as text file"""
-        with open(filename, 'w', encoding='utf-8') as f:
-            f.write("="*80 + "\n")
-            f.write("UNIVERSAL FIRECRAWL + OLLAMA ANALYSIS REPORT\n")
-            f.write("="*80 + "\n")
-            f.write(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-            
-            if isinstance(data, dict):
-                for key, value in data.items():
-                    f.write(f"{key.upper().replace('_', ' ')}:\n")
-                    f.write("-" * 40 + "\n")
-                    f.write(f"{value}\n\n")
-            else:
-                f.write(str(data))
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        generator = self.get_report_generator()
+        filenames = generator.report_filenames(formats, f"{self.reports_dir}/{analysis_type}_{timestamp}")
+        for save_format, report_filename in filenames.items():
+            self.report_writer.submit(generator, save_format, pages, report_filename, batch=True)
         
-        print(f"✅ Text report saved: {filename}")
+        print(f"📁 {len(filenames)} batch report(s) queued for: {self.reports_dir}/ ({', '.join(formats)})")
+        return filenames
 
-    def save_as_csv(self, data, filename):
-        """Save report as CSV file"""
-        with open(filename, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow(["Timestamp", "Field", "Value"])
-            
-            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            
-            if isinstance(data, dict):
-                for key, value in data.items():
-                    writer.writerow([timestamp, key.replace('_', ' ').title(), str(value)[:1000]])
-            else:
-                writer.writerow([timestamp, "Analysis", str(data)[:1000]])
-        
-        print(f"✅ CSV report saved: {filename}")
+    def get_report_generator(self):
+        """Build a report generator from the current settings"""
+        return ReportGenerator(
+            reports_dir=self.reports_dir,
+            charts_offline=self.get_config_value('CHARTS_OFFLINE'),
+            chart_js_path=self.get_config_value('CHART_JS_PATH'),
+            pdf_font_path=self.get_config_value('PDF_FONT_PATH')
+        )
 
-    def save_as_html(self, data, filename, include_charts=False):
-        """Save report as HTML file with optional charts"""
-        html_content = f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Universal Firecrawl + Ollama Analysis Report</title>
-    <style>
-        body {{ font-family: Arial, sans-serif; line-height: 1.6; margin: 0; padding: 20px; background-color: #f4f4f4; }}
-        .container {{ max-width: 1200px; margin: 0 auto; background: white; padding: 30px; border-radius: 10px; box-shadow: 0 0 10px rgba(0,0,0,0.1); }}
-        .header {{ text-align: center; color: #333; border-bottom: 3px solid #007acc; padding-bottom: 20px; margin-bottom: 30px; }}
-        .section {{ margin-bottom: 30px; padding: 20px; background: #f9f9f9; border-radius: 5px; border-left: 4px solid #007acc; }}
-        .section h2 {{ color: #007acc; margin-top: 0; }}
-        .metadata {{ background: #e7f3ff; padding: 15px; border-radius: 5px; margin-bottom: 20px; }}
-        .analysis-content {{ background: white; padding: 20px; border-radius: 5px; white-space: pre-wrap; font-family: 'Courier New', monospace; border: 1px solid #ddd; }}
-        .footer {{ text-align: center; margin-top: 30px; padding-top: 20px; border-top: 1px solid #ddd; color: #666; }}
-    </style>"""
-        
-        if include_charts:
-            html_content += '<script src="https://cdn.jsdelivr.net/npm/chart.js"></script>'
-        
-        html_content += f"""
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>🔥 Universal Firecrawl + Ollama Analysis Report</h1>
-            <p>Generated on {datetime.now().strftime('%Y-%m-%d at %H:%M:%S')}</p>
-        </div>
-        
-        <div class="metadata">
-            <h3>📊 Report Information</h3>
-            <p><strong>Generated:</strong> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
-            <p><strong>System:</strong> Universal Firecrawl + Ollama Integration</p>"""
-        
-        if isinstance(data, dict):
-            if 'url' in data:
-                html_content += f'<p><strong>Analyzed URL:</strong> <a href="{data["url"]}" target="_blank">{data["url"]}</a></p>'
-            if 'model' in data:
-                html_content += f'<p><strong>AI Model:</strong> {data["model"]}</p>'
-        
-        html_content += "</div>"
-        
-        # Add analysis sections
-        if isinstance(data, dict):
-            for key, value in data.items():
-                if key not in ['url', 'model', 'timestamp']:
-                    html_content += f"""
-                    <div class="section">
-                        <h2>{key.replace('_', ' ').title()}</h2>
-                        <div class="analysis-content">{str(value)}</div>
-                    </div>"""
-        else:
-            html_content += f"""
-                <div class="section">
-                    <h2>Analysis Results</h2>
-                    <div class="analysis-content">{str(data)}</div>
-                </div>"""
-        
-        html_content += """
-            <div class="footer">
-                <p>Report generated by <strong>Universal Firecrawl + Ollama Integration System</strong></p>
-                <p>For more information, visit <a href="https://firecrawl.dev">Firecrawl</a> and <a href="https://ollama.com">Ollama</a></p>
-            </div>
-        </div>
-    </body>
-    </html>"""
-        
-        with open(filename, 'w', encoding='utf-8') as f:
-            f.write(html_content)
-        
-        chart_note = " with charts" if include_charts else ""
-        print(f"✅ HTML report{chart_note} saved: {filename}")
-        print(f"🌐 Open in browser: file://{os.path.abspath(filename)}")
+    def close(self):
+        """Wait for background work to finish before exiting"""
+        pending = self.report_writer.pending()
+        if pending:
+            print(f"⏳ Waiting for {pending} report(s) to finish writing...")
+        self.report_writer.shutdown()
+        if self.preprocessor:
+            self.preprocessor.shutdown()
+        if self.tracer.enabled:
+            self.tracer.write(os.path.join(self.reports_dir, 'traces'))
 
-    def save_as_pdf(self, data, filename):
-        """Save report as PDF file with fallback"""
-        try:
-            from reportlab.lib.pagesizes import A4
-            from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-            from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-            
-            doc = SimpleDocTemplate(filename, pagesize=A4)
-            styles = getSampleStyleSheet()
-            story = []
-            
-            # Title
-            title_style = ParagraphStyle(
-                'CustomTitle',
-                parent=styles['Heading1'],
-                fontSize=24,
-                spaceAfter=30,
-                alignment=1
-            )
-            story.append(Paragraph("Universal Firecrawl + Ollama Analysis Report", title_style))
-            story.append(Spacer(1, 12))
-            
-            # Timestamp
-            story.append(Paragraph(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", styles['Normal']))
-            story.append(Spacer(1, 20))
-            
-            # Content
-            if isinstance(data, dict):
-                for key, value in data.items():
-                    story.append(Paragraph(key.replace('_', ' ').title(), styles['Heading2']))
-                    story.append(Spacer(1, 12))
-                    
-                    text_content = str(value)
-                    paragraphs = text_content.split('\n\n')
-                    for para in paragraphs:
-                        if para.strip():
-                            story.append(Paragraph(para.strip(), styles['Normal']))
-                            story.append(Spacer(1, 12))
-                    
-                    story.append(Spacer(1, 20))
-            else:
-                story.append(Paragraph("Analysis Results", styles['Heading2']))
-                story.append(Spacer(1, 12))
-                story.append(Paragraph(str(data), styles['Normal']))
-            
-            doc.build(story)
-            print(f"✅ PDF report saved: {filename}")
-            
-        except ImportError:
-            print("❌ PDF generation requires 'reportlab' package.")
-            print("💡 Install with: pip install reportlab")
-            print("🔄 Saving as HTML instead...")
-            
-            html_filename = filename.replace('.pdf', '.html')
-            self.save_as_html(data, html_filename)
+    @contextmanager
+    def operation(self, name, **attributes):
+        """Span one top-level operation and, with --profile, profile it into <reports>/traces"""
+        with self.tracer.span(name, **attributes) as span:
+            with self.tracer.profile(name, os.path.join(self.reports_dir, 'traces')):
+                yield span
 
     def main_menu(self):
         """Dynamic main menu"""
@@ -1190,47 +5236,387 @@ PREFERRED_MODELS = {{
             print("4. 🤖 View Your Models")
             print("5. 🔄 Refresh Model List")
             print("6. ⚙️ Configuration Settings")
-            print("7. ❌ Exit")
-            
-            choice = self.get_user_input("\n🎯 Select option (1-7): ", "int")
-            
-            if choice == 1:
-                self.single_website_analysis()
-            elif choice == 2:
-                self.model_comparison()
-            elif choice == 3:
-                self.structured_extraction()
-            elif choice == 4:
-                self.display_available_models()
-            elif choice == 5:
-                print("🔄 Refreshing model list...")
-                self.model_manager.refresh_models()
-                self.working_models = self.model_manager.get_working_models()
-                self.model_categories = self.model_manager.categorize_models(self.working_models)
-                print(f"✅ Found {len(self.working_models)} working models")
-            elif choice == 6:
-                self.manage_config()
-            elif choice == 7:
-                print("\n👋 Thanks for using the Universal Firecrawl + Ollama System!")
-                break
-            else:
-                print("❌ Please select a number between 1 and 7.")
+            print("7. 📚 Batch Website Analysis")
+            print("8. 🔎 Ask Across Everything Scraped")
+            print("9. ✍️ Draft & Refine Analysis")
+            print("10. 💬 Page Q&A Session")
+            print("11. 👁️ Monitor Pages for Changes")
+            print("12. ❌ Exit")
+            
+            choice = self.get_user_input("\n🎯 Select option (1-12): ", "int")
+            
+            # One span (and, with --profile, one profile) per menu operation
+            with self.operation(f"menu.{choice}") if choice in range(1, 12) else nullcontext():
+                if choice == 1:
+                    self.single_website_analysis()
+                elif choice == 2:
+                    self.model_comparison()
+                elif choice == 3:
+                    self.structured_extraction()
+                elif choice == 4:
+                    self.display_available_models()
+                elif choice == 5:
+                    print("🔄 Refreshing model list...")
+                    self.model_manager.refresh_models()
+                    self.working_models = self.model_manager.get_working_models()
+                    self.model_categories = self.model_manager.categorize_models(self.working_models)
+                    print(f"✅ Found {len(self.working_models)} working models")
+                elif choice == 6:
+                    self.manage_config()
+                elif choice == 7:
+                    self.batch_website_analysis()
+                elif choice == 8:
+                    self.ask_across_scraped_content()
+                elif choice == 9:
+                    self.draft_and_refine_analysis()
+                elif choice == 10:
+                    self.page_session()
+                elif choice == 11:
+                    self.monitor_pages()
+                elif choice == 12:
+                    print("\n👋 Thanks for using the Universal Firecrawl + Ollama System!")
+                    break
+                else:
+                    print("❌ Please select a number between 1 and 12.")
             
             # Continue option
-            if choice in [1, 2, 3, 4, 5, 6]:
+            if choice in [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11]:
                 continue_choice = input("\n❓ Run another operation? (y/n): ").lower()
                 if not continue_choice.startswith('y'):
                     print("\n👋 Thanks for using the Universal Firecrawl + Ollama System!")
                     break
 
+class AnalysisServer:
+    """Local HTTP/JSON API over one FirecrawlOllamaSystem, built on asyncio streams.
+    
+    Blocking scrape and model calls run on a thread pool. Identical
+    requests that arrive while one is already running share its result,
+    and the models in use are kept loaded in Ollama between requests.
+    """
+    
+    MAX_BODY_BYTES = 1024 * 1024
+    STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+                   413: 'Payload Too Large', 500: 'Internal Server Error'}
+    
+    # How often the warm pool is refreshed, and how long a model counts as recently used
+    REWARM_SECONDS = 600
+    RECENT_SECONDS = 3600
+    
+    def __init__(self, system, host='127.0.0.1', port=8765, workers=4, keep_alive='30m', warm_models=None):
+        self.system = system
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.keep_alive = keep_alive
+        self.warm_models = list(warm_models or [])
+        self.model_last_used = {}
+        self.inflight = {}
+        self.stats = {'requests': 0, 'coalesced': 0, 'errors': 0}
+        self.loop = None
+        self.executor = None
+    
+    def serve_forever(self):
+        import asyncio
+        asyncio.run(self._serve())
+    
+    async def _serve(self):
+        import asyncio
+        self.loop = asyncio.get_running_loop()
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="api")
+        server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        warmer = self.loop.create_task(self._keep_warm())
+        print(f"🌐 API listening on http://{self.host}:{self.port} "
+              f"(GET /models, POST /analyze /compare /extract) - Ctrl+C to stop")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            warmer.cancel()
+            self.executor.shutdown(wait=False)
+    
+    async def _keep_warm(self):
+        """Keep configured and recently used models loaded, so requests skip the model load"""
+        import asyncio
+        while True:
+            cutoff = time.time() - self.RECENT_SECONDS
+            models = self.warm_models + [m for m, used in self.model_last_used.items()
+                                         if used >= cutoff and m not in self.warm_models]
+            for model in models:
+                try:
+                    await self.run_blocking(self.warm_model, model)
+                except Exception as e:
+                    print(f"⚠️ Could not warm {model}: {str(e)[:60]}")
+            await asyncio.sleep(self.REWARM_SECONDS)
+    
+    def warm_model(self, model):
+        # A chat request with no messages just loads the model
+        self.system.call_ollama(self.system.ollama_client.chat, model=model, messages=[], keep_alive=self.keep_alive)
+    
+    async def run_blocking(self, func, *args):
+        import functools
+        return await self.loop.run_in_executor(self.executor, functools.partial(func, *args))
+    
+    async def coalesced(self, key, func, *args):
+        """Run func once per key at a time; concurrent identical callers await the same result"""
+        import asyncio
+        task = self.inflight.get(key)
+        if task is not None:
+            self.stats['coalesced'] += 1
+        else:
+            task = self.loop.create_task(self.run_blocking(func, *args))
+            self.inflight[key] = task
+            task.add_done_callback(lambda _: self.inflight.pop(key, None))
+        # Shielded so one client disconnecting doesn't cancel the work others wait on
+        return await asyncio.shield(task)
+    
+    async def read_request(self, reader):
+        request_line = (await reader.readline()).decode('latin-1').strip()
+        if not request_line:
+            raise ConnectionError("empty request")
+        parts = request_line.split()
+        if len(parts) != 3:
+            raise ValueError("malformed request line")
+        method, target = parts[0].upper(), parts[1]
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get('content-length') or 0)
+        if length > self.MAX_BODY_BYTES:
+            raise OverflowError("request body too large")
+        body = await reader.readexactly(length) if length else b''
+        return method, target.split('?', 1)[0], headers, body
+    
+    async def send_json(self, writer, status, payload):
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+        head = (f"HTTP/1.1 {status} {self.STATUS_TEXT.get(status, '')}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n")
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+    
+    async def send_event(self, writer, event, payload):
+        data = json.dumps(payload, ensure_ascii=False, default=str)
+        writer.write(f"event: {event}\ndata: {data}\n\n".encode('utf-8'))
+        await writer.drain()
+    
+    async def handle_connection(self, reader, writer):
+        self.stats['requests'] += 1
+        try:
+            try:
+                method, path, headers, body = await self.read_request(reader)
+            except ConnectionError:
+                return
+            except OverflowError as e:
+                await self.send_json(writer, 413, {"error": str(e)})
+                return
+            except ValueError as e:
+                await self.send_json(writer, 400, {"error": str(e)})
+                return
+            await self.dispatch(writer, method, path, headers, body)
+        except Exception as e:
+            self.stats['errors'] += 1
+            print(f"❌ API error: {e}")
+            try:
+                await self.send_json(writer, 500, {"error": str(e)})
+            except Exception:
+                pass
+        finally:
+            try:
+                writer.close()
+                await writer.wait_closed()
+            except Exception:
+                pass
+    
+    async def dispatch(self, writer, method, path, headers, body):
+        routes = {
+            '/health': ('GET', self.health),
+            '/models': ('GET', self.list_models),
+            '/analyze': ('POST', self.analyze),
+            '/compare': ('POST', self.compare),
+            '/extract': ('POST', self.extract),
+        }
+        if path not in routes:
+            await self.send_json(writer, 404, {"error": f"unknown endpoint {path}", "endpoints": sorted(routes)})
+            return
+        expected_method, handler = routes[path]
+        if method != expected_method:
+            await self.send_json(writer, 405, {"error": f"use {expected_method} for {path}"})
+            return
+        
+        request = {}
+        if body:
+            try:
+                request = json.loads(body.decode('utf-8'))
+            except ValueError:
+                await self.send_json(writer, 400, {"error": "body must be JSON"})
+                return
+            if not isinstance(request, dict):
+                await self.send_json(writer, 400, {"error": "body must be a JSON object"})
+                return
+        
+        try:
+            await handler(writer, request, headers)
+        except (ValueError, KeyError) as e:
+            await self.send_json(writer, 400, {"error": str(e)})
+    
+    @staticmethod
+    def required(request, *fields):
+        missing = [field for field in fields if not request.get(field)]
+        if missing:
+            raise ValueError(f"missing field(s): {', '.join(missing)}")
+        url = request.get('url')
+        if url and not url.startswith(('http://', 'https://')):
+            request['url'] = 'https://' + url
+    
+    def note_models(self, *models):
+        now = time.time()
+        for model in models:
+            if model:
+                self.model_last_used[model] = now
+    
+    def save_if_requested(self, results, analysis_type, request):
+        if request.get('formats'):
+            results['reports'] = self.system.save_report(results, analysis_type, results.get('url'), formats=request['formats'])
+        return results
+    
+    async def health(self, writer, request, headers):
+        await self.send_json(writer, 200, {
+            "status": "ok",
+            "models": len(self.system.working_models),
+            "in_flight": len(self.inflight),
+            "warm_models": sorted(set(self.warm_models) | set(self.model_last_used)),
+            "shared_upstream_calls": self.system.single_flight.stats['shared'],
+            **self.stats
+        })
+    
+    async def list_models(self, writer, request, headers):
+        info = self.system.model_manager.model_info
+        categories = {model: category for category, models in self.system.model_categories.items() for model in models}
+        models = []
+        for model in self.system.working_models:
+            details = info.get(model, {})
+            models.append({
+                "name": model,
+                "category": categories.get(model),
+                "parameters": details.get('parameters'),
+                "context_length": details.get('context_length'),
+                "quantization": details.get('quantization'),
+                "capabilities": details.get('capabilities'),
+                "warm": model in self.model_last_used or model in self.warm_models
+            })
+        await self.send_json(writer, 200, {"models": models})
+    
+    async def analyze(self, writer, request, headers):
+        self.required(request, 'url', 'task')
+        url, task, model = request['url'], request['task'], request.get('model')
+        if request.get('stream') or 'text/event-stream' in headers.get('accept', ''):
+            await self.stream_analysis(writer, url, task, model)
+            return
+        key = ('analyze', url, task, model or ModelRouter.AUTO)
+        results = await self.coalesced(key, self.system.analyze_url, url, task, model)
+        self.note_models(results['model'])
+        await self.send_json(writer, 200, self.save_if_requested(dict(results), "api_analysis", request))
+    
+    async def stream_analysis(self, writer, url, task, model):
+        """Server-sent events: `token` events as the answer is generated, then `result` (or `error`)"""
+        import asyncio
+        events = asyncio.Queue()
+        
+        def push(event, payload):
+            self.loop.call_soon_threadsafe(events.put_nowait, (event, payload))
+        
+        def work():
+            try:
+                push('result', self.system.analyze_url(url, task, model, lambda text: push('token', {"text": text})))
+            except Exception as e:
+                push('error', {"error": str(e)})
+        
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                     b"Cache-Control: no-cache\r\nConnection: close\r\n\r\n")
+        await writer.drain()
+        self.loop.run_in_executor(self.executor, work)
+        while True:
+            event, payload = await events.get()
+            await self.send_event(writer, event, payload)
+            if event == 'result':
+                self.note_models(payload.get('model'))
+            if event in ('result', 'error'):
+                break
+    
+    async def compare(self, writer, request, headers):
+        self.required(request, 'url', 'task', 'models')
+        models = request['models']
+        if not isinstance(models, list) or len(models) < 2:
+            raise ValueError("models must list at least 2 model names")
+        unknown = [model for model in models if model not in self.system.working_models]
+        if unknown:
+            raise ValueError(f"unknown model(s): {', '.join(unknown)}")
+        key = ('compare', request['url'], request['task'], tuple(models))
+        results = await self.coalesced(key, self.system.compare_models, request['url'], request['task'], models)
+        self.note_models(*models)
+        await self.send_json(writer, 200, self.save_if_requested(dict(results), "api_comparison", request))
+    
+    async def extract(self, writer, request, headers):
+        self.required(request, 'url', 'data_type')
+        key = ('extract', request['url'], request['data_type'])
+        results = await self.coalesced(key, self.system.extract_structured, request['url'], request['data_type'])
+        self.note_models(results['model'])
+        await self.send_json(writer, 200, self.save_if_requested(dict(results), "api_extraction", request))
+
+def parse_arguments(argv=None):
+    """Command line options for queue, worker, server and tracing; no options starts the interactive menu"""
+    import argparse
+    parser = argparse.ArgumentParser(description="Universal Firecrawl + Ollama analysis system")
+    parser.add_argument('--enqueue', nargs='+', metavar='URL', help="add analysis jobs to the persistent queue and exit")
+    parser.add_argument('--task', help="analysis task for --enqueue")
+    parser.add_argument('--model', help="model for --enqueue (default: automatic routing)")
+    parser.add_argument('--formats', help="report formats for --enqueue, e.g. html,json")
+    parser.add_argument('--priority', type=int, default=0, help="higher runs first (default 0)")
+    parser.add_argument('--worker', action='store_true', help="process queued jobs until interrupted")
+    parser.add_argument('--drain', action='store_true', help="with --worker, exit once the queue is empty")
+    parser.add_argument('--concurrency', type=int, help="jobs processed in parallel by --worker")
+    parser.add_argument('--queue-status', action='store_true', help="show job counts and exit")
+    parser.add_argument('--serve', action='store_true', help="run the local HTTP API server")
+    parser.add_argument('--host', default='127.0.0.1', help="address for --serve (default 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8765, help="port for --serve (default 8765)")
+    parser.add_argument('--trace', action='store_true',
+                        help="record timing spans and save a Chrome trace to <reports>/traces on exit")
+    parser.add_argument('--profile', nargs='?', const='cprofile', choices=Tracer.PROFILERS,
+                        help="profile each operation with cprofile (default) or pyinstrument")
+    args = parser.parse_args(argv)
+    if args.enqueue and not args.task:
+        parser.error("--enqueue needs --task")
+    return args
+
 def main():
     """Main entry point"""
+    args = parse_arguments()
+    
+    if args.enqueue or args.queue_status:
+        system = FirecrawlOllamaSystem()
+        job_queue = system.get_job_queue()
+        urls = []
+        for item in args.enqueue or []:
+            urls += [url for url in system.parse_url_list(item) if url not in urls]
+        for url in urls:
+            job_id, added = job_queue.enqueue(url, args.task, args.model, args.formats, args.priority)
+            print(f"{'➕ Queued' if added else '♻️ Already queued'} job {job_id}: {url}")
+        print(f"📋 Queue: {job_queue.counts()}")
+        system.close()
+        return
+    
     print("🔥 Universal Firecrawl + Ollama Integration System")
     print("=" * 60)
     print("🎯 Automatically detects and works with YOUR setup!")
     print("=" * 60)
     
     system = FirecrawlOllamaSystem()
+    system.tracer.enabled = args.trace
+    system.tracer.profiler = args.profile
     
     # Setup Firecrawl
     if not system.setup_firecrawl():
@@ -1248,8 +5634,16 @@ def main():
     print(f"\n🎉 System ready with {len(system.working_models)} working models!")
     print(f"📁 Reports will be saved to: {system.reports_dir}/")
     
-    # Start main menu
-    system.main_menu()
+    # Start main menu (or the unattended worker)
+    try:
+        if args.worker:
+            system.run_worker(args.concurrency, drain=args.drain)
+        elif args.serve:
+            system.serve_api(args.host, args.port)
+        else:
+            system.main_menu()
+    finally:
+        system.close()
 
 if __name__ == "__main__":
     try: